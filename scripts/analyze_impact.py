@@ -7,70 +7,256 @@ Uses Claude to determine which modules need updates based on changed files.
 import argparse
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from dotenv import load_dotenv
-from anthropic import Anthropic
+from sections import (
+    MODULES_DIR,
+    PROJECT_ROOT,
+    load_sections,
+    load_snapshot,
+    save_snapshot,
+    update_snapshot,
+    diff_sections,
+    referencing_sections,
+    render_sections,
+)
+from retrieval import load_index, shortlist_modules
+from changes import load_changes, render_changes
+from response_cache import add_cache_arguments, cache_from_args, create_message
+from rate_limit import CHARS_PER_TOKEN
+from api_client import client
+from patches import extract_json
+from telemetry import BudgetExceededError, add_metrics_arguments, finish_run
 
-# Load environment variables
-load_dotenv()
+# Candidate modules kept per changed section by the retrieval pre-filter
+DEFAULT_TOP_K = 3
+# Index-ranked sections sent for a candidate with no directly referencing section
+FALLBACK_SECTIONS = 2
+# Prompt token budget per impact-analysis request; larger prompts are sharded
+DEFAULT_SHARD_TOKENS = 100_000
+DEFAULT_WORKERS = 4
+# Tokens reserved for the prompt's fixed instructions
+PROMPT_OVERHEAD_TOKENS = 500
+# Merge order for duplicate modules across shards (lower wins)
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+# Impact replies that fail to parse or validate are sent back for a fix this many times
+MAX_IMPACT_REPAIRS = 2
 
-# Resolve project root (parent of scripts/)
-PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
-
-def read_file(path: str) -> str:
-    """Read file content, return empty string if not found."""
-    full_path = PROJECT_ROOT / path
-    try:
-        return full_path.read_text(encoding="utf-8")
-    except (FileNotFoundError, OSError):
-        return ""
+class ImpactFormatError(ValueError):
+    """The impact analysis reply is not JSON of the expected shape."""
 
 
 def get_enablement_modules() -> list[str]:
     """List all enablement module files."""
-    modules_dir = PROJECT_ROOT / "enablement-modules"
-    if not modules_dir.exists():
+    if not MODULES_DIR.exists():
         return []
     return [
         str(f.relative_to(PROJECT_ROOT))
-        for f in modules_dir.glob("*.md")
+        for f in MODULES_DIR.glob("*.md")
     ]
 
 
-def analyze_impact(changed_files: list[str], module_paths: list[str]) -> dict:
-    """Use Claude to analyze which modules are affected by doc changes."""
-    changed_content = {}
+def collect_section_changes(changed_files: list[str], snapshot: dict) -> dict:
+    """
+    Work out which sections of each changed file differ from the snapshot.
+
+    Returns {path: {'changed': [...sections], 'removed': [...anchors]}} for
+    files with at least one changed or removed section.
+    """
+    changes = {}
     for f in changed_files:
-        content = read_file(f)
-        if content:
-            changed_content[f] = content
+        sections = load_sections(f)
+        diff = diff_sections(f, sections, snapshot)
+        if diff["changed"] or diff["removed"]:
+            changes[f] = {"changed": diff["changed"], "removed": diff["removed"]}
+    return changes
+
+
+def collect_diff_changes(source_changes: list[dict]) -> dict:
+    """
+    Section changes derived from hunk-level diffs (see changes.py).
+
+    The sections each hunk falls under are used for retrieval and module
+    matching; anchors that no longer exist in the file count as removed.
+    """
+    section_changes = {}
+    for change in source_changes:
+        sections = load_sections(change["path"])
+        current = {s["anchor"] for s in sections}
+        touched = {anchor for h in change["hunks"] for anchor in h["sections"]}
+        section_changes[change["path"]] = {
+            "changed": [s for s in sections if s["anchor"] in touched],
+            "removed": sorted(touched - current),
+        }
+    return section_changes
+
+
+def prepare_section_changes(changed_files: list[str], snapshot: dict | None, source_changes: list[dict] | None) -> dict:
+    """Section changes from diffs when available, otherwise from the section snapshot."""
+    if source_changes is not None:
+        return collect_diff_changes(source_changes)
+    return collect_section_changes(changed_files, snapshot or {"files": {}})
+
+
+def query_sections(section_changes: dict) -> list[dict]:
+    """Changed sections plus stand-ins for removed ones, used as retrieval queries."""
+    queries = []
+    for change in section_changes.values():
+        queries.extend(change["changed"])
+        queries.extend(
+            {"anchor": a, "heading": a.split(" > ")[-1], "content": ""}
+            for a in change["removed"]
+        )
+    return queries
+
+
+def shortlist_candidates(section_changes: dict, module_paths: list[str], top_k: int) -> tuple:
+    """Refresh the module index and shortlist the top-k modules per changed section."""
+    index = load_index(module_paths)
+    return index, shortlist_modules(index, query_sections(section_changes), top_k)
+
+
+def collect_candidate_sections(section_changes: dict, shortlist: list[dict], index) -> dict:
+    """
+    Map each shortlisted module to the sections worth sending.
+
+    Module sections that directly reference a changed source section are
+    preferred; otherwise the index's best-matching sections are used.
+    """
+    changed_sections = [s for c in section_changes.values() for s in c["changed"]]
+    query = "\n".join(f"{q['heading']}\n{q['content']}" for q in query_sections(section_changes))
+    candidates = {}
+    for candidate in shortlist:
+        module_sections = load_sections(candidate["module"])
+        hits = referencing_sections(changed_sections, module_sections)
+        if not hits:
+            anchors = index.best_sections(candidate["module"], query, FALLBACK_SECTIONS)
+            hits = [s for s in module_sections if s["anchor"] in anchors]
+        candidates[candidate["module"]] = hits
+    return candidates
+
+
+def summarize_section_changes(section_changes: dict) -> list[dict]:
+    """Flat, JSON-friendly list of changed and removed section anchors."""
+    summary = []
+    for f, change in section_changes.items():
+        summary.extend({"file": f, "section": s["anchor"], "status": "changed"} for s in change["changed"])
+        summary.extend({"file": f, "section": a, "status": "removed"} for a in change["removed"])
+    return summary
+
+
+def render_changed_text(section_changes: dict, source_changes: list[dict] | None) -> str:
+    """The changed-source part of the prompt: diffs when available, else changed sections."""
+    if source_changes is not None:
+        return render_changes(source_changes)
+    changed_blocks = []
+    for f, change in section_changes.items():
+        block = render_sections(f, change["changed"])
+        if change["removed"]:
+            block += "\n\nRemoved sections: " + "; ".join(change["removed"])
+        changed_blocks.append(block)
+    return "\n\n".join(changed_blocks)
+
+
+def filter_changes(section_changes: dict, source_changes: list[dict] | None, anchors: set[str]) -> tuple:
+    """Restrict section changes (and hunk-level diffs) to the given changed-section anchors."""
+    filtered_sections = {}
+    for f, change in section_changes.items():
+        changed = [s for s in change["changed"] if s["anchor"] in anchors]
+        removed = [a for a in change["removed"] if a in anchors]
+        if changed or removed:
+            filtered_sections[f] = {"changed": changed, "removed": removed}
+    if source_changes is None:
+        return filtered_sections, None
+    filtered_diffs = []
+    for change in source_changes:
+        hunks = [h for h in change["hunks"] if anchors & set(h["sections"] or [h["section"]])]
+        if hunks:
+            filtered_diffs.append({**change, "hunks": hunks})
+    return filtered_sections, filtered_diffs
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of prompt text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def partition_candidates(
+    shortlist: list[dict],
+    module_blocks: dict[str, str],
+    change_tokens: dict[str, int],
+    budget: int,
+) -> list[list[dict]]:
+    """
+    Greedily pack shortlisted modules into shards of at most `budget` tokens.
+
+    A shard's cost is its module sections plus the changed sections that
+    shortlisted those modules, so each shard only carries the changes
+    relevant to it. A module that alone exceeds the budget gets a shard of
+    its own.
+    """
+    def cost(candidate: dict, anchors: set[str]) -> tuple[int, set[str]]:
+        new_anchors = set(candidate.get("sections") or [candidate["section"]]) - anchors
+        tokens = estimate_tokens(module_blocks.get(candidate["module"], ""))
+        return tokens + sum(change_tokens.get(a, 0) for a in new_anchors), new_anchors
+
+    shards: list[list[dict]] = []
+    current: list[dict] = []
+    anchors: set[str] = set()
+    used = PROMPT_OVERHEAD_TOKENS
+    for candidate in shortlist:
+        tokens, new_anchors = cost(candidate, anchors)
+        if current and used + tokens > budget:
+            shards.append(current)
+            current, anchors, used = [], set(), PROMPT_OVERHEAD_TOKENS
+            tokens, new_anchors = cost(candidate, anchors)
+        current.append(candidate)
+        anchors |= new_anchors
+        used += tokens
+    if current:
+        shards.append(current)
+    return shards
+
 
-    module_content = {}
-    for m in module_paths:
-        content = read_file(m)
-        if content:
-            module_content[m] = content
+def change_token_costs(section_changes: dict, source_changes: list[dict] | None) -> dict[str, int]:
+    """Approximate prompt tokens contributed by each changed-section anchor."""
+    costs: dict[str, int] = {}
+    if source_changes is not None:
+        for change in source_changes:
+            for hunk in change["hunks"]:
+                touched = hunk["sections"] or [hunk["section"]]
+                for anchor in touched:
+                    costs[anchor] = costs.get(anchor, 0) + estimate_tokens(hunk["diff"]) // len(touched)
+        return costs
+    for change in section_changes.values():
+        for section in change["changed"]:
+            costs[section["anchor"]] = costs.get(section["anchor"], 0) + estimate_tokens(section["content"])
+        for anchor in change["removed"]:
+            costs[anchor] = costs.get(anchor, 0) + estimate_tokens(anchor)
+    return costs
 
-    if not changed_content:
-        return {"changed_files": changed_files, "affected_modules": [], "error": "No changed file content found"}
 
-    client = Anthropic()
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY not set. Add it to .env or set the environment variable.")
+def build_impact_prompt(changed_text: str, module_text: str, module_index: str) -> str:
+    """The impact-analysis prompt for one set of changes and candidate modules."""
+    return f"""Analyze the impact of these source documentation changes on the enablement modules.
 
-    prompt = f"""Analyze the impact of these source documentation changes on the enablement modules.
+Only the source sections that changed (as full text, or as unified diffs under
+their heading) are shown, along with the sections of the candidate modules that
+cover the same material.
 
-## Changed Source Files
-{json.dumps(changed_content, indent=2)}
+## Changed Source Sections
+{changed_text}
 
-## Existing Enablement Modules
-{json.dumps(module_content, indent=2)}
+## Candidate Module Sections
+{module_text}
+
+## Candidate Enablement Modules
+{module_index}
 
 ## Your Task
-For each changed source file, determine which enablement modules (if any) need to be updated based on the content changes. Consider:
+For each changed source section, determine which of the candidate enablement modules (if any) need to be updated based on the content changes. Consider:
 - Overlapping topics and concepts
 - Outdated information that modules may reference
 - New information that should be incorporated
@@ -88,58 +274,293 @@ Respond with a JSON object only, no other text. Use this exact structure:
   ]
 }}"""
 
-    response = client.messages.create(
-        model=os.environ.get("ANTHROPIC_MODEL", "claude-4-6-opus-latest"),
-        max_tokens=4096,
-        messages=[{"role": "user", "content": prompt}],
-    )
 
-    text = response.content[0].text
-    # Extract JSON (handle potential markdown code block)
-    if "```json" in text:
-        text = text.split("```json")[1].split("```")[0].strip()
-    elif "```" in text:
-        text = text.split("```")[1].split("```")[0].strip()
+def validate_impact(data) -> list[str]:
+    """Problems with a parsed impact reply; an empty list means it is valid."""
+    if not isinstance(data, dict):
+        return ["top level must be a JSON object"]
+    problems = []
+    changed_files = data.get("changed_files", [])
+    if not isinstance(changed_files, list) or not all(isinstance(f, str) for f in changed_files):
+        problems.append("'changed_files' must be a list of strings")
+    affected = data.get("affected_modules")
+    if not isinstance(affected, list):
+        return problems + ["'affected_modules' must be a list"]
+    for i, module in enumerate(affected):
+        if not isinstance(module, dict):
+            problems.append(f"affected_modules[{i}] must be an object")
+            continue
+        if not isinstance(module.get("module"), str) or not module["module"].strip():
+            problems.append(f"affected_modules[{i}].module must be a non-empty path")
+        if not isinstance(module.get("reason"), str):
+            problems.append(f"affected_modules[{i}].reason must be a string")
+        if module.get("priority") not in PRIORITY_RANK:
+            problems.append(f"affected_modules[{i}].priority must be one of {', '.join(PRIORITY_RANK)}")
+    return problems
+
+
+def parse_impact(text: str) -> dict:
+    """Parse and validate an impact reply, raising ImpactFormatError on any problem."""
+    try:
+        data = json.loads(extract_json(text))
+    except json.JSONDecodeError as e:
+        raise ImpactFormatError(f"not valid JSON: {e}") from e
+    problems = validate_impact(data)
+    if problems:
+        raise ImpactFormatError("; ".join(problems))
+    return data
+
+
+def request_impact(client, prompt: str, cache=None, limiter=None, label: str = "impact-analysis") -> dict:
+    """
+    Send one impact-analysis prompt and parse the JSON reply.
+
+    A reply that does not parse or match the schema is returned to the
+    model with the problems listed, up to MAX_IMPACT_REPAIRS times, before
+    ImpactFormatError is raised.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    for attempt in range(MAX_IMPACT_REPAIRS + 1):
+        response = create_message(client, {
+            "model": os.environ.get("ANTHROPIC_MODEL", "claude-4-6-opus-latest"),
+            "max_tokens": 4096,
+            "messages": messages,
+        }, cache, limiter, label=label)
+        text = response.content[0].text
+        try:
+            return parse_impact(text)
+        except ImpactFormatError as e:
+            if attempt == MAX_IMPACT_REPAIRS:
+                raise ImpactFormatError(f"{label}: {e}") from e
+            print(f"⚠ {label}: reply {e}, asking for a corrected one ({attempt + 1}/{MAX_IMPACT_REPAIRS})")
+            messages = [*messages, {"role": "assistant", "content": text.strip() or "(empty reply)"}, {"role": "user", "content": (
+                f"That reply could not be used: {e}. Respond with only the corrected JSON object "
+                "in the format given above, with no other text."
+            )}]
+
+
+def merge_impacts(results: list[dict]) -> dict:
+    """
+    Reduce per-shard results into one: changed_files are unioned in order
+    and each module appears once, keeping its highest-priority entry.
+    """
+    merged = dict(results[0]) if results else {}
+    changed_files: list[str] = []
+    affected: dict[str, dict] = {}
+    for result in results:
+        for f in result.get("changed_files", []):
+            if f not in changed_files:
+                changed_files.append(f)
+        for module in result.get("affected_modules", []):
+            key = module.get("module") or module.get("module_path")
+            current = affected.get(key)
+            if current is None or PRIORITY_RANK.get(module.get("priority"), len(PRIORITY_RANK)) < PRIORITY_RANK.get(
+                    current.get("priority"), len(PRIORITY_RANK)):
+                affected[key] = module
+    merged["changed_files"] = changed_files
+    merged["affected_modules"] = list(affected.values())
+    return merged
+
+
+def analyze_impact(
+    changed_files: list[str],
+    module_paths: list[str],
+    snapshot: dict | None = None,
+    top_k: int = DEFAULT_TOP_K,
+    cache=None,
+    source_changes: list[dict] | None = None,
+    shard_tokens: int = DEFAULT_SHARD_TOKENS,
+    workers: int = DEFAULT_WORKERS,
+    client=client,
+) -> dict:
+    """
+    Use Claude to analyze which modules are affected by section-level doc changes.
+
+    With source_changes (hunk-level diffs from changes.py) the prompt carries
+    the diffs instead of the changed sections' full text.
+
+    When the prompt would exceed shard_tokens, the shortlisted modules are
+    split into token-budgeted shards, each sent with only the changes that
+    shortlisted its modules, `workers` at a time; the per-shard results are
+    merged into the same shape as a single request. If no module is
+    shortlisted, no request is sent and no modules are affected.
+
+    A long-running caller can pass its own client to reuse its connection pool.
+    """
+    section_changes = prepare_section_changes(changed_files, snapshot, source_changes)
 
-    return json.loads(text)
+    if not section_changes:
+        return {
+            "changed_files": changed_files,
+            "changed_sections": [],
+            "affected_modules": [],
+            "error": "No changed section content found",
+        }
 
+    index, shortlist = shortlist_candidates(section_changes, module_paths, top_k)
+    if not shortlist:
+        # No module matches the changes, so there is nothing to ask the model about
+        print("No candidate modules matched the changed sections; skipping the impact request")
+        result = {
+            "changed_files": changed_files,
+            "changed_sections": summarize_section_changes(section_changes),
+            "affected_modules": [],
+        }
+        if source_changes is not None:
+            result["source_changes"] = source_changes
+        return result
+    candidate_sections = collect_candidate_sections(section_changes, shortlist, index)
+    module_blocks = {m: render_sections(m, hits) for m, hits in candidate_sections.items() if hits}
 
-def mock_impact(changed_files: list[str], module_paths: list[str]) -> dict:
-    """Return mock impact analysis without calling the API (for testing)."""
-    return {
+    shards = partition_candidates(shortlist, module_blocks, change_token_costs(section_changes, source_changes),
+                                  shard_tokens)
+
+    def shard_prompt(candidates: list[dict], sharded: bool) -> str:
+        shard_sections, shard_diffs = section_changes, source_changes
+        if sharded:
+            anchors = {a for c in candidates for a in (c.get("sections") or [c["section"]])}
+            shard_sections, shard_diffs = filter_changes(section_changes, source_changes, anchors)
+        module_text = "\n\n".join(module_blocks[c["module"]] for c in candidates if c["module"] in module_blocks)
+        module_index = "\n".join(f"- {c['module']}" for c in candidates)
+        return build_impact_prompt(
+            render_changed_text(shard_sections, shard_diffs),
+            module_text or "No module sections reference these changes directly.",
+            module_index or "No candidate modules matched.",
+        )
+
+    if len(shards) <= 1:
+        result = request_impact(client, shard_prompt(shortlist, False), cache)
+    else:
+        print(f"Sharding {len(shortlist)} candidate module(s) into {len(shards)} groups of <= {shard_tokens} tokens")
+        def run_shard(i: int, candidates: list[dict]) -> dict:
+            # Prompts are built inside the worker so only `workers` are held at once
+            return request_impact(client, shard_prompt(candidates, True), cache,
+                                  label=f"impact-analysis[{i}/{len(shards)}]")
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(run_shard, range(1, len(shards) + 1), shards))
+        result = merge_impacts(results)
+
+    result["changed_sections"] = summarize_section_changes(section_changes)
+    if source_changes is not None:
+        result["source_changes"] = source_changes
+    return result
+
+
+def advance_snapshot(snapshot: dict, paths: list[str]) -> dict:
+    """Record the current sections of `paths` in the snapshot and save it."""
+    for f in paths:
+        update_snapshot(snapshot, f, load_sections(f))
+    save_snapshot(snapshot)
+    return snapshot
+
+
+def score_priority(score: float, top_score: float) -> str:
+    """Bucket a retrieval score relative to the best score into a priority."""
+    ratio = score / top_score if top_score else 0.0
+    if ratio >= 0.66:
+        return "high"
+    if ratio >= 0.33:
+        return "medium"
+    return "low"
+
+
+def mock_impact(
+    changed_files: list[str],
+    module_paths: list[str],
+    snapshot: dict | None = None,
+    top_k: int = DEFAULT_TOP_K,
+    source_changes: list[dict] | None = None,
+) -> dict:
+    """Return impact analysis ranked by the local retrieval index, without calling the API."""
+    section_changes = prepare_section_changes(changed_files, snapshot, source_changes)
+    _, shortlist = shortlist_candidates(section_changes, module_paths, top_k)
+    top_score = shortlist[0]["score"] if shortlist else 0.0
+    result = {
         "changed_files": changed_files,
+        "changed_sections": summarize_section_changes(section_changes),
         "affected_modules": [
-            {"module": m, "reason": "Placeholder - run without --mock to use Claude analysis", "priority": "medium"}
-            for m in module_paths
+            {
+                "module": c["module"],
+                "reason": f"Section '{c['anchor']}' matches changed section '{c['section']}' (score {c['score']:.2f})",
+                "priority": score_priority(c["score"], top_score),
+            }
+            for c in shortlist
         ],
     }
+    if source_changes is not None:
+        result["source_changes"] = source_changes
+    return result
 
 
 def main():
     parser = argparse.ArgumentParser(description="Analyze impact of source doc changes on enablement modules")
-    parser.add_argument("--changed-files", required=True, help="Space-separated list of changed file paths")
+    changes = parser.add_mutually_exclusive_group(required=True)
+    changes.add_argument("--changed-files", help="Space-separated list of changed file paths")
+    changes.add_argument("--changes-file", help="Hunk-level changes JSON written by scripts/changes.py")
     parser.add_argument("--output", required=True, help="Output JSON file path")
     parser.add_argument("--mock", action="store_true", help="Skip API call; output mock analysis for testing")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the section snapshot and treat every section of the changed files as changed")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K,
+                        help=f"Candidate modules shortlisted per changed section (default: {DEFAULT_TOP_K})")
+    parser.add_argument("--shard-tokens", type=int, default=DEFAULT_SHARD_TOKENS,
+                        help=f"Prompt token budget per request; larger analyses are sharded (default: {DEFAULT_SHARD_TOKENS})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Shards analyzed concurrently (default: {DEFAULT_WORKERS})")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
     args = parser.parse_args()
+    from dotenv import load_dotenv
+    load_dotenv()
 
-    changed_files = [f.strip() for f in args.changed_files.split() if f.strip()]
+    source_changes = None
+    if args.changes_file:
+        source_changes = load_changes(args.changes_file)
+        changed_files = [c["path"] for c in source_changes]
+    else:
+        changed_files = [f.strip() for f in args.changed_files.split() if f.strip()]
     module_paths = get_enablement_modules()
 
     print(f"Analyzing impact of {len(changed_files)} changed file(s) on {len(module_paths)} module(s)...")
-    result = mock_impact(changed_files, module_paths) if args.mock else analyze_impact(changed_files, module_paths)
+    snapshot = {"files": {}} if args.full else load_snapshot()
+    if args.mock:
+        result = mock_impact(changed_files, module_paths, snapshot, args.top_k, source_changes)
+    else:
+        from anthropic import APIError
+
+        try:
+            result = analyze_impact(changed_files, module_paths, snapshot, args.top_k, cache_from_args(args),
+                                    source_changes, args.shard_tokens, args.workers)
+        except (ImpactFormatError, APIError) as e:
+            print(f"✗ Impact analysis failed: {e}")
+            finish_run(args)
+            return 1
+        except BudgetExceededError as e:
+            print(f"✗ Stopped: {e}")
+            finish_run(args)
+            return 1
 
     output_path = Path(args.output)
     if not output_path.is_absolute():
         output_path = PROJECT_ROOT / output_path
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
 
     print(f"Impact analysis written to {output_path}")
+
+    # Advance the snapshot only once a real analysis is safely on disk
+    if not args.mock:
+        advance_snapshot(load_snapshot(), changed_files + module_paths)
+
     affected = result.get("affected_modules", [])
     print(f"Modules requiring updates: {len(affected)}")
     for m in affected:
         print(f"  - {m.get('module', '?')} ({m.get('priority', '?')}): {m.get('reason', '')[:60]}...")
+    finish_run(args)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    exit(main())
@@ -0,0 +1,146 @@
+# scripts/api_client.py
+"""
+Shared Anthropic client and retry policy for every script.
+
+The SDK's own retries are turned off so that all retrying happens here:
+jittered exponential backoff that honors retry-after, with 429s also
+pausing the process-wide rate limiter so concurrent workers back off
+together instead of each hammering the API on their own schedule.
+
+The SDK is only imported once a client is actually used: scripts hold a
+LazyClient, so --help, --mock, plans and fully cached runs start without
+paying for the import or needing an API key.
+"""
+
+import email.utils
+import os
+import random
+import threading
+import time
+
+# Attempts after the first one, and the backoff bounds (seconds)
+MAX_RETRIES = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+# Request timeouts, lock conflicts and rate limits; every 5xx (including
+# 529 overloaded) is retried too
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def make_client(api_key: str | None = None):
+    """An Anthropic client whose retries are left to call_with_retries."""
+    from anthropic import Anthropic
+
+    api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY not set. Add it to .env or set the environment variable.")
+    return Anthropic(api_key=api_key, max_retries=0)
+
+
+class LazyClient:
+    """
+    Stands in for an Anthropic client and builds it with make_client() on
+    first attribute access (e.g. client.messages), from one thread only.
+    """
+
+    def __init__(self, api_key: str | None = None):
+        self._api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._client is None:
+                self._client = make_client(self._api_key)
+            return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def retry_after(headers) -> float | None:
+    """Seconds the API asked us to wait, from retry-after-ms or retry-after."""
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, requested: float | None = None) -> float:
+    """
+    Delay before retry number `attempt` (0-based).
+
+    Full jitter over an exponentially growing window, so workers that failed
+    together do not retry together; a retry-after from the API is a floor.
+    """
+    delay = random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+    if requested is not None:
+        delay = max(delay, requested + random.uniform(0, BASE_DELAY))
+    return delay
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an API error is worth retrying."""
+    from anthropic import APIConnectionError, APIStatusError
+
+    if isinstance(error, APIConnectionError):
+        return True
+    if not isinstance(error, APIStatusError):
+        return False
+    should_retry = error.response.headers.get("x-should-retry")
+    if should_retry in ("true", "false"):
+        return should_retry == "true"
+    return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+
+
+def call_with_retries(call, limiter=None, label: str = "", max_retries: int = MAX_RETRIES, can_retry=None):
+    """
+    Run call() until it succeeds, retrying transient API errors.
+
+    A 429 feeds its headers to `limiter` and pauses it for the wait, so
+    every thread sharing the limiter holds off. can_retry(), if given, is
+    asked before each retry (e.g. a stream that already emitted text must
+    not be replayed).
+
+    Returns (result, retries taken); the last error is raised once
+    max_retries is exhausted or the error is not retryable.
+    """
+    from anthropic import APIConnectionError, APIStatusError
+
+    attempt = 0
+    while True:
+        try:
+            return call(), attempt
+        except (APIStatusError, APIConnectionError) as e:
+            if attempt >= max_retries or not is_retryable(e) or (can_retry is not None and not can_retry()):
+                raise
+            headers = e.response.headers if isinstance(e, APIStatusError) else None
+            delay = backoff_delay(attempt, retry_after(headers))
+            if limiter is not None and isinstance(e, APIStatusError) and e.status_code == 429:
+                limiter.observe(headers)
+                limiter.pause(delay)
+            reason = f"HTTP {e.status_code}" if isinstance(e, APIStatusError) else type(e).__name__
+            print(f"  {label or 'request'}: {reason}, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+            attempt += 1
+
+
+# Process-wide client for the scripts; the key is read from the
+# environment when it is first used, after main() has loaded .env
+client = LazyClient()
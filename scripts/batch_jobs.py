@@ -0,0 +1,483 @@
+# scripts/batch_jobs.py
+"""
+Shared Message Batches machinery: submit, poll and save results.
+Used by generate_enablement.py for updates and create_modules.py --batch
+for initial builds. Each request mapping entry is
+{"request": {"custom_id", "params"}, "module_path": ..., "mode": ...}.
+
+Callers may pass a render(req, text) callback that turns a response into
+the module content to write (e.g. by applying a section patch); returning
+None rejects the result.
+
+Every job is recorded in a ledger before it is submitted, so a run that
+dies or times out can be picked up again with --resume instead of paying
+for a new batch.
+
+Work that exceeds the API's per-batch request-count or payload-size limits
+is split into several compliant batches, one ledger job each, which are
+submitted concurrently and polled together.
+"""
+
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sections import CACHE_DIR
+from response_cache import request_key
+from telemetry import run_metrics, spend_budget
+from api_client import call_with_retries
+
+LEDGER_PATH = CACHE_DIR / "batch-ledger.json"
+
+# Adaptive polling bounds (seconds)
+MIN_POLL_INTERVAL = 5
+MAX_POLL_INTERVAL = 300
+
+# Message Batches limits per batch, with headroom on the payload size for
+# the request envelope
+MAX_BATCH_REQUESTS = 100_000
+MAX_BATCH_BYTES = 250 * 1024 * 1024
+# Batches submitted at once when work is split
+MAX_PARALLEL_SUBMITS = 4
+# Request mapping fields kept in the ledger, so --resume can retry and
+# repair results like the run that submitted them
+RESUME_FIELDS = ("module_info", "draft", "issues")
+
+
+class BatchLedger:
+    """
+    Persisted record of batch jobs and the state of each request.
+    
+    Layout: {"jobs": {job_id: {"batch_id", "status", "created_at",
+    "requests": {custom_id: {"module_path", "prompt_hash", "mode", "status",
+    and any RESUME_FIELDS}}}}}.
+    Job status moves pending -> submitted -> ended -> complete (or
+    submit_failed); request status moves pending -> written / errored /
+    rejected.
+    The file is rewritten atomically after every change.
+    """
+    
+    def __init__(self, path=LEDGER_PATH):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            self.data = {"jobs": {}}
+    
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def start_job(self, request_mapping):
+        """Record a job and its requests before submission; returns the job id."""
+        job_id = uuid.uuid4().hex[:12]
+        self.data["jobs"][job_id] = {
+            "batch_id": None,
+            "status": "pending",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "requests": {
+                req["request"]["custom_id"]: {
+                    "module_path": req["module_path"],
+                    "prompt_hash": req["prompt_hash"],
+                    "mode": req.get("mode", "full"),
+                    "status": "pending",
+                    **{field: req[field] for field in RESUME_FIELDS if field in req}
+                }
+                for req in request_mapping
+            }
+        }
+        self.save()
+        return job_id
+    
+    def set_status(self, job_id, status, batch_id=None):
+        job = self.data["jobs"][job_id]
+        job["status"] = status
+        if batch_id:
+            job["batch_id"] = batch_id
+        self.save()
+    
+    def mark_request(self, job_id, custom_id, status):
+        self.data["jobs"][job_id]["requests"][custom_id]["status"] = status
+        self.save()
+    
+    def is_written(self, job_id, custom_id):
+        request = self.data["jobs"][job_id]["requests"].get(custom_id, {})
+        return request.get("status") == "written"
+    
+    def settled(self, job_id):
+        """Whether every request in a job has been written or has errored."""
+        requests = self.data["jobs"][job_id]["requests"].values()
+        return all(request["status"] != "pending" for request in requests)
+    
+    def resumable_jobs(self):
+        """Jobs that were submitted but whose results were not all saved."""
+        return [
+            (job_id, job) for job_id, job in self.data["jobs"].items()
+            if job["batch_id"] and job["status"] in ("submitted", "ended")
+        ]
+    
+    def request_mapping(self, job_id):
+        """Rebuild a request mapping (without params) from the ledger."""
+        return [
+            {
+                "request": {"custom_id": custom_id},
+                "module_path": request["module_path"],
+                "prompt_hash": request["prompt_hash"],
+                "mode": request.get("mode", "full"),
+                **{field: request[field] for field in RESUME_FIELDS if field in request}
+            }
+            for custom_id, request in self.data["jobs"][job_id]["requests"].items()
+        ]
+
+def message_text(message):
+    """Concatenate the text blocks of a Message."""
+    content_text = ""
+    for block in message.content:
+        if block.type == "text":
+            content_text += block.text
+    return content_text
+
+def save_module(module_path, content_text):
+    """Write generated module content to disk."""
+    os.makedirs(os.path.dirname(module_path), exist_ok=True)
+    with open(module_path, 'w', encoding='utf-8') as f:
+        f.write(content_text)
+
+def split_cached_requests(request_mapping, cache):
+    """
+    Split requests into those already answered by the response cache and
+    those that still need to go through the Batch API.
+    
+    Returns (cached, pending) where cached is a list of (mapping, message).
+    """
+    if cache is None:
+        return [], list(request_mapping)
+    
+    cached, pending = [], []
+    for req in request_mapping:
+        message = cache.get(req["request"]["params"])
+        if message is not None:
+            cached.append((req, message))
+        else:
+            pending.append(req)
+    return cached, pending
+
+def render_result(req, message, render=None):
+    """Module content to write for a response, or None if render rejected it."""
+    text = message_text(message)
+    return render(req, text) if render else text
+
+def save_cached_results(cached, render=None):
+    """Save modules whose responses came from the response cache."""
+    updated_files = []
+    for req, message in cached:
+        run_metrics.record_call("cache_hit", req["module_path"], message)
+        content = render_result(req, message, render)
+        if content is None:
+            continue
+        save_module(req["module_path"], content)
+        updated_files.append(req["module_path"])
+        print(f"✓ Updated (cached): {req['module_path']}")
+    return updated_files
+
+def submit_batch(client, requests):
+    """Submit batch processing job to Claude API."""
+    
+    # Create the batch file format
+    batch_requests = [r["request"] for r in requests]
+    
+    try:
+        # Create message batch
+        message_batch, _ = call_with_retries(
+            lambda: client.messages.batches.create(requests=batch_requests), label="batch submit"
+        )
+        
+        print(f"✓ Batch submitted: {message_batch.id}")
+        print(f"  Status: {message_batch.processing_status}")
+        
+        return message_batch.id, requests
+        
+    except Exception as e:
+        print(f"✗ Error submitting batch: {e}")
+        return None, None
+
+def next_poll_interval(interval, previous_processing, processing):
+    """
+    Back off while batches make no progress; poll again quickly once
+    requests start completing.
+    """
+    if previous_processing is not None and processing < previous_processing:
+        return MIN_POLL_INTERVAL
+    return min(interval * 2, MAX_POLL_INTERVAL)
+
+def batch_request_total(counts):
+    """Total requests in a batch from its request_counts."""
+    return sum(getattr(counts, field, 0) or 0 for field in ("processing", "succeeded", "errored", "canceled", "expired"))
+
+def request_size(req):
+    """Serialized size in bytes of one batch request entry."""
+    return len(json.dumps(req["request"], separators=(",", ":")).encode("utf-8"))
+
+def plan_batches(requests, max_requests=MAX_BATCH_REQUESTS, max_bytes=MAX_BATCH_BYTES):
+    """
+    Split requests into batches that stay within the request-count and
+    payload-size limits, preserving order.
+    
+    A single request larger than max_bytes gets a batch of its own (the
+    API will reject it, but the rest of the work still goes through).
+    """
+    batches = []
+    current, current_bytes = [], 0
+    for req in requests:
+        size = request_size(req)
+        if size > max_bytes:
+            print(f"⚠ Request for {req['module_path']} is {size:,} bytes, over the {max_bytes:,}-byte batch limit")
+        if current and (len(current) >= max_requests or current_bytes + size > max_bytes):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(req)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+def index_requests(request_mapping):
+    """custom_id -> request mapping entry, for O(1) result lookups."""
+    return {req["request"]["custom_id"]: req for req in request_mapping}
+
+def poll_batches(client, batch_ids, timeout=600):
+    """
+    Poll several batches together with adaptive backoff until all have
+    ended or the timeout expires.
+    
+    Returns {batch_id: batch} for the batches that ended. Each lifecycle
+    (wall time, API-reported queue time, poll count and final counts) is
+    recorded in run_metrics, including batches still running at timeout.
+    """
+    
+    start_time = time.time()
+    interval = MIN_POLL_INTERVAL
+    previous_processing = None
+    pending = list(batch_ids)
+    polls = {batch_id: 0 for batch_id in pending}
+    latest = {}
+    ended = {}
+    
+    while pending and time.time() - start_time < timeout:
+        processing = 0
+        errors = False
+        for batch_id in list(pending):
+            try:
+                polls[batch_id] += 1
+                batch, _ = call_with_retries(lambda: client.messages.batches.retrieve(batch_id), label=batch_id)
+            except Exception as e:
+                print(f"Error checking batch status: {e}")
+                errors = True
+                continue
+            latest[batch_id] = batch
+            status = batch.processing_status
+            counts = batch.request_counts
+            label = f"{batch_id} " if len(batch_ids) > 1 else ""
+            print(f"  Status: {label}{status} (elapsed: {int(time.time() - start_time)}s, "
+                  f"processing: {counts.processing}, succeeded: {counts.succeeded}, errored: {counts.errored})")
+            
+            if status == "ended":
+                run_metrics.record_batch(batch_id, batch_request_total(counts), batch,
+                                         time.time() - start_time, polls[batch_id])
+                ended[batch_id] = batch
+                pending.remove(batch_id)
+            else:
+                processing += counts.processing
+        
+        if not pending:
+            break
+        if errors:
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+        else:
+            interval = next_poll_interval(interval, previous_processing, processing)
+            previous_processing = processing
+        
+        remaining = timeout - (time.time() - start_time)
+        time.sleep(max(0, min(interval, remaining)))
+    
+    if pending:
+        print("✗ Batch processing timeout")
+        for batch_id in pending:
+            if batch_id in latest:
+                run_metrics.record_batch(batch_id, batch_request_total(latest[batch_id].request_counts),
+                                         latest[batch_id], time.time() - start_time, polls[batch_id])
+    return ended
+
+def process_batch_results(client, batch_id, request_index, cache=None, ledger=None, job_id=None, render=None):
+    """
+    Retrieve and save batch results, storing successes in the response cache.
+    
+    request_index maps custom_id -> request mapping entry (see
+    index_requests) and may span several batches. With a ledger, results
+    already written by an earlier run are skipped and each saved result is
+    recorded as soon as it is on disk.
+    
+    Returns (written module paths, complete). If the results cannot be
+    retrieved or a module cannot be saved, the modules written so far are
+    returned with complete=False; the job stays in the ledger for --resume.
+    """
+    from anthropic import APIError
+    
+    updated_files = []
+    try:
+        # Get all results
+        results, _ = call_with_retries(lambda: client.messages.batches.results(batch_id), label=batch_id)
+        
+        for result in results:
+            custom_id = result.custom_id
+            
+            matched = request_index.get(custom_id)
+            if matched is None:
+                print(f"⚠ Could not find module path for {custom_id}")
+                continue
+            module_path = matched["module_path"]
+            prompt_hash = matched.get("prompt_hash")
+            
+            if ledger and ledger.is_written(job_id, custom_id):
+                continue
+            
+            # Extract the generated content
+            if result.result.type == "succeeded":
+                message = result.result.message
+                run_metrics.record_call("batch", module_path, message)
+                if message.stop_reason == "max_tokens":
+                    print(f"⚠ {module_path} was cut off at max_tokens")
+                if cache is not None and prompt_hash:
+                    cache.put_key(prompt_hash, message)
+                content = render_result(matched, message, render)
+                if content is None:
+                    if ledger:
+                        ledger.mark_request(job_id, custom_id, "rejected")
+                    continue
+                save_module(module_path, content)
+                if ledger:
+                    ledger.mark_request(job_id, custom_id, "written")
+                
+                updated_files.append(module_path)
+                print(f"✓ Updated: {module_path}")
+            else:
+                if ledger:
+                    ledger.mark_request(job_id, custom_id, "errored")
+                print(f"✗ Failed to generate {module_path}: {result.result.type}")
+        
+    except (APIError, OSError) as e:
+        print(f"✗ Error processing results of {batch_id}: {e}")
+        return updated_files, False
+    return updated_files, True
+
+def run_batch(client, request_mapping, cache=None, timeout=600, ledger=None, render=None,
+              max_requests=MAX_BATCH_REQUESTS, max_bytes=MAX_BATCH_BYTES):
+    """
+    Run a full batch job: serve cached requests, split the rest into
+    batches within the API limits, record each in the ledger, submit them
+    concurrently, wait for them together and save every successful result.
+    
+    Returns (written module paths, complete). complete is False if any
+    batch could not be submitted, did not finish within the timeout or had
+    results that could not be saved (those can be picked up later with
+    resume_batches). BudgetExceededError is raised before anything is
+    written if the spend budget is used up.
+    """
+    ledger = ledger or BatchLedger()
+    cached, pending = split_cached_requests(request_mapping, cache)
+    if pending:
+        spend_budget.check()
+    updated_files = save_cached_results(cached, render)
+    if cached:
+        print(f"✓ {len(cached)} request(s) answered from the response cache")
+    
+    if not pending:
+        return updated_files, True
+    
+    for req in pending:
+        req["prompt_hash"] = request_key(req["request"]["params"])
+    request_index = index_requests(pending)
+    shards = plan_batches(pending, max_requests, max_bytes)
+    job_ids = [ledger.start_job(shard) for shard in shards]
+    
+    if len(shards) > 1:
+        print(f"\nSubmitting {len(pending)} requests as {len(shards)} batches to Claude API...")
+    else:
+        print("\nSubmitting batch to Claude API...")
+    with ThreadPoolExecutor(max_workers=min(len(shards), MAX_PARALLEL_SUBMITS)) as pool:
+        batch_ids = list(pool.map(lambda shard: submit_batch(client, shard)[0], shards))
+    
+    submitted = {}
+    for job_id, batch_id in zip(job_ids, batch_ids):
+        if batch_id:
+            ledger.set_status(job_id, "submitted", batch_id)
+            submitted[batch_id] = job_id
+        else:
+            ledger.set_status(job_id, "submit_failed")
+    if not submitted:
+        return updated_files, False
+    
+    print("\nWaiting for batch processing to complete...")
+    batches = poll_batches(client, list(submitted), timeout)
+    
+    complete = True
+    for batch_id, batch in batches.items():
+        job_id = submitted[batch_id]
+        ledger.set_status(job_id, "ended")
+        
+        print(f"\n✓ Batch {batch_id} processing complete!")
+        print(f"  Succeeded: {batch.request_counts.succeeded}, errored: {batch.request_counts.errored}")
+        
+        print("\nRetrieving and saving results...")
+        written, saved = process_batch_results(client, batch_id, request_index, cache, ledger, job_id, render)
+        updated_files += written
+        complete = complete and saved
+        if ledger.settled(job_id):
+            ledger.set_status(job_id, "complete")
+    
+    unfinished = [batch_id for batch_id in submitted if batch_id not in batches]
+    for batch_id in unfinished:
+        print(f"  Batch {batch_id} is still recorded in {ledger.path}; rerun with --resume to collect it")
+    return updated_files, complete and not unfinished and len(submitted) == len(shards)
+
+def resume_batches(client, cache=None, timeout=600, ledger=None, render=None):
+    """
+    Reattach to every unfinished batch in the ledger, wait for them
+    together and save the results that were not written yet.
+    
+    Returns (written module paths, complete); complete is False if any
+    batch is still running when the timeout expires or its results could
+    not all be saved.
+    """
+    ledger = ledger or BatchLedger()
+    jobs = ledger.resumable_jobs()
+    if not jobs:
+        print("No unfinished batch jobs in the ledger")
+        return [], True
+    
+    for job_id, job in jobs:
+        print(f"\nResuming batch {job['batch_id']} (created {job['created_at']})...")
+    batches = poll_batches(client, [job["batch_id"] for _, job in jobs], timeout)
+    
+    updated_files = []
+    complete = len(batches) == len(jobs)
+    for job_id, job in jobs:
+        batch_id = job["batch_id"]
+        if batch_id not in batches:
+            continue
+        ledger.set_status(job_id, "ended")
+        written, saved = process_batch_results(
+            client, batch_id, index_requests(ledger.request_mapping(job_id)), cache, ledger, job_id, render
+        )
+        updated_files += written
+        complete = complete and saved
+        if ledger.settled(job_id):
+            ledger.set_status(job_id, "complete")
+    return updated_files, complete
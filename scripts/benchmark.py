@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark against the local fake Anthropic server.
+
+For each corpus size, builds a throwaway workspace with synthetic source
+docs, enablement modules and module specs, then runs
+analyze_impact -> generate_enablement -> create_modules as subprocesses
+pointed at fake_anthropic.py. Reports wall time, request counts and
+payload bytes per step, and writes them to a JSON file.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fake_anthropic import FakeAnthropicServer, add_server_arguments, state_from_args
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_SIZES = [10, 100, 1000]
+DEFAULT_OUTPUT = "benchmark-results.json"
+# Fraction of source docs changed in each run
+CHANGED_FRACTION = 0.1
+
+TOPIC_WORDS = ("routing", "indexing", "alerting", "dashboards", "ingestion", "retention",
+               "permissions", "forwarders", "lookups", "reports", "tokens", "clusters")
+
+
+def topic(i: int) -> str:
+    """A distinctive term for document/module i, so retrieval can pair them."""
+    return f"{TOPIC_WORDS[i % len(TOPIC_WORDS)]}{i}"
+
+
+def source_doc(i: int) -> str:
+    name = topic(i)
+    return f"""# Working with {name}
+
+Overview of {name} and how it fits into the platform.
+
+## Configuring {name}
+
+Set `{name}.enabled` to true and restart. The `{name}.limit` option caps throughput.
+
+## Troubleshooting {name}
+
+Check the `{name}.log` file and run `{name} --diagnose` when requests stall.
+"""
+
+
+def module_doc(i: int) -> str:
+    name = topic(i)
+    return f"""# Module {i}: {name} fundamentals
+
+## Learning Objectives
+
+- Explain what {name} does
+- Configure {name} for a team
+
+## Configuring {name}
+
+Walk through `{name}.enabled` and `{name}.limit` in a live demo.
+
+## Key Takeaways
+
+- {name} is controlled by two settings
+"""
+
+
+def build_workspace(root: Path, size: int) -> dict:
+    """
+    Lay out a synthetic project in `root` and return the paths the steps need.
+
+    The pipeline scripts are copied in so PROJECT_ROOT resolves to the
+    workspace; a tenth of the source docs are then edited and described in
+    a hunk-level changes file.
+    """
+    shutil.copytree(SCRIPTS_DIR, root / "scripts", ignore=shutil.ignore_patterns("__pycache__"))
+    (root / "source-docs").mkdir()
+    (root / "enablement-modules").mkdir()
+
+    for i in range(size):
+        (root / "source-docs" / f"doc-{i:04d}.md").write_text(source_doc(i), encoding="utf-8")
+        (root / "enablement-modules" / f"module-{i:04d}.md").write_text(module_doc(i), encoding="utf-8")
+
+    changes = []
+    for i in range(max(1, int(size * CHANGED_FRACTION))):
+        name = topic(i)
+        path = f"source-docs/doc-{i:04d}.md"
+        old_line = f"Set `{name}.enabled` to true and restart. The `{name}.limit` option caps throughput."
+        new_line = f"Set `{name}.enabled` to true; restarts are no longer needed. `{name}.limit` now defaults to 500."
+        (root / path).write_text(source_doc(i).replace(old_line, new_line), encoding="utf-8")
+        anchor = f"Working with {name} > Configuring {name}"
+        changes.append({
+            "path": path,
+            "change_type": "M",
+            "hunks": [{
+                "section": anchor,
+                "sections": [anchor],
+                "diff": f"@@ -7,3 +7,3 @@\n ## Configuring {name}\n \n-{old_line}\n+{new_line}",
+            }],
+        })
+    (root / "changes.json").write_text(json.dumps({"base": None, "head": None, "changes": changes}, indent=2),
+                                       encoding="utf-8")
+
+    specs = {"modules": [
+        {"filename": f"new-module-{i:04d}.md", "title": f"Getting started with {topic(i)}",
+         "description": f"Introduce {topic(i)}, its configuration and troubleshooting.",
+         "tags": [TOPIC_WORDS[i % len(TOPIC_WORDS)]], "estimated_word_count": 400}
+        for i in range(size)
+    ]}
+    (root / "module-specs.json").write_text(json.dumps(specs, indent=2), encoding="utf-8")
+    return {"changed": len(changes), "sources": sorted(f"source-docs/{p.name}" for p in (root / "source-docs").glob("*.md"))}
+
+
+def pipeline_steps(workspace: dict, workers: int) -> list[tuple[str, list[str]]]:
+    return [
+        ("analyze_impact", ["scripts/analyze_impact.py", "--changes-file", "changes.json",
+                            "--output", "impact-analysis.json", "--no-cache"]),
+        ("generate_enablement", ["scripts/generate_enablement.py", "--impact-file", "impact-analysis.json",
+                                 "--changes-file", "changes.json", "--no-cache"]),
+        ("create_modules", ["scripts/create_modules.py", "--specs", "module-specs.json", "--workers", str(workers),
+                            "--no-cache", "--source", *workspace["sources"]]),
+    ]
+
+
+def stats_delta(before: dict, after: dict) -> dict:
+    """Server counters accumulated between two snapshots."""
+    requests = {
+        endpoint: count - before["requests"].get(endpoint, 0)
+        for endpoint, count in after["requests"].items()
+        if count - before["requests"].get(endpoint, 0)
+    }
+    delta = {key: after[key] - before[key] for key in after if key != "requests"}
+    return {"requests": requests, "total_requests": sum(requests.values()), **delta}
+
+
+def run_size(server: FakeAnthropicServer, size: int, workers: int, keep: bool, verbose: bool) -> list[dict]:
+    """Run the three pipeline steps on one synthetic corpus."""
+    root = Path(tempfile.mkdtemp(prefix=f"enablement-bench-{size}-"))
+    env = {**os.environ, "ANTHROPIC_BASE_URL": server.url, "ANTHROPIC_API_KEY": "benchmark"}
+    results = []
+    try:
+        workspace = build_workspace(root, size)
+        print(f"\n=== {size} docs/modules ({workspace['changed']} changed) in {root} ===")
+        for step, command in pipeline_steps(workspace, workers):
+            before = server.state.snapshot_stats()
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, *command], cwd=root, env=env,
+                                  stdout=None if verbose else subprocess.PIPE,
+                                  stderr=subprocess.STDOUT, text=True)
+            wall_time = time.perf_counter() - start
+            result = {
+                "size": size,
+                "step": step,
+                "returncode": proc.returncode,
+                "wall_time": round(wall_time, 3),
+                **stats_delta(before, server.state.snapshot_stats()),
+            }
+            results.append(result)
+            print(f"  {step:<20} {wall_time:>8.2f}s  {result['total_requests']:>6} request(s)  "
+                  f"{result['bytes_in']:>12,} B sent  {result['bytes_out']:>12,} B received"
+                  + ("" if proc.returncode == 0 else f"  (exit {proc.returncode})"))
+            if proc.returncode != 0 and not verbose:
+                print("\n".join("    " + line for line in (proc.stdout or "").splitlines()[-15:]))
+    finally:
+        if keep:
+            print(f"  Workspace kept at {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def render_table(results: list[dict]) -> str:
+    header = f"{'size':>6}  {'step':<20}{'wall s':>9}{'requests':>10}{'429s':>6}{'sent B':>14}{'received B':>14}"
+    rows = [header, "-" * len(header)]
+    for r in results:
+        rows.append(f"{r['size']:>6}  {r['step']:<20}{r['wall_time']:>9.2f}{r['total_requests']:>10}"
+                    f"{r['rate_limited']:>6}{r['bytes_in']:>14,}{r['bytes_out']:>14,}")
+    return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against a local fake Anthropic server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Synthetic corpus sizes, in docs/modules (default: 10 100 1000)")
+    parser.add_argument("--workers", type=int, default=8, help="create_modules --workers (default: 8)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Results JSON file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic workspaces for inspection")
+    parser.add_argument("--verbose", action="store_true", help="Show each step's own output")
+    add_server_arguments(parser)
+    parser.set_defaults(batch_delay=0.0)
+    args = parser.parse_args()
+
+    results = []
+    with FakeAnthropicServer(state_from_args(args)) as server:
+        print(f"Fake Anthropic API on {server.url}")
+        for size in args.sizes:
+            results.extend(run_size(server, size, args.workers, args.keep, args.verbose))
+
+    print("\n" + render_table(results))
+    output = {
+        "server": {key: getattr(args, key) for key in
+                   ("latency", "jitter", "rpm", "tpm", "failure_rate", "batch_delay", "output_words")},
+        "workers": args.workers,
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(output, indent=2), encoding="utf-8")
+    print(f"\nResults written to {args.output}")
+    return 1 if any(r["returncode"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
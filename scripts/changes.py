@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Detect source doc changes over a commit range with GitPython.
+Produces hunk-level unified diffs annotated with the heading they fall
+under, which analyze_impact and generate_enablement send instead of full
+file contents.
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+from sections import PROJECT_ROOT, SOURCE_DIR_NAME, section_at_line, split_sections
+
+DEFAULT_PATHS = [SOURCE_DIR_NAME]
+CONTEXT_LINES = 3
+NULL_SHA = "0" * 40
+
+HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+
+def resolve_base(repo, base: str | None, head: str) -> str | None:
+    """
+    Resolve the base of the range.
+
+    A missing or all-zero base (a new branch push) falls back to the parent
+    of head; a root commit has no base (None) and diffs against the empty
+    tree.
+    """
+    if base and base != NULL_SHA:
+        return base
+    head_commit = repo.commit(head)
+    if head_commit.parents:
+        return head_commit.parents[0].hexsha
+    return None
+
+
+def blob_text(commit, path: str) -> str:
+    """Text of a file at a commit, or an empty string if it does not exist there."""
+    if commit is None:
+        return ""
+    try:
+        return (commit.tree / path).data_stream.read().decode("utf-8", errors="replace")
+    except KeyError:
+        return ""
+
+
+def change_type(diff) -> str:
+    """A/D/R/M change letter (GitPython leaves change_type unset for patches)."""
+    if diff.new_file:
+        return "A"
+    if diff.deleted_file:
+        return "D"
+    if diff.renamed_file:
+        return "R"
+    return "M"
+
+
+def split_hunks(patch: str) -> list[str]:
+    """Split a patch body into hunks, each starting with its @@ header."""
+    hunks = []
+    current: list[str] = []
+    for line in patch.splitlines():
+        if line.startswith("@@"):
+            if current:
+                hunks.append("\n".join(current))
+            current = [line]
+        elif current:
+            current.append(line)
+    if current:
+        hunks.append("\n".join(current))
+    return hunks
+
+
+def changed_line_ranges(hunk: str) -> tuple[tuple[int, int], tuple[int, int]]:
+    """
+    Old- and new-file (first, last) line ranges touched by a hunk's added
+    and removed lines. A removal maps to the new-file line it sits before.
+    """
+    lines = hunk.splitlines()
+    match = HUNK_HEADER_RE.match(lines[0])
+    old_line, new_line = (int(match.group(1)), int(match.group(2))) if match else (1, 1)
+    old_touched, new_touched = [], []
+    for line in lines[1:]:
+        if line.startswith("+"):
+            new_touched.append(new_line)
+            new_line += 1
+        elif line.startswith("-"):
+            old_touched.append(old_line)
+            new_touched.append(new_line)
+            old_line += 1
+        elif not line.startswith("\\"):
+            old_line += 1
+            new_line += 1
+    old_range = (min(old_touched), max(old_touched)) if old_touched else (old_line, old_line)
+    new_range = (min(new_touched), max(new_touched)) if new_touched else (new_line, new_line)
+    return old_range, new_range
+
+
+def sections_in_range(sections: list[dict], first: int, last: int) -> list[dict]:
+    """Sections overlapping a 1-based inclusive line range."""
+    start = section_at_line(sections, first)
+    found = [start] if start else []
+    found.extend(s for s in sections if first < s["line"] <= last and s is not start)
+    return found
+
+
+def annotate_hunks(patch: str, old_text: str, new_text: str) -> list[dict]:
+    """
+    Pair each hunk with the heading paths it changes.
+
+    'section' is the heading the first change falls under (new side, or the
+    old side for pure deletions); 'sections' lists every heading path the
+    changed lines span.
+    """
+    new_sections = split_sections(new_text) if new_text else []
+    old_sections = split_sections(old_text) if old_text else []
+    hunks = []
+    for hunk in split_hunks(patch):
+        old_range, new_range = changed_line_ranges(hunk)
+        touched = sections_in_range(new_sections, *new_range) or sections_in_range(old_sections, *old_range)
+        hunks.append({
+            "section": touched[0]["anchor"] if touched else "",
+            "sections": [s["anchor"] for s in touched],
+            "diff": hunk,
+        })
+    return hunks
+
+
+def detect_changes(
+    base: str | None = None,
+    head: str = "HEAD",
+    paths: list[str] | None = None,
+    repo_path: Path = PROJECT_ROOT,
+) -> list[dict]:
+    """
+    Changed markdown files between two commits, with hunk-level diffs.
+
+    Returns [{'path', 'change_type', 'hunks': [{'section', 'sections', 'diff'}]}]
+    sorted by path. Renamed files are reported under their new path.
+    """
+    # Imported here so that commands which only load a changes file skip GitPython
+    from git import NULL_TREE, Repo
+
+    repo = Repo(repo_path)
+    head_commit = repo.commit(head)
+    base_ref = resolve_base(repo, base, head)
+    base_commit = repo.commit(base_ref) if base_ref else None
+
+    diff_options = {"paths": paths or DEFAULT_PATHS, "create_patch": True, "unified": CONTEXT_LINES}
+    if base_commit is None:
+        # Root commit: everything is an addition relative to the empty tree
+        diffs = head_commit.diff(NULL_TREE, **diff_options)
+    else:
+        diffs = base_commit.diff(head_commit, **diff_options)
+
+    changes = []
+    for diff in diffs:
+        path = diff.b_path or diff.a_path
+        if not path.endswith(".md"):
+            continue
+        patch = diff.diff.decode("utf-8", errors="replace") if isinstance(diff.diff, bytes) else diff.diff
+        old_text = blob_text(base_commit, diff.a_path) if diff.a_path else ""
+        new_text = blob_text(head_commit, diff.b_path) if diff.b_path else ""
+        changes.append({
+            "path": path,
+            "change_type": change_type(diff),
+            "hunks": annotate_hunks(patch, old_text, new_text),
+        })
+    return sorted(changes, key=lambda c: c["path"])
+
+
+def load_changes(path: str) -> list[dict]:
+    """Load a changes file written by this script."""
+    return json.loads(Path(path).read_text(encoding="utf-8"))["changes"]
+
+
+def render_changes(changes: list[dict]) -> str:
+    """Render hunk-level changes as markdown with heading context for prompts."""
+    blocks = []
+    for change in changes:
+        parts = [f"### {change['path']} ({change['change_type']})"]
+        for hunk in change["hunks"]:
+            parts.append(f"#### [{hunk['section']}]\n```diff\n{hunk['diff']}\n```")
+        blocks.append("\n\n".join(parts))
+    return "\n\n".join(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect source doc changes over a commit range")
+    parser.add_argument("--base", help="Base commit (default: parent of --head)")
+    parser.add_argument("--head", default="HEAD", help="Head commit (default: HEAD)")
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS, help=f"Paths to diff (default: {SOURCE_DIR_NAME})")
+    parser.add_argument("--output", required=True, help="Output JSON file path")
+    parser.add_argument("--print-names", action="store_true",
+                        help="Print only the space-separated changed paths (for shell capture)")
+    args = parser.parse_args()
+
+    changes = detect_changes(args.base, args.head, args.paths)
+    output_path = Path(args.output)
+    if not output_path.is_absolute():
+        output_path = PROJECT_ROOT / output_path
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps({"base": args.base, "head": args.head, "changes": changes}, indent=2),
+                           encoding="utf-8")
+
+    if args.print_names:
+        print(" ".join(c["path"] for c in changes))
+        return
+
+    print(f"Changes written to {output_path}")
+    for change in changes:
+        print(f"  - {change['path']} ({change['change_type']}): {len(change['hunks'])} hunk(s)")
+
+
+if __name__ == "__main__":
+    main()
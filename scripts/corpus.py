@@ -0,0 +1,101 @@
+# scripts/corpus.py
+"""
+Deterministic builder for the cached source-documentation system blocks.
+Identical inputs always produce byte-identical blocks, so the prompt cache
+is only missed when the documentation actually changes.
+"""
+
+from pathlib import Path
+
+from sections import PROJECT_ROOT, SOURCE_DIR
+
+CORPUS_HEADER = "# Source Documentation Library\n\n"
+DOC_SEPARATOR = "\n\n---\n\n"
+
+# The API allows four cache breakpoints per request; the corpus uses three
+# and leaves one for callers.
+MAX_CORPUS_BREAKPOINTS = 3
+
+
+def normalize_document(text: str) -> str:
+    """Normalize line endings and trailing whitespace, ending with one newline."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n") + "\n"
+
+
+def corpus_label(path: Path) -> str:
+    """Stable label for a document: project-relative POSIX path when possible."""
+    resolved = Path(path).resolve()
+    try:
+        return resolved.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return resolved.as_posix()
+
+
+def find_source_docs(source_dir: Path | str = SOURCE_DIR) -> list[Path]:
+    """Every markdown file under a directory, in sorted order."""
+    return sorted(Path(source_dir).rglob("*.md"), key=corpus_label)
+
+
+def breakpoint_indexes(sizes: list[int], max_breakpoints: int = MAX_CORPUS_BREAKPOINTS) -> set[int]:
+    """
+    Choose which documents end a cached segment.
+
+    The corpus is cut into at most max_breakpoints segments of roughly equal
+    size. The last document always ends a segment, so the whole corpus is
+    cached; earlier cuts mean a change to a later document still reuses the
+    cached prefix up to the previous cut.
+    """
+    if not sizes:
+        return set()
+    total = sum(sizes)
+    segments = min(max_breakpoints, len(sizes))
+    indexes = {len(sizes) - 1}
+    running = 0
+    next_cut = 1
+    for i, size in enumerate(sizes[:-1]):
+        running += size
+        if next_cut < segments and running >= total * next_cut / segments:
+            indexes.add(i)
+            next_cut += 1
+    return indexes
+
+
+def build_corpus_blocks(paths: list[Path | str]) -> list[dict]:
+    """
+    Build the source-documentation system blocks for a set of files.
+
+    Files are sorted by label, read with normalized line endings and joined
+    with a fixed separator; each file is one text block and up to
+    MAX_CORPUS_BREAKPOINTS of them carry cache_control. Missing or
+    unreadable files are reported and skipped.
+    """
+    documents = {}
+    for path in paths:
+        try:
+            documents[corpus_label(path)] = Path(path).read_text(encoding="utf-8")
+        except (FileNotFoundError, OSError) as e:
+            print(f"⚠ Warning: {path} could not be read, skipping ({e})")
+    return corpus_blocks(documents)
+
+
+def corpus_blocks(documents: dict[str, str]) -> list[dict]:
+    """Corpus system blocks for {label: text} documents already in memory."""
+    if not documents:
+        return []
+
+    docs = [f"## {label}\n\n{normalize_document(documents[label])}" for label in sorted(documents)]
+    texts = [CORPUS_HEADER + docs[0]] + [DOC_SEPARATOR + doc for doc in docs[1:]]
+    cuts = breakpoint_indexes([len(t) for t in texts])
+    blocks = []
+    for i, text in enumerate(texts):
+        block = {"type": "text", "text": text}
+        if i in cuts:
+            block["cache_control"] = {"type": "ephemeral"}
+        blocks.append(block)
+    return blocks
+
+
+def corpus_size(blocks: list[dict]) -> int:
+    """Total characters across corpus blocks."""
+    return sum(len(block["text"]) for block in blocks)
@@ -0,0 +1,253 @@
+# scripts/corpus_store.py
+"""
+Memory-mapped store for source docs and modules with a persisted index.
+
+The index records each file's size, mtime, content hash and the byte
+offsets of its heading-delimited sections, so unchanged files are never
+re-read and sections are decoded one at a time, on demand. Peak memory
+follows the largest section touched, not the size of the corpus.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from pathlib import Path
+
+from corpus import corpus_label
+from sections import ANCHOR_SEPARATOR, CACHE_DIR, FENCE_RE, HEADING_RE, PREAMBLE, PROJECT_ROOT, content_hash
+
+STORE_INDEX_PATH = CACHE_DIR / "corpus-index.json"
+STORE_VERSION = 1
+
+# Section metadata kept in the index; 'content' is only ever read lazily
+SECTION_FIELDS = ("anchor", "heading", "level", "line", "start", "end", "hash")
+
+
+def _open_map(path: Path):
+    """Memory-map a file read-only; None for an empty file."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _decode_section(data: bytes, last: bool) -> str:
+    """
+    Section text as split_sections produces it: CRLF normalized and, except
+    for the file's final section, without the newline that ends it.
+    """
+    text = data.decode("utf-8").replace("\r\n", "\n")
+    return text if last or not text.endswith("\n") else text[:-1]
+
+
+def scan_sections(mm) -> tuple[str, list[dict]]:
+    """
+    Walk a mapped file line by line and return (file hash, section index).
+
+    Sections match sections.split_sections (same anchors, levels, lines and
+    hashes) but carry byte offsets instead of content.
+    """
+    digest = hashlib.sha256()
+    sections = []
+    stack: list[tuple[int, str]] = []
+    current = {"heading": PREAMBLE, "level": 0, "path": [PREAMBLE], "line": 1, "start": 0}
+    in_fence = False
+
+    def flush(section, end, last):
+        body = _decode_section(mm[section["start"]:end], last) if end > section["start"] else ""
+        if section["level"] == 0 and not body.strip():
+            return
+        sections.append({
+            "anchor": ANCHOR_SEPARATOR.join(section["path"]),
+            "heading": section["heading"],
+            "level": section["level"],
+            "line": section["line"],
+            "start": section["start"],
+            "end": end,
+            "hash": content_hash(body),
+        })
+
+    position = 0
+    number = 0
+    size = len(mm)
+    while position < size:
+        newline = mm.find(b"\n", position)
+        end = size if newline == -1 else newline + 1
+        raw = mm[position:end]
+        digest.update(raw)
+        number += 1
+        line = raw.decode("utf-8").rstrip("\n")
+        if line.endswith("\r"):
+            line = line[:-1]
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line)
+        if match:
+            flush(current, position, False)
+            level, heading = len(match.group(1)), match.group(2)
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, heading))
+            current = {"heading": heading, "level": level, "path": [h for _, h in stack],
+                       "line": number, "start": position}
+        position = end
+    flush(current, size, True)
+
+    seen: dict[str, int] = {}
+    for section in sections:
+        count = seen.get(section["anchor"], 0) + 1
+        seen[section["anchor"]] = count
+        if count > 1:
+            section["anchor"] = f"{section['anchor']} [{count}]"
+    return digest.hexdigest()[:16], sections
+
+
+class StoredSections:
+    """
+    Lazy, re-iterable view of one file's sections.
+
+    Iterating yields split_sections-style dicts (with 'content'), decoding
+    each section from the mapped file as it is reached; len() and
+    metadata() never touch the file.
+    """
+
+    def __init__(self, store: "CorpusStore", label: str):
+        self.store = store
+        self.label = label
+
+    def metadata(self) -> list[dict]:
+        return self.store.entry(self.label)["sections"] if self.store.entry(self.label) else []
+
+    def __len__(self) -> int:
+        return len(self.metadata())
+
+    def __iter__(self):
+        return self.store.iter_sections(self.label)
+
+
+def section_index(sections) -> list[dict]:
+    """
+    Section metadata (anchor, heading, level, hash, ...) without reading any
+    content: a StoredSections' index entries, or a plain list as is.
+    """
+    return sections.metadata() if isinstance(sections, StoredSections) else sections
+
+
+class CorpusStore:
+    """
+    Persisted index of {label: {"size", "mtime_ns", "hash", "sections"}}.
+
+    refresh() stats the given files and rescans only those whose size or
+    mtime changed. Labels are project-relative paths, as in corpus.py.
+    Safe to read from worker threads.
+    """
+
+    def __init__(self, path: Path = STORE_INDEX_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            data = {}
+        self.files: dict[str, dict] = data.get("files", {}) if data.get("version") == STORE_VERSION else {}
+
+    def save(self) -> None:
+        """Persist the index atomically, streaming it to disk."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": STORE_VERSION, "files": self.files}, f, sort_keys=True)
+            tmp_path.replace(self.path)
+
+    def entry(self, label: str) -> dict | None:
+        return self.files.get(label)
+
+    def refresh(self, paths, prune: Path | str | None = None) -> list[str]:
+        """
+        Bring the index up to date for `paths`; returns the labels that were
+        added, rescanned or removed. With `prune`, indexed files under that
+        directory that are not in `paths` are removed too. Unreadable files
+        are reported and dropped.
+        """
+        changed = []
+        labels = set()
+        for path in paths:
+            label = corpus_label(path)
+            labels.add(label)
+            try:
+                st = os.stat(PROJECT_ROOT / label)
+            except OSError:
+                if self.files.pop(label, None) is not None:
+                    changed.append(label)
+                continue
+            entry = self.files.get(label)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                continue
+            try:
+                mm = _open_map(PROJECT_ROOT / label)
+                try:
+                    digest, sections = scan_sections(mm) if mm is not None else (hashlib.sha256().hexdigest()[:16], [])
+                finally:
+                    if mm is not None:
+                        mm.close()
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"⚠ Warning: {label} could not be read, skipping ({e})")
+                self.files.pop(label, None)
+                continue
+            with self._lock:
+                self.files[label] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest,
+                                     "sections": sections}
+            changed.append(label)
+        if prune is not None:
+            prefix = corpus_label(prune) + "/"
+            for label in set(self.files) - labels:
+                if label.startswith(prefix):
+                    del self.files[label]
+                    changed.append(label)
+        if changed:
+            self.save()
+        return sorted(changed)
+
+    def labels(self) -> list[str]:
+        return sorted(self.files)
+
+    def size(self, label: str) -> int:
+        return self.files[label]["size"]
+
+    def file_hash(self, label: str) -> str | None:
+        entry = self.files.get(label)
+        return entry["hash"] if entry else None
+
+    def sections(self, label: str) -> StoredSections:
+        return StoredSections(self, label)
+
+    def iter_sections(self, label: str):
+        """Yield one file's sections with their content, one at a time."""
+        entry = self.files.get(label)
+        if not entry or not entry["sections"]:
+            return
+        mm = _open_map(PROJECT_ROOT / label)
+        if mm is None:
+            return
+        try:
+            last = len(entry["sections"]) - 1
+            for i, section in enumerate(entry["sections"]):
+                content = _decode_section(mm[section["start"]:section["end"]], i == last)
+                yield {**section, "content": content}
+        finally:
+            mm.close()
+
+    def section_text(self, label: str, section: dict) -> str:
+        """Content of one indexed section."""
+        entry = self.files[label]
+        last = section is entry["sections"][-1] or section["end"] >= entry["size"]
+        with open(PROJECT_ROOT / label, "rb") as f:
+            f.seek(section["start"])
+            return _decode_section(f.read(section["end"] - section["start"]), last)
+
+    def read_text(self, label: str) -> str:
+        """A whole file's text, e.g. when it is sent in full."""
+        return (PROJECT_ROOT / label).read_text(encoding="utf-8")
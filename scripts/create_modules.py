@@ -6,49 +6,58 @@ Used for initial module generation, not updates.
 
 import os
 import json
-from anthropic import Anthropic
-from dotenv import load_dotenv
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import argparse
 
-load_dotenv()
+from response_cache import add_cache_arguments, cache_from_args, create_message, stream_message
+from rate_limit import rate_limiter
+from api_client import client
+from corpus import find_source_docs
+from batch_jobs import message_text, run_batch, resume_batches
+from manifest import (BUILDERS, MODULES_DIR, BuildManifest, add_plan_arguments, existing_modules,
+                      load_source_sections, module_output_path, stale_reasons)
+from telemetry import BudgetExceededError, add_metrics_arguments, finish_run
+from retrieval import load_specs, spec_for_module, spec_text
+from source_selection import DEFAULT_SOURCE_TOKENS, SourceSelector, add_source_arguments, group_by_slice
+from patches import PatchError, apply_edits, parse_edits
+from validate_modules import (ModuleValidationError, format_issues, gate_issues, make_gate, make_repair_renderer,
+                              make_resume_renderer, repair_mapping, repair_params)
 
-client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+# Continuation requests allowed when a module is cut off at max_tokens
+MAX_CONTINUATIONS = 3
 
 def load_source_docs(source_files):
-    """Load specified source documentation files."""
-    docs_content = "# Source Documentation\n\n"
-    
-    for filepath in source_files:
-        if not os.path.exists(filepath):
-            print(f"⚠ Warning: {filepath} not found, skipping")
-            continue
-            
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-                docs_content += f"## {filepath}\n\n{content}\n\n---\n\n"
-        except Exception as e:
-            print(f"Error loading {filepath}: {e}")
-    
-    return docs_content
+    """Load specified source documentation files for per-module slicing."""
+    print("Loading source documentation...")
+    selector = SourceSelector.from_paths(source_files)
+    print(f"✓ Loaded {selector.characters} characters from {len(selector.labels)} source files\n")
+    return selector
 
-def create_module(module_spec, source_docs, output_dir='enablement-modules'):
+def slice_specs(modules, selector, source_tokens=DEFAULT_SOURCE_TOKENS):
     """
-    Create a single enablement module based on specifications.
-    
-    Args:
-        module_spec: Dict with 'filename', 'title', and 'description'
-        source_docs: String containing all source documentation
-        output_dir: Directory to save the module
+    Group specs by the source slice their title, description and tags
+    select; returns [(selection, [specs])].
     """
+    groups = group_by_slice(modules, [spec_text(spec) for spec in modules], selector, source_tokens)
+    sizes = [selector.selection_size(selection) for selection, _ in groups]
+    if sizes:
+        print(f"✓ {len(groups)} source slice(s) for {len(modules)} module(s), "
+              f"{min(sizes)}-{max(sizes)} of {selector.characters} characters\n")
+    return groups
+
+def build_module_request(module_spec, source_docs):
+    """Build the messages.create params for generating one module."""
     
+    target = (f"\n**Target Length**: about {module_spec['estimated_word_count']} words"
+              if module_spec.get('estimated_word_count') else "")
     prompt = f"""You are creating technical enablement content for live instructor-led training sessions.
 
 ## Module Specifications
 
 **Filename**: {module_spec['filename']}
 **Module Title**: {module_spec['title']}
-**Coverage**: {module_spec['description']}
+**Coverage**: {module_spec['description']}{target}
 
 ## Your Task
 
@@ -78,75 +87,362 @@ Create a comprehensive enablement module that will be:
 - Anticipate common questions learners might ask
 - Keep technical accuracy while maintaining accessibility
 - Use markdown formatting for clarity
+- Use the structure requirements above as `##` section headings and nest headings no deeper than `####`
 
 Create the complete module content now."""
 
+    return {
+        "model": BUILDERS["create"]["model"],
+        "max_tokens": 8000,
+        "system": [
+            {
+                "type": "text",
+                "text": "You are an expert instructional designer specializing in technical enablement for enterprise software."
+            },
+            *source_docs
+        ],
+        "messages": [{
+            "role": "user",
+            "content": prompt
+        }]
+    }
+
+def continuation_params(params, partial_text):
+    """
+    Params that continue a response cut off at max_tokens.
+    
+    The system blocks are unchanged, so the cached corpus prefix is reused;
+    the text so far is sent as an assistant prefill (which may not end in
+    whitespace).
+    """
+    return {
+        **params,
+        "messages": [*params["messages"], {"role": "assistant", "content": partial_text.rstrip()}]
+    }
+
+def generate_module(params, output_path, cache=None, limiter=None, label="", stream=False, check=None):
+    """
+    Generate a module into output_path, continuing past max_tokens.
+    
+    Text goes to <output_path>.partial as it arrives (chunk by chunk with
+    stream=True) and is renamed into place only once the response ends
+    normally, so a failed or truncated run never leaves a half-written
+    module behind. check(text), if given, runs on the complete text before
+    the rename and returns the text to write (or raises to reject it).
+    """
+    partial_path = f"{output_path}.partial"
+    text = ""
+    request = params
+    try:
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            def write(chunk):
+                f.write(chunk)
+                f.flush()
+            
+            for attempt in range(MAX_CONTINUATIONS + 1):
+                if stream:
+                    response = stream_message(client, request, write, cache, limiter, label=label)
+                else:
+                    response = create_message(client, request, cache, limiter, label=label)
+                    write(message_text(response))
+                text += message_text(response)
+                if response.stop_reason != "max_tokens":
+                    break
+                if attempt < MAX_CONTINUATIONS:
+                    print(f"  {label} hit max_tokens, continuing ({attempt + 1}/{MAX_CONTINUATIONS})...")
+                    request = continuation_params(params, text)
+            else:
+                raise RuntimeError(f"still truncated after {MAX_CONTINUATIONS} continuations")
+        if check is not None:
+            checked = check(text)
+            if checked != text:
+                with open(partial_path, 'w', encoding='utf-8') as f:
+                    f.write(checked)
+                text = checked
+        os.replace(partial_path, output_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return text
+
+def make_repair_check(params, module_spec, output_path, cache=None, limiter=None):
+    """
+    A generate_module check that validates a module before it is written.
+    A failing module gets one repair request for section edits covering
+    just its problems; ModuleValidationError is raised if that does not fix it.
+    """
+    def check(text):
+        issues = gate_issues(text, module_spec, output_path, template="create")
+        if not issues:
+            return text
+        print(f"  {module_spec['filename']} failed validation, repairing: {format_issues(issues)}")
+        response = create_message(client, repair_params(params, text, issues), cache, limiter,
+                                  label=f"{module_spec['filename']} repair")
+        try:
+            repaired = apply_edits(text, parse_edits(message_text(response)))
+        except PatchError as e:
+            raise ModuleValidationError(output_path, issues) from e
+        remaining = gate_issues(repaired, module_spec, output_path, template="create")
+        if remaining:
+            raise ModuleValidationError(output_path, remaining)
+        return repaired
+    return check
+
+def create_module(module_spec, source_docs, output_dir=MODULES_DIR, cache=None, limiter=None, stream=False,
+                  existing=None):
+    """
+    Create a single enablement module based on specifications.
+    
+    The module is validated before it is written and repaired once if it
+    fails (see validate_modules.py).
+    
+    Args:
+        module_spec: Dict with 'filename', 'title', and 'description'
+        source_docs: Source documentation system blocks (the module's slice)
+        output_dir: Directory to save the module
+        cache: Optional ResponseCache; identical requests are served from disk
+        limiter: RateLimiter shared between concurrent calls (default: the process-wide one)
+        stream: Stream the response to disk as it is generated
+        existing: existing_modules(output_dir), when creating many modules
+    
+    API, validation and truncation errors are reported and the module is
+    skipped (returns None); BudgetExceededError is raised to stop the run.
+    """
+    from anthropic import APIError
+    
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=8000,
-            system=[
-                {
-                    "type": "text",
-                    "text": "You are an expert instructional designer specializing in technical enablement for enterprise software."
-                },
-                {
-                    "type": "text",
-                    "text": source_docs,
-                    "cache_control": {"type": "ephemeral"}
-                }
-            ],
-            messages=[{
-                "role": "user",
-                "content": prompt
-            }]
-        )
-        
-        # Extract content
-        content = ""
-        for block in response.content:
-            if block.type == "text":
-                content += block.text
-        
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
         
-        # Save module
-        output_path = os.path.join(output_dir, module_spec['filename'])
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Save module (over the existing, possibly versioned, file for this spec)
+        output_path = module_output_path(module_spec, output_dir, existing)
+        params = build_module_request(module_spec, source_docs)
+        generate_module(params, output_path, cache, limiter, label=module_spec['filename'], stream=stream,
+                        check=make_repair_check(params, module_spec, output_path, cache, limiter))
         
         print(f"✓ Created: {output_path}")
         return output_path
         
-    except Exception as e:
+    except BudgetExceededError:
+        raise
+    except (APIError, ModuleValidationError, RuntimeError) as e:
         print(f"✗ Error creating {module_spec['filename']}: {e}")
         return None
 
-def create_modules_from_specs(specs_file, source_files):
-    """Create multiple modules from a specifications file."""
+def select_stale_specs(modules, manifest, source_sections, output_dir=MODULES_DIR):
+    """Keep the specs whose modules the build manifest says are stale."""
+    existing = existing_modules(output_dir)
+    stale = [
+        spec for spec in modules
+        if stale_reasons(manifest, module_output_path(spec, output_dir, existing), spec, source_sections)
+    ]
+    if len(stale) < len(modules):
+        print(f"✓ {len(modules) - len(stale)} module(s) up to date per {manifest.path.name}, skipping (use --force to rebuild)")
+    return stale
+
+def create_modules_from_specs(specs_file, source_files, cache=None, workers=1, limiter=None, force=False,
+                              stream=False, source_tokens=DEFAULT_SOURCE_TOKENS):
+    """
+    Create multiple modules from a specifications file.
+    
+    Only modules the build manifest reports as stale are built, unless
+    force is set; every module written is recorded in the manifest.
+    
+    Each module gets the slice of the source docs relevant to its spec
+    (within source_tokens), and modules sharing a slice are generated
+    together. With workers > 1, the first module of each slice is generated
+    before the rest of that slice to write the prompt cache for its
+    source_docs blocks, then the rest run in a thread pool of that size,
+    sharing one rate limiter.
+    
+    If the spend budget runs out, the modules written so far are recorded
+    and BudgetExceededError is raised.
+    """
     
     # Load module specifications
     with open(specs_file, 'r') as f:
         specs = json.load(f)
     
-    # Load source documentation (with caching)
-    print("Loading source documentation...")
-    source_docs = load_source_docs(source_files)
-    print(f"✓ Loaded {len(source_docs)} characters from {len(source_files)} source files\n")
+    selector = load_source_docs(source_files)
     
-    # Create each module
-    created_modules = []
-    for i, module_spec in enumerate(specs['modules'], 1):
-        print(f"Creating module {i}/{len(specs['modules'])}: {module_spec['title']}...")
-        output_path = create_module(module_spec, source_docs)
+    manifest = BuildManifest()
+    source_sections = load_source_sections(source_files)
+    stale = specs['modules'] if force else select_stale_specs(specs['modules'], manifest, source_sections)
+    if not stale:
+        return []
+    groups = slice_specs(stale, selector, source_tokens)
+    modules = [spec for _, group in groups for spec in group]
+    selection_for = {id(spec): selection for selection, group in groups for spec in group}
+    total = len(modules)
+    existing = existing_modules(MODULES_DIR)
+    
+    def build(i, module_spec):
+        print(f"Creating module {i}/{total}: {module_spec['title']}...")
+        start = time.time()
+        source_docs = selector.blocks(selection_for[id(module_spec)])
+        output_path = create_module(module_spec, source_docs, cache=cache, limiter=limiter, stream=stream,
+                                    existing=existing)
         if output_path:
-            created_modules.append(output_path)
-        print()
+            manifest.record(output_path, "create", module_spec, source_sections)
+        status = "done" if output_path else "failed"
+        print(f"  [{i}/{total}] {module_spec['filename']} {status} in {time.time() - start:.1f}s")
+        return output_path
+    
+    created_modules = []
+    failed = []
+    try:
+        if workers <= 1 or total <= 1:
+            for i, module_spec in enumerate(modules, 1):
+                output_path = build(i, module_spec)
+                if output_path:
+                    created_modules.append(output_path)
+                else:
+                    failed.append(module_spec['filename'])
+                print()
+        else:
+            # Warm the prompt cache with one request per slice before fanning out
+            numbered = list(enumerate(modules, 1))
+            leaders = {id(group[0]) for _, group in groups}
+            warmers = [(i, spec) for i, spec in numbered if id(spec) in leaders]
+            followers = [(i, spec) for i, spec in numbered if id(spec) not in leaders]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for wave in (warmers, followers):
+                    futures = {pool.submit(build, i, module_spec): module_spec for i, module_spec in wave}
+                    for future in as_completed(futures):
+                        output_path = future.result()
+                        if output_path:
+                            created_modules.append(output_path)
+                        else:
+                            failed.append(futures[future]['filename'])
+    finally:
+        # Record what was written even if the spend budget stops the run
+        manifest.save()
+    if failed:
+        print(f"✗ {len(failed)} module(s) failed: {', '.join(failed)}")
     
     return created_modules
 
-def interactive_mode(source_files):
+def create_modules_batch(specs_file, source_files, cache=None, output_dir=MODULES_DIR, timeout=86400,
+                         force=False, source_tokens=DEFAULT_SOURCE_TOKENS):
+    """
+    Create every stale module in a specifications file as one Message Batch.
+    
+    Batch requests are billed at half price and nothing holds an HTTP
+    connection open while they run, so this suits large overnight builds.
+    Each request carries its module's source slice, as in
+    create_modules_from_specs. Results are validated before they are
+    written, and only the failing ones go into a second batch of repairs.
+    
+    Returns (created module paths, complete).
+    """
+    
+    with open(specs_file, 'r') as f:
+        specs = json.load(f)
+    
+    selector = load_source_docs(source_files)
+    
+    manifest = BuildManifest()
+    source_sections = load_source_sections(source_files)
+    stale = specs['modules'] if force else select_stale_specs(specs['modules'], manifest, source_sections, output_dir)
+    if not stale:
+        return [], True
+    groups = slice_specs(stale, selector, source_tokens)
+    modules = [(selection, spec) for selection, group in groups for spec in group]
+    existing = existing_modules(output_dir)
+    
+    request_mapping = [
+        {
+            "request": {
+                "custom_id": f"module-create-{i}",
+                "params": build_module_request(module_spec, selector.blocks(selection))
+            },
+            "module_path": module_output_path(module_spec, output_dir, existing)
+        }
+        for i, (selection, module_spec) in enumerate(modules)
+    ]
+    print(f"✓ Created {len(request_mapping)} module requests")
+    
+    specs_by_path = {req["module_path"]: spec for req, (_, spec) in zip(request_mapping, modules)}
+    rejected = []
+    created, complete = run_batch(client, request_mapping, cache, timeout,
+                                  render=make_gate(rejected, specs_by_path.get, template="create"))
+    try:
+        if rejected:
+            print(f"\nRe-queuing {len(rejected)} module(s) that failed validation as section repairs...")
+            unrepaired = []
+            repairs = [repair_mapping(req, draft, issues) for req, draft, issues in rejected]
+            repaired, repaired_complete = run_batch(client, repairs, cache, timeout,
+                                                    render=make_repair_renderer(unrepaired, specs_by_path.get,
+                                                                                template="create"))
+            created += repaired
+            complete = complete and repaired_complete
+            if unrepaired:
+                print(f"✗ {len(unrepaired)} module(s) still fail validation and were not written")
+    finally:
+        # Record what was written even if the spend budget stops the repairs
+        for path in created:
+            manifest.record(path, "create", specs_by_path.get(path), source_sections)
+        manifest.save()
+    return created, complete
+
+def resume_create(specs_file=None, source_files=None, cache=None, timeout=86400,
+                  source_tokens=DEFAULT_SOURCE_TOKENS):
+    """
+    Reattach to the unfinished batches in the job ledger and finish them
+    like create_modules_batch: results are validated, failing drafts go
+    into a batch of repairs (repairs submitted before the restart are
+    applied to the draft kept in the ledger) and every module written is
+    recorded in the build manifest. Specs and source files default to the
+    plugin specs and the source docs library.
+    
+    Returns (created module paths, complete).
+    """
+    if specs_file:
+        with open(specs_file, 'r') as f:
+            specs = json.load(f)['modules']
+    else:
+        specs = load_specs()
+    source_files = source_files or find_source_docs()
+    spec_for = lambda path: spec_for_module(path, specs)
+    
+    manifest = BuildManifest()
+    source_sections = load_source_sections(source_files)
+    rejected = []
+    unrepaired = []
+    render = make_resume_renderer(make_gate(rejected, spec_for, template="create"),
+                                  make_repair_renderer(unrepaired, spec_for, template="create"))
+    created, complete = resume_batches(client, cache, timeout, render=render)
+    try:
+        repairs = []
+        if rejected:
+            # The ledger keeps no params; rebuild each module's request to repair its draft
+            selector = load_source_docs(source_files)
+            for req, draft, issues in rejected:
+                module_spec = spec_for(req["module_path"])
+                if module_spec is None:
+                    print(f"✗ {req['module_path']} failed validation and has no spec to repair it from; not written")
+                    continue
+                params = build_module_request(
+                    module_spec, selector.blocks(selector.select(spec_text(module_spec), source_tokens)))
+                repairs.append(repair_mapping({**req, "request": {**req["request"], "params": params}}, draft, issues))
+        if repairs:
+            print(f"\nRe-queuing {len(repairs)} module(s) that failed validation as section repairs...")
+            repaired, repaired_complete = run_batch(client, repairs, cache, timeout,
+                                                    render=make_repair_renderer(unrepaired, spec_for,
+                                                                                template="create"))
+            created += repaired
+            complete = complete and repaired_complete
+        if unrepaired:
+            print(f"✗ {len(unrepaired)} module(s) still fail validation and were not written")
+    finally:
+        # Record what was written even if the spend budget stops the repairs
+        for path in created:
+            manifest.record(path, "create", spec_for(path), source_sections)
+        manifest.save()
+    return created, complete
+
+def interactive_mode(source_files, cache=None, workers=1, limiter=None):
     """Interactive mode - prompt user for module specifications."""
     
     print("\n=== Interactive Module Creation ===\n")
@@ -188,7 +484,7 @@ def interactive_mode(source_files):
     proceed = input("Proceed with creation? (y/n): ").strip().lower()
     
     if proceed == 'y':
-        created = create_modules_from_specs('module-specs-temp.json', source_files)
+        created = create_modules_from_specs('module-specs-temp.json', source_files, cache, workers, limiter)
         print(f"\n✓ Successfully created {len(created)} modules!")
         
         # Clean up temp file
@@ -208,28 +504,102 @@ Examples:
   
   # From a specifications file
   python scripts/create_modules.py --source source-docs/plugins.md --specs module-specs.json
+  
+  # Submit every spec as one discounted Message Batch
+  python scripts/create_modules.py --source source-docs/*.md --specs plugin-module-specs.json --batch
+  
+  # Generate four modules at a time
+  python scripts/create_modules.py --source source-docs/*.md --specs module-specs.json --workers 4
+  
+  # Only stale modules are rebuilt; --force regenerates every spec
+  python scripts/create_modules.py --source source-docs/*.md --specs plugin-module-specs.json --force
         """
     )
     
-    parser.add_argument('--source', nargs='+', required=True,
-                       help='Source documentation file(s) to use as reference')
+    parser.add_argument('--source', nargs='+',
+                       help='Source documentation file(s) to use as reference (required unless --resume)')
     parser.add_argument('--specs', 
                        help='JSON file with module specifications')
     parser.add_argument('--interactive', action='store_true',
                        help='Interactive mode - prompts for module specs')
+    parser.add_argument('--batch', action='store_true',
+                       help='Submit all specs as one Message Batch (50%% cheaper, asynchronous)')
+    parser.add_argument('--batch-timeout', type=int, default=86400,
+                       help='Seconds to wait for a --batch job to finish (default: 86400)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Reattach to unfinished batches in the job ledger and save their results '
+                            '(--specs and --source default to the plugin specs and source-docs/)')
+    parser.add_argument('--stream', action='store_true',
+                       help='Stream each module to <file>.partial as it is generated, renaming it into place when complete')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of modules to generate concurrently (default: 1)')
+    parser.add_argument('--rpm', type=int,
+                       help='Requests per minute cap (otherwise taken from rate-limit headers)')
+    parser.add_argument('--tpm', type=int,
+                       help='Input tokens per minute cap (otherwise taken from rate-limit headers)')
+    add_plan_arguments(parser)
+    add_source_arguments(parser)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
     
     args = parser.parse_args()
+    from dotenv import load_dotenv
+    load_dotenv()
+    cache = cache_from_args(args)
+    rate_limiter.configure(args.rpm, args.tpm)
+    limiter = rate_limiter
     
-    if args.interactive:
-        interactive_mode(args.source)
+    if args.resume:
+        try:
+            created, complete = resume_create(args.specs, args.source, cache, args.batch_timeout,
+                                              args.source_tokens)
+        except BudgetExceededError as e:
+            print(f"✗ Stopped: {e}")
+            finish_run(args)
+            return 1
+        print(f"\n✓ Successfully created {len(created)} modules!")
+        if not complete:
+            finish_run(args)
+            return 1
+    elif not args.source:
+        print("Error: --source is required")
+        parser.print_help()
+        return 1
+    elif args.interactive:
+        try:
+            interactive_mode(args.source, cache, args.workers, limiter)
+        except BudgetExceededError as e:
+            print(f"✗ Stopped: {e}")
+            finish_run(args)
+            return 1
+    elif args.specs and args.batch:
+        try:
+            created, complete = create_modules_batch(args.specs, args.source, cache, timeout=args.batch_timeout,
+                                                     force=args.force, source_tokens=args.source_tokens)
+        except BudgetExceededError as e:
+            print(f"✗ Stopped: {e}")
+            finish_run(args)
+            return 1
+        print(f"\n✓ Successfully created {len(created)} modules!")
+        if not complete:
+            finish_run(args)
+            return 1
     elif args.specs:
-        created = create_modules_from_specs(args.specs, args.source)
+        try:
+            created = create_modules_from_specs(args.specs, args.source, cache, args.workers, limiter, args.force,
+                                                args.stream, args.source_tokens)
+        except BudgetExceededError as e:
+            print(f"✗ Stopped: {e}")
+            finish_run(args)
+            return 1
         print(f"\n✓ Successfully created {len(created)} modules!")
     else:
         print("Error: Must specify either --interactive or --specs")
         parser.print_help()
         return 1
     
+    finish_run(args)
+    
     return 0
 
 if __name__ == '__main__':
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+One command line for every enablement script.
+
+    python scripts/enablement.py <command> [options]
+
+Each command runs the main() of the script it names, which is only
+imported once the command is chosen; `--help` on its own imports none of
+them. Scripts create their Anthropic client lazily (api_client.LazyClient),
+so offline commands such as `validate`, `manifest plan`, `analyze --mock`
+and any `--help` never import the SDK or need an API key. The scripts
+still run on their own as before.
+"""
+
+import importlib
+import sys
+
+# command: (module, summary)
+COMMANDS = {
+    "changes": ("changes", "Collect hunk-level diffs of the source docs over a commit range"),
+    "analyze": ("analyze_impact", "Find the modules affected by source doc changes"),
+    "generate": ("generate_enablement", "Update the modules in an impact analysis"),
+    "create": ("create_modules", "Create new modules from specs and source docs"),
+    "pipeline": ("pipeline", "Analyze and update in one process, once or in watch mode"),
+    "manifest": ("manifest", "Plan stale modules or record existing ones in the build manifest"),
+    "shared": ("shared_passages", "Report near-duplicate passages shared between modules"),
+    "validate": ("validate_modules", "Check modules offline for structure, length and links"),
+    "render": ("render_trainer", "Render the slide deck and facilitator guide"),
+    "workspace": ("workspace", "Run the pipeline for several products in parallel"),
+}
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = [f"  {name:<{width}}  {summary}" for name, (_, summary) in COMMANDS.items()]
+    return "\n".join([
+        "usage: enablement.py <command> [options]",
+        "",
+        "commands:",
+        *lines,
+        "",
+        "Run 'enablement.py <command> --help' for a command's options.",
+    ])
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    command, *rest = argv
+    if command not in COMMANDS:
+        print(f"enablement.py: unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+    module = importlib.import_module(COMMANDS[command][0])
+    # The script parses sys.argv itself; name it after the command in its usage line
+    sys.argv = [f"enablement.py {command}", *rest]
+    return module.main() or 0
+
+
+if __name__ == "__main__":
+    exit(main())
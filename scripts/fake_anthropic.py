@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic Messages API, for load testing and
+benchmarks without live API spend.
+
+Implements messages.create (plain and streaming) and the Message Batches
+lifecycle (create / retrieve / results), with configurable latency, rate
+limits, failure rate and batch processing delay. Point the scripts at it
+with ANTHROPIC_BASE_URL; the SDK's own retry and rate-limit handling is
+exercised against real HTTP responses.
+
+Responses are synthetic but shaped for each pipeline step: impact analysis
+prompts get an affected_modules JSON object, patch prompts get a section
+edit, and everything else gets a markdown module.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+CHARS_PER_TOKEN = 4
+DEFAULT_OUTPUT_WORDS = 400
+PRIORITIES = ("high", "medium", "low")
+
+CANDIDATE_RE = re.compile(r"^- (\S+\.md)$", re.MULTILINE)
+OUTLINE_RE = re.compile(r"^### \[(.+?)\]\n(.*?)(?=\n\n### \[|\Z)", re.MULTILINE | re.DOTALL)
+TITLE_RE = re.compile(r"\*\*Module Title\*\*: (.+)")
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def iso(moment: datetime | None) -> str | None:
+    return moment.isoformat().replace("+00:00", "Z") if moment else None
+
+
+def request_text(params: dict) -> str:
+    """The user-visible prompt text of a messages.create request."""
+    parts = []
+    for message in params.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+    return "\n".join(parts)
+
+
+def system_text(params: dict) -> str:
+    system = params.get("system") or ""
+    if isinstance(system, str):
+        return system
+    return "".join(block.get("text", "") for block in system if isinstance(block, dict))
+
+
+def filler(words: int, seed: str) -> str:
+    """Deterministic filler prose of roughly `words` words."""
+    rng = random.Random(seed)
+    vocabulary = ("plugin", "marketplace", "install", "configure", "command", "skill", "hook",
+                  "agent", "workflow", "manifest", "directory", "session", "team", "review")
+    sentences = []
+    count = 0
+    while count < words:
+        sentence = [rng.choice(vocabulary) for _ in range(rng.randint(6, 14))]
+        sentences.append(" ".join(sentence).capitalize() + ".")
+        count += len(sentence)
+    return " ".join(sentences)
+
+
+def fake_response_text(params: dict, output_words: int) -> str:
+    """A synthetic reply in the format the calling pipeline step asks for."""
+    prompt = request_text(params)
+    seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    if '"affected_modules"' in prompt:
+        modules = CANDIDATE_RE.findall(prompt.split("## Candidate Enablement Modules", 1)[-1])
+        return json.dumps({
+            "changed_files": [],
+            "affected_modules": [
+                {"module": module, "reason": "Synthetic impact from the fake API server",
+                 "priority": PRIORITIES[i % len(PRIORITIES)]}
+                for i, module in enumerate(modules)
+            ],
+        }, indent=2)
+
+    if '"edits"' in prompt:
+        match = OUTLINE_RE.search(prompt.split("Module Sections:", 1)[-1])
+        if not match:
+            return json.dumps({"edits": []})
+        anchor, content = match.group(1), match.group(2).strip()
+        return json.dumps({"edits": [{
+            "op": "replace",
+            "section": anchor,
+            "content": f"{content}\n\n{filler(output_words // 4, seed)}",
+        }]})
+
+    title = TITLE_RE.search(prompt)
+    title = title.group(1).strip() if title else "Updated Module"
+    body = filler(output_words, seed)
+    return (
+        f"# {title}\n\n## Learning Objectives\n\n- Explain the topic\n- Apply it in practice\n- Evaluate trade-offs\n\n"
+        f"## Overview\n\n{body}\n\n> **Instructor Note:** Pause for questions here.\n\n"
+        f"## Key Takeaways\n\n- Takeaway one\n- Takeaway two\n- Takeaway three\n\n"
+        f"## Additional Resources\n\n- Source documentation\n"
+    )
+
+
+class FakeAnthropicState:
+    """
+    Shared server state: configuration, rate-limit window, prompt cache
+    prefixes, batches and request statistics.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rpm: int | None = None,
+                 tpm: int | None = None, failure_rate: float = 0.0, batch_delay: float = 1.0,
+                 output_words: int = DEFAULT_OUTPUT_WORDS, stream_chunk_words: int = 20, seed: int | None = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rpm = rpm
+        self.tpm = tpm
+        self.failure_rate = failure_rate
+        self.batch_delay = batch_delay
+        self.output_words = output_words
+        self.stream_chunk_words = stream_chunk_words
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window: list[tuple[float, int]] = []
+        self.cached_prefixes: set[str] = set()
+        self.batches: dict[str, dict] = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.stats = {
+                "requests": {},
+                "bytes_in": 0,
+                "bytes_out": 0,
+                "rate_limited": 0,
+                "failures": 0,
+                "batch_requests": 0,
+            }
+
+    def snapshot_stats(self) -> dict:
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+
+    def count(self, endpoint: str, bytes_in: int) -> None:
+        with self.lock:
+            self.stats["requests"][endpoint] = self.stats["requests"].get(endpoint, 0) + 1
+            self.stats["bytes_in"] += bytes_in
+
+    def add_bytes_out(self, count: int) -> None:
+        with self.lock:
+            self.stats["bytes_out"] += count
+
+    def sleep_latency(self) -> None:
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            failed = self.failure_rate > 0 and self.random.random() < self.failure_rate
+            if failed:
+                self.stats["failures"] += 1
+            return failed
+
+    def admit(self, tokens: int) -> tuple[bool, dict, float]:
+        """
+        Check the one-minute sliding window. Returns (admitted, headers,
+        retry_after) where headers mirror the anthropic-ratelimit-* set.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.window = [(t, n) for t, n in self.window if now - t < 60]
+            used_requests = len(self.window)
+            used_tokens = sum(n for _, n in self.window)
+            over = (self.rpm is not None and used_requests + 1 > self.rpm) or (
+                self.tpm is not None and used_tokens + tokens > self.tpm and self.window
+            )
+            retry_after = 60 - (now - self.window[0][0]) if over and self.window else 0.0
+            if over:
+                self.stats["rate_limited"] += 1
+            else:
+                self.window.append((now, tokens))
+                used_requests += 1
+                used_tokens += tokens
+
+        reset = iso(utc_now() + timedelta(seconds=retry_after or 60))
+        headers = {}
+        if self.rpm is not None:
+            headers.update({
+                "anthropic-ratelimit-requests-limit": str(self.rpm),
+                "anthropic-ratelimit-requests-remaining": str(max(0, self.rpm - used_requests)),
+                "anthropic-ratelimit-requests-reset": reset,
+            })
+        if self.tpm is not None:
+            headers.update({
+                "anthropic-ratelimit-input-tokens-limit": str(self.tpm),
+                "anthropic-ratelimit-input-tokens-remaining": str(max(0, self.tpm - used_tokens)),
+                "anthropic-ratelimit-input-tokens-reset": reset,
+            })
+        return not over, headers, retry_after
+
+    def usage(self, params: dict, output_text: str) -> dict:
+        """Token usage with prompt caching simulated on the system prefix."""
+        system = system_text(params)
+        prompt_tokens = len(request_text(params)) // CHARS_PER_TOKEN + 1
+        system_tokens = len(system) // CHARS_PER_TOKEN
+        blocks = params.get("system") if isinstance(params.get("system"), list) else []
+        cached = any(isinstance(block, dict) and block.get("cache_control") for block in blocks)
+        usage = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": len(output_text) // CHARS_PER_TOKEN + 1,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        }
+        if not cached:
+            usage["input_tokens"] += system_tokens
+            return usage
+        prefix = hashlib.sha256(system.encode("utf-8")).hexdigest()
+        with self.lock:
+            hit = prefix in self.cached_prefixes
+            self.cached_prefixes.add(prefix)
+        usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = system_tokens
+        return usage
+
+    def build_message(self, params: dict) -> dict:
+        messages = params.get("messages", [])
+        if messages and messages[-1].get("role") == "assistant":
+            # Assistant prefill: continue the same reply where it left off
+            prefill = request_text({"messages": messages[-1:]})
+            text = fake_response_text({**params, "messages": messages[:-1]}, self.output_words)
+            text = text[len(prefill):] if text.startswith(prefill) else text
+        else:
+            text = fake_response_text(params, self.output_words)
+        max_chars = int(params.get("max_tokens", 4096)) * CHARS_PER_TOKEN
+        stop_reason = "end_turn"
+        if len(text) > max_chars:
+            text, stop_reason = text[:max_chars], "max_tokens"
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": params.get("model", "claude-fake"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": self.usage(params, text),
+        }
+
+    def create_batch(self, requests: list[dict], base_url: str) -> dict:
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        results = []
+        for request in requests:
+            if self.should_fail():
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "api_error", "message": "Synthetic batch request failure"}}}
+            else:
+                result = {"type": "succeeded", "message": self.build_message(request["params"])}
+            results.append({"custom_id": request["custom_id"], "result": result})
+        created = utc_now()
+        batch = {
+            "id": batch_id,
+            "created_at": created,
+            "ready_at": time.monotonic() + self.batch_delay,
+            "results": results,
+            "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results",
+        }
+        with self.lock:
+            self.batches[batch_id] = batch
+            self.stats["batch_requests"] += len(requests)
+        return self.batch_object(batch)
+
+    def batch_object(self, batch: dict) -> dict:
+        ended = time.monotonic() >= batch["ready_at"]
+        results = batch["results"]
+        succeeded = sum(1 for r in results if r["result"]["type"] == "succeeded")
+        if ended and "ended_at" not in batch:
+            batch["ended_at"] = utc_now()
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else len(results),
+                "succeeded": succeeded if ended else 0,
+                "errored": len(results) - succeeded if ended else 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": iso(batch["created_at"]),
+            "ended_at": iso(batch.get("ended_at")),
+            "expires_at": iso(batch["created_at"] + timedelta(hours=24)),
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": batch["results_url"] if ended else None,
+        }
+
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: FakeAnthropicState
+
+    def log_message(self, format, *args):
+        pass
+
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_bytes(self, status: int, body: bytes, content_type: str, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("request-id", f"req_{uuid.uuid4().hex[:24]}")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.state.add_bytes_out(len(body))
+
+    def send_json(self, status: int, data: dict, headers: dict | None = None) -> None:
+        self.send_bytes(status, json.dumps(data).encode("utf-8"), "application/json", headers)
+
+    def send_error_json(self, status: int, error_type: str, message: str, headers: dict | None = None) -> None:
+        self.send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+
+    def do_POST(self):
+        body = self.read_body()
+        path = self.path.split("?", 1)[0]
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            self.state.count(path, len(body))
+            self.send_error_json(400, "invalid_request_error", "Body is not valid JSON")
+            return
+
+        if path == "/v1/messages":
+            self.state.count("messages.stream" if payload.get("stream") else "messages.create", len(body))
+            self.handle_message(payload)
+        elif path == "/v1/messages/batches":
+            self.state.count("batches.create", len(body))
+            self.state.sleep_latency()
+            self.send_json(200, self.state.create_batch(payload.get("requests", []), self.base_url()))
+        else:
+            self.state.count(path, len(body))
+            self.send_error_json(404, "not_found_error", f"Unknown endpoint {path}")
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        match = re.fullmatch(r"/v1/messages/batches/([^/]+)(/results)?", path)
+        batch = self.state.batches.get(match.group(1)) if match else None
+        if batch is None:
+            self.state.count(path, 0)
+            self.send_error_json(404, "not_found_error", f"Unknown endpoint {path}")
+            return
+        if match.group(2):
+            self.state.count("batches.results", 0)
+            lines = "\n".join(json.dumps(r) for r in batch["results"]) + "\n"
+            self.send_bytes(200, lines.encode("utf-8"), "application/binary")
+        else:
+            self.state.count("batches.retrieve", 0)
+            self.send_json(200, self.state.batch_object(batch))
+
+    def handle_message(self, params: dict) -> None:
+        estimated = (len(system_text(params)) + len(request_text(params))) // CHARS_PER_TOKEN + 1
+        admitted, headers, retry_after = self.state.admit(estimated)
+        if not admitted:
+            headers["retry-after"] = str(max(1, int(retry_after + 0.999)))
+            self.send_error_json(429, "rate_limit_error", "Synthetic rate limit exceeded", headers)
+            return
+        self.state.sleep_latency()
+        if self.state.should_fail():
+            self.send_error_json(529, "overloaded_error", "Synthetic overload", headers)
+            return
+
+        message = self.state.build_message(params)
+        if params.get("stream"):
+            self.stream_message(message, headers)
+        else:
+            self.send_json(200, message, headers)
+
+    def stream_message(self, message: dict, headers: dict) -> None:
+        """Send a message as server-sent events, one chunk of words per delta."""
+        text = message["content"][0]["text"]
+        words = re.findall(r"\S+\s*", text) or [text]
+        size = max(1, self.state.stream_chunk_words)
+        chunks = ["".join(words[i:i + size]) for i in range(0, len(words), size)]
+        start = {**message, "content": [], "stop_reason": None,
+                 "usage": {**message["usage"], "output_tokens": 1}}
+        events = [
+            ("message_start", {"type": "message_start", "message": start}),
+            ("content_block_start", {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}}),
+            *[("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                       "delta": {"type": "text_delta", "text": chunk}}) for chunk in chunks],
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            ("message_delta", {"type": "message_delta",
+                               "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                               "usage": {"output_tokens": message["usage"]["output_tokens"]}}),
+            ("message_stop", {"type": "message_stop"}),
+        ]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        sent = 0
+        for event, data in events:
+            frame = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+            self.wfile.write(frame)
+            self.wfile.flush()
+            sent += len(frame)
+        self.state.add_bytes_out(sent)
+        self.close_connection = True
+
+
+class FakeAnthropicServer:
+    """
+    Threaded fake API server that can run in the background of a process.
+
+        with FakeAnthropicServer(FakeAnthropicState(latency=0.1)) as server:
+            os.environ["ANTHROPIC_BASE_URL"] = server.url
+    """
+
+    def __init__(self, state: FakeAnthropicState | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.state = state or FakeAnthropicState()
+        handler = type("Handler", (FakeAnthropicHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeAnthropicServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_server_arguments(parser) -> None:
+    """Add the fake server's behaviour options to an argparse parser."""
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every API call (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency up to this many seconds")
+    parser.add_argument("--rpm", type=int, help="Requests per minute before returning 429 (default: unlimited)")
+    parser.add_argument("--tpm", type=int, help="Input tokens per minute before returning 429 (default: unlimited)")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Fraction of calls answered with 529 overloaded (batch requests: errored)")
+    parser.add_argument("--batch-delay", type=float, default=1.0,
+                        help="Seconds before a submitted batch ends (default: 1)")
+    parser.add_argument("--output-words", type=int, default=DEFAULT_OUTPUT_WORDS,
+                        help=f"Approximate words per generated module (default: {DEFAULT_OUTPUT_WORDS})")
+    parser.add_argument("--seed", type=int, help="Random seed for latency jitter and failures")
+
+
+def state_from_args(args) -> FakeAnthropicState:
+    return FakeAnthropicState(
+        latency=args.latency,
+        jitter=args.jitter,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        failure_rate=args.failure_rate,
+        batch_delay=args.batch_delay,
+        output_words=args.output_words,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Anthropic API server")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeAnthropicServer(state_from_args(args), args.host, args.port)
+    print(f"Fake Anthropic API listening on {server.url}")
+    print(f"  export ANTHROPIC_BASE_URL={server.url} ANTHROPIC_API_KEY=fake")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.state.snapshot_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,48 +6,38 @@ Uses prompt caching for efficiency with large source documents.
 
 import os
 import json
-import time
-from anthropic import Anthropic
-from dotenv import load_dotenv
 import argparse
 
-load_dotenv()
+from response_cache import add_cache_arguments, cache_from_args
+from batch_jobs import BatchLedger, resume_batches
+from corpus import find_source_docs
+from sections import SOURCE_DIR
+from telemetry import BudgetExceededError, add_metrics_arguments, finish_run, run_metrics
+from changes import load_changes, render_changes
+from patches import PATCH_FORMAT, PatchError, apply_edits, parse_edits, render_outline
+from manifest import ALL_SECTIONS, BUILDERS, BuildManifest, add_plan_arguments, load_source_sections, stale_reasons
+from retrieval import load_specs, spec_for_module
+from source_selection import DEFAULT_SOURCE_TOKENS, SourceSelector, add_source_arguments, module_query
+from api_client import client
+from validate_modules import make_gate, make_repair_renderer, make_resume_renderer, repair_mapping
+from scheduler import (DeferredModules, Scheduler, add_schedule_arguments, module_key, request_priority,
+                       scheduler_from_args)
+from analyze_impact import PRIORITY_RANK
+from shared_passages import (all_module_paths, duplication_report, fan_out, load_passage_index, plan_shared_updates,
+                             shared_sections)
 
-client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+def load_source_docs(source_dir=SOURCE_DIR):
+    """Load all source documentation for per-module slicing."""
+    return SourceSelector.from_paths(find_source_docs(source_dir))
 
-def load_source_docs(source_dir='source-docs'):
-    """Load all source documentation to use as cached context."""
-    docs_content = "# Source Documentation Library\n\n"
-    
-    for root, dirs, files in os.walk(source_dir):
-        for file in files:
-            if file.endswith('.md'):
-                filepath = os.path.join(root, file)
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        docs_content += f"## {filepath}\n\n{content}\n\n---\n\n"
-                except Exception as e:
-                    print(f"Error loading {filepath}: {e}")
-    
-    return docs_content
+SYSTEM_PROMPT = "You are an expert technical enablement content creator specializing in enterprise software training."
 
-def create_batch_requests(impact_analysis, source_docs_cache):
-    """Create batch API requests for updating modules."""
-    
-    requests = []
-    
-    for i, module_info in enumerate(impact_analysis.get('affected_modules', [])):
-        module_path = module_info['module_path']
-        changes_needed = module_info['changes_needed']
-        
-        # Load existing module content if it exists
-        existing_content = ""
-        if os.path.exists(module_path):
-            with open(module_path, 'r', encoding='utf-8') as f:
-                existing_content = f.read()
-        
-        prompt = f"""You are creating technical enablement content for Splunk products.
+FULL_MAX_TOKENS = 8000
+PATCH_MAX_TOKENS = 4000
+
+def build_update_prompt(existing_content, changes_needed, changes_text, impact_level):
+    """Prompt asking for the complete updated module."""
+    return f"""You are creating technical enablement content for Splunk products.
 
 Your task: Update the following enablement module based on recent documentation changes.
 
@@ -57,7 +47,10 @@ Your task: Update the following enablement module based on recent documentation
 ## Required Changes:
 {json.dumps(changes_needed, indent=2)}
 
-## Impact Level: {module_info['impact_level']}
+## Source Documentation Changes:
+{changes_text or "See the source documentation library."}
+
+## Impact Level: {impact_level}
 
 ## Guidelines:
 - Maintain clear, instructional tone appropriate for technical enablement
@@ -68,22 +61,107 @@ Your task: Update the following enablement module based on recent documentation
 
 Please provide the complete updated module content."""
 
+def build_patch_prompt(existing_content, changes_needed, changes_text, impact_level, shared=None):
+    """
+    Prompt asking for section-level edits instead of a full rewrite.
+    Sections in `shared` ({anchor: owner module}) are shown as a note only.
+    """
+    return f"""You are creating technical enablement content for Splunk products.
+
+Your task: Update the following enablement module based on recent documentation changes,
+by editing only the sections that need to change.
+
+## Current Module Sections:
+Each section is shown under its anchor in square brackets. A section runs from its
+heading to the next heading of any level, so subsections are separate sections.
+
+{render_outline(existing_content, shared)}
+
+## Required Changes:
+{json.dumps(changes_needed, indent=2)}
+
+## Source Documentation Changes:
+{changes_text or "See the source documentation library."}
+
+## Impact Level: {impact_level}
+
+## Guidelines:
+- Maintain clear, instructional tone appropriate for technical enablement
+- Include practical examples where relevant
+- Use markdown formatting
+- Ensure accuracy based on source documentation
+- Leave sections that do not need to change out of the patch
+
+{PATCH_FORMAT}"""
+
+def changed_anchors(impact_analysis, source_changes=None):
+    """{source path: {anchors}} changed, per the impact analysis and any hunk-level changes."""
+    anchors = {}
+    for item in impact_analysis.get('changed_sections', []):
+        if item.get('status') == 'changed':
+            anchors.setdefault(item['file'], set()).add(item['section'])
+    for change in source_changes or []:
+        for hunk in change.get("hunks", []):
+            anchors.setdefault(change["path"], set()).update(hunk.get("sections") or [hunk.get("section")])
+    return anchors
+
+def create_batch_requests(impact_analysis, selector, source_changes=None, mode='patch', specs=None,
+                          source_tokens=DEFAULT_SOURCE_TOKENS, shared=None):
+    """
+    Create batch API requests for updating modules.
+    
+    Accepts affected modules in analyze_impact.py's shape (module / reason /
+    priority) as well as the older module_path / changes_needed /
+    impact_level shape. When hunk-level source changes are available they
+    are included so the model sees exactly what changed.
+    
+    Each request carries the slice of the source docs relevant to its
+    module's spec and impact reason, always including the changed sections,
+    within source_tokens (0 sends the whole library).
+    
+    In 'patch' mode existing modules get a request for section edits; new
+    modules, and every module in 'full' mode, get a complete rewrite.
+    `shared` ({module path: {anchor: owner module}}) lists passages another
+    module updates on this one's behalf; patch prompts leave them out.
+    """
+    
+    requests = []
+    changes_text = render_changes(source_changes) if source_changes else ""
+    specs = load_specs() if specs is None else specs
+    required = changed_anchors(impact_analysis, source_changes)
+    
+    for i, module_info in enumerate(impact_analysis.get('affected_modules', [])):
+        module_path = module_info.get('module_path') or module_info['module']
+        changes_needed = module_info.get('changes_needed') or module_info.get('reason', '')
+        impact_level = module_info.get('impact_level') or module_info.get('priority', 'medium')
+        
+        # Load existing module content if it exists
+        existing_content = ""
+        if os.path.exists(module_path):
+            with open(module_path, 'r', encoding='utf-8') as f:
+                existing_content = f.read()
+        
+        request_mode = 'patch' if mode == 'patch' and existing_content else 'full'
+        source_docs = selector.blocks(selector.select(module_query(module_path, specs, module_info), source_tokens,
+                                                      required))
+        if request_mode == 'patch':
+            prompt = build_patch_prompt(existing_content, changes_needed, changes_text, impact_level,
+                                        (shared or {}).get(module_path))
+        else:
+            prompt = build_update_prompt(existing_content, changes_needed, changes_text, impact_level)
+
         # Create batch request with prompt caching
         request = {
-            "custom_id": f"module-update-{i}",
+            "custom_id": f"module-{request_mode}-{i}",
             "params": {
-                "model": "claude-4-5-sonnet-latest",
-                "max_tokens": 8000,
+                "model": BUILDERS["update" if request_mode == 'full' else "patch"]["model"],
+                "max_tokens": PATCH_MAX_TOKENS if request_mode == 'patch' else FULL_MAX_TOKENS,
                 "system": [
                     {
                         "type": "text",
-                        "text": "You are an expert technical enablement content creator specializing in enterprise software training."
+                        "text": SYSTEM_PROMPT
                     },
-                    {
-                        "type": "text",
-                        "text": source_docs_cache,
-                        "cache_control": {"type": "ephemeral"}
-                    }
+                    *source_docs
                 ],
                 "messages": [
                     {
@@ -96,112 +174,325 @@ Please provide the complete updated module content."""
         
         requests.append({
             "request": request,
-            "module_path": module_path
+            "module_path": module_path,
+            "mode": request_mode,
+            "module_info": module_info
         })
     
     return requests
 
-def submit_batch(requests):
-    """Submit batch processing job to Claude API."""
+def unchecked_sections(entry, scope):
+    """
+    The changed source sections in `scope` ({path: {anchors}}) that a
+    manifest entry does not record the module as built from, as
+    "path > anchor" strings.
+    """
+    sources = entry.get("sources", {})
+    return [f"{path} > {anchor}" for path, anchors in sorted(scope.items())
+            if ALL_SECTIONS not in sources.get(path, {})
+            for anchor in sorted(anchors) if anchor not in sources.get(path, {})]
+
+def select_stale_modules(impact_analysis, manifest, specs, source_sections, source_changes=None):
+    """
+    Drop affected modules the build manifest shows are already up to date
+    for the whole change: built with the current spec, prompt template and
+    model, and from the current text of every changed or removed source
+    section in the analysis. A module the manifest does not record as
+    built from one of those sections is kept, as is every module when the
+    analysis lists no changed sections. Each skip is logged.
+    """
+    scope = changed_anchors(impact_analysis, source_changes)
+    for item in impact_analysis.get('changed_sections', []):
+        scope.setdefault(item['file'], set()).add(item['section'])
+    stale = []
+    for module_info in impact_analysis.get('affected_modules', []):
+        module_path = module_info.get('module_path') or module_info['module']
+        entry = manifest.entry(module_path)
+        if (entry is None or not scope or unchecked_sections(entry, scope)
+                or stale_reasons(manifest, module_path, spec_for_module(module_path, specs), source_sections)):
+            stale.append(module_info)
+        else:
+            print(f"  - {module_path} was built from the current text of every changed section "
+                  f"per {manifest.path.name}, skipping")
+    return {**impact_analysis, 'affected_modules': stale}
+
+def builder_for(mode):
+    """The build manifest builder (and validation template) of an update mode."""
+    return "update" if mode == 'full' else "patch"
+
+def record_builds(manifest, request_mapping, updated_files, specs, source_sections):
+    """Record every module written by a batch in the build manifest."""
+    modes = {req["module_path"]: req["mode"] for req in request_mapping}
+    for path in updated_files:
+        if path in modes:
+            manifest.record(path, builder_for(modes[path]), spec_for_module(path, specs), source_sections)
+
+def plan_passage_sharing(impact_analysis):
+    """
+    Shared passages among the affected modules, each owned by the
+    highest-priority module that contains it. Prints and records the
+    run's duplicated token mass.
+    """
+    affected = sorted(impact_analysis.get('affected_modules', []),
+                      key=lambda m: PRIORITY_RANK.get(request_priority({"module_info": m}), len(PRIORITY_RANK)))
+    index = load_passage_index(all_module_paths())
+    passages = index.passages()
+    plan = plan_shared_updates(passages, [m.get('module_path') or m['module'] for m in affected])
+    report = duplication_report(index, passages)
+    stats = {key: report[key] for key in ("modules", "tokens", "shared_passages", "duplicated_tokens", "duplicated_share")}
+    stats["fanned_out_passages"] = len(plan)
+    stats["fanned_out_tokens"] = sum(update["tokens"] for update in plan)
+    run_metrics.record_duplication(stats)
+    print(f"Shared passages: ~{stats['duplicated_tokens']} of ~{stats['tokens']} module tokens duplicated "
+          f"({stats['duplicated_share']:.1%}); {len(plan)} in this update generated once, "
+          f"~{stats['fanned_out_tokens']} tokens copied instead of regenerated")
+    return plan
+
+def make_patch_renderer(failed):
+    """
+    Build a batch render callback that applies patch responses to the module
+    on disk. Patches that do not parse or apply are appended to `failed`
+    and rejected, so they can be retried as full rewrites.
+    """
+    def render(req, text):
+        if req.get("mode") != "patch":
+            return text
+        try:
+            with open(req["module_path"], 'r', encoding='utf-8') as f:
+                existing_content = f.read()
+            return apply_edits(existing_content, parse_edits(text))
+        except (OSError, PatchError) as e:
+            print(f"⚠ Patch for {req['module_path']} did not apply: {e}")
+            failed.append(req)
+            return None
+    return render
+
+def follow_up_rounds(client, scheduler, requests_for, spec_for, record, failed_patches, rejected, cache=None,
+                     timeout=600):
+    """
+    Run the rounds that follow an update's first requests: patches that did
+    not apply are retried as full rewrites, then drafts that failed
+    validation are re-queued as section repairs. requests_for(module_infos,
+    mode) builds the request mapping for modules, and also rebuilds the
+    request of a draft resumed from the ledger; record(mapping, written)
+    records each round's modules in the build manifest.
     
-    # Create the batch file format
-    batch_requests = [r["request"] for r in requests]
+    Returns (written module paths, complete).
+    """
+    updated_files, complete = [], True
+    for req in failed_patches:
+        if "module_info" not in req:
+            # Submitted before the ledger kept module details
+            print(f"✗ Patch rejected for {req['module_path']}; rerun with --mode full to rewrite it")
+    failed_patches = [req for req in failed_patches if "module_info" in req]
+    if failed_patches:
+        print(f"\nRetrying {len(failed_patches)} module(s) whose patches did not apply as full rewrites...")
+        retry_mapping = requests_for([req["module_info"] for req in failed_patches], 'full')
+        retried, retried_complete = scheduler.run(client, retry_mapping, cache,
+                                                  make_gate(rejected, spec_for, baseline=True, template="update"),
+                                                  timeout)
+        record(retry_mapping, retried)
+        updated_files += retried
+        complete = complete and retried_complete
     
-    try:
-        # Create message batch
-        message_batch = client.messages.batches.create(
-            requests=batch_requests
-        )
-        
-        print(f"✓ Batch submitted: {message_batch.id}")
-        print(f"  Status: {message_batch.processing_status}")
-        
-        return message_batch.id, requests
-        
-    except Exception as e:
-        print(f"✗ Error submitting batch: {e}")
-        return None, None
+    repairs = []
+    if rejected:
+        print(f"\nRe-queuing {len(rejected)} module(s) that failed validation as section repairs...")
+        for req, draft, issues in rejected:
+            if "params" not in req["request"]:
+                if "module_info" not in req:
+                    print(f"✗ {req['module_path']} failed validation, not written: rebuild the module")
+                    continue
+                rebuilt = requests_for([req["module_info"]], 'full' if req["mode"] == 'full' else 'patch')[0]
+                req = {**req, "request": {**req["request"], "params": rebuilt["request"]["params"]}}
+            repairs.append(repair_mapping(req, draft, issues))
+    if repairs:
+        unrepaired = []
+        repaired, repaired_complete = scheduler.run(client, repairs, cache,
+                                                    make_repair_renderer(unrepaired, spec_for, True, "update"),
+                                                    timeout)
+        record(repairs, repaired)
+        updated_files += repaired
+        complete = complete and repaired_complete
+        if unrepaired:
+            print(f"✗ {len(unrepaired)} module(s) still fail validation and were not written")
+    return updated_files, complete
 
-def poll_batch_status(batch_id, timeout=600):
-    """Poll batch status until complete or timeout."""
+def resume_updates(args, cache=None, manifest=None, deferred=None):
+    """
+    Reattach to the unfinished batches in the job ledger and finish them
+    like the update that submitted them: results are validated and
+    recorded in the build manifest, patches that do not apply are retried
+    as full rewrites and failing drafts are repaired, through the
+    scheduler built from args. Repairs submitted before the restart are
+    applied to the draft kept in the ledger.
     
-    start_time = time.time()
+    Returns (written module paths, complete); raises BudgetExceededError
+    like update_modules.
+    """
+    manifest = manifest or BuildManifest()
+    deferred = DeferredModules() if deferred is None else deferred
+    ledger = BatchLedger()
+    specs = load_specs()
+    source_sections = load_source_sections(find_source_docs())
+    request_mapping = [req for job_id, _ in ledger.resumable_jobs() for req in ledger.request_mapping(job_id)]
     
-    while time.time() - start_time < timeout:
-        try:
-            batch = client.messages.batches.retrieve(batch_id)
-            status = batch.processing_status
-            
-            print(f"  Status: {status} (elapsed: {int(time.time() - start_time)}s)")
-            
-            if status == "ended":
-                return batch
-            
-            time.sleep(10)  # Poll every 10 seconds
-            
-        except Exception as e:
-            print(f"Error checking batch status: {e}")
-            time.sleep(10)
-    
-    print("✗ Batch processing timeout")
-    return None
-
-def process_batch_results(batch_id, request_mapping):
-    """Retrieve and save batch results."""
+    failed_patches = []
+    rejected = []
+    unrepaired = []
+    spec_for = lambda path: spec_for_module(path, specs)
+    # Updates and patches share one outline, so one template covers a ledger of both
+    render = make_resume_renderer(make_gate(rejected, spec_for, make_patch_renderer(failed_patches), baseline=True,
+                                            template="update"),
+                                  make_repair_renderer(unrepaired, spec_for, True, "update"))
+    updated_files, complete = resume_batches(client, cache, args.timeout, ledger, render)
+    record = lambda mapping, written: record_builds(manifest, mapping, written, specs, source_sections)
+    record(request_mapping, updated_files)
+    if unrepaired:
+        print(f"✗ {len(unrepaired)} module(s) still fail validation and were not written")
     
-    try:
-        # Get all results
-        results = client.messages.batches.results(batch_id)
-        
-        updated_files = []
-        
-        for result in results:
-            custom_id = result.custom_id
-            
-            # Find the corresponding module path
-            module_path = None
-            for req in request_mapping:
-                if req["request"]["custom_id"] == custom_id:
-                    module_path = req["module_path"]
-                    break
-            
-            if not module_path:
-                print(f"⚠ Could not find module path for {custom_id}")
-                continue
-            
-            # Extract the generated content
-            if result.result.type == "succeeded":
-                message = result.result.message
-                content_text = ""
-                
-                for block in message.content:
-                    if block.type == "text":
-                        content_text += block.text
-                
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(module_path), exist_ok=True)
-                
-                # Save updated module
-                with open(module_path, 'w', encoding='utf-8') as f:
-                    f.write(content_text)
-                
-                updated_files.append(module_path)
-                print(f"✓ Updated: {module_path}")
-            else:
-                print(f"✗ Failed to generate {module_path}: {result.result.type}")
-        
-        return updated_files
-        
-    except Exception as e:
-        print(f"✗ Error processing results: {e}")
+    scheduler = scheduler_from_args(args)
+    if failed_patches or rejected:
+        selector = load_source_docs()
+        source_changes = load_changes(args.changes_file) if args.changes_file else None
+        requests_for = lambda module_infos, request_mode: create_batch_requests(
+            {"affected_modules": module_infos}, selector, source_changes, request_mode, specs, args.source_tokens)
+        retried, retried_complete = follow_up_rounds(client, scheduler, requests_for, spec_for, record,
+                                                     failed_patches, rejected, cache, args.timeout)
+        updated_files += retried
+        complete = complete and retried_complete
+    
+    deferred.settle(updated_files, scheduler.deferred, [])
+    manifest.save()
+    if scheduler.stopped:
+        raise scheduler.stopped
+    return updated_files, complete
+
+def update_modules(impact_analysis, selector, source_changes=None, cache=None, mode='patch', timeout=600,
+                   force=False, manifest=None, specs=None, source_sections=None, client=client,
+                   source_tokens=DEFAULT_SOURCE_TOKENS, scheduler=None, share_passages=True, deferred=None):
+    """
+    Generate updates for the modules in an impact analysis.
+    
+    Modules the build manifest shows are up to date for the whole change
+    (see select_stale_modules) are skipped unless force is set. Requests
+    go through `scheduler` (a default Scheduler otherwise): high-priority
+    modules as concurrent sync calls written as they return, the rest
+    through the Batch API, within its deadline and cost ceiling. Modules
+    it defers, cannot send in time or fails to update in the fast lane
+    are queued in `deferred` (the default DeferredModules otherwise) and
+    added to the next update, until one writes them. Patches that fail to
+    apply are retried as full rewrites. Every result is validated before
+    it is written (only problems it adds to the module on disk count),
+    and failing ones are re-queued as section repairs. In patch mode, a
+    passage shared by several modules (see shared_passages.py) is updated
+    by one owner module only and then copied into the others, unless
+    share_passages is False. Every module written by a request is
+    recorded in the manifest. Callers that keep the corpus in memory
+    (pipeline.py) pass their own selector, manifest, specs, source
+    sections and client.
+    
+    Returns the list of written module paths, or None if a request failed,
+    a batch could not be submitted or the update did not finish within the
+    timeout or deadline (modules already written are still recorded). If
+    the spend budget runs out, the modules written so far are recorded
+    and the scheduler's BudgetExceededError is raised.
+    """
+    manifest = manifest or BuildManifest()
+    scheduler = scheduler or Scheduler()
+    deferred = DeferredModules() if deferred is None else deferred
+    specs = load_specs() if specs is None else specs
+    if source_sections is None:
+        source_sections = load_source_sections(find_source_docs())
+    impact_analysis = deferred.merge(impact_analysis)
+    if not force:
+        impact_analysis = select_stale_modules(impact_analysis, manifest, specs, source_sections, source_changes)
+    # Queued modules the manifest now reports as up to date were written since
+    selected = {module_key(m) for m in impact_analysis.get('affected_modules', [])}
+    deferred.discard([path for path in list(deferred.data["modules"]) if path not in selected])
+    
+    failed_patches = []
+    rejected = []
+    spec_for = lambda path: spec_for_module(path, specs)
+    render = make_gate(rejected, spec_for, make_patch_renderer(failed_patches), baseline=True,
+                       template=builder_for(mode))
+    
+    sharing = plan_passage_sharing(impact_analysis) if mode == 'patch' and share_passages else []
+    originals = {}
+    for update in sharing:
+        with open(update["owner"], 'r', encoding='utf-8') as f:
+            originals[update["owner"]] = f.read()
+    
+    print("\nCreating batch requests...")
+    request_mapping = create_batch_requests(impact_analysis, selector, source_changes, mode, specs, source_tokens,
+                                            shared_sections(sharing))
+    
+    if not request_mapping:
+        print("No modules to update")
+        deferred.save()
         return []
+    
+    print(f"✓ Created {len(request_mapping)} update requests")
+    
+    updated_files, complete = scheduler.run(client, request_mapping, cache, render, timeout)
+    record = lambda mapping, written: record_builds(manifest, mapping, written, specs, source_sections)
+    record(request_mapping, updated_files)
+    
+    requests_for = lambda module_infos, request_mode: create_batch_requests(
+        {"affected_modules": module_infos}, selector, source_changes, request_mode, specs, source_tokens)
+    retried, retried_complete = follow_up_rounds(client, scheduler, requests_for, spec_for, record,
+                                                 failed_patches, rejected, cache, timeout)
+    updated_files += retried
+    complete = complete and retried_complete
+    
+    if sharing:
+        print("\nCopying updated shared passages...")
+        shared = [path for path in fan_out(sharing, originals, spec_for) if path not in updated_files]
+        record([{"module_path": path, "mode": 'patch'} for path in shared], shared)
+        updated_files += shared
+    
+    deferred.settle(updated_files, scheduler.deferred, impact_analysis.get('changed_sections', []))
+    manifest.save()
+    if scheduler.stopped:
+        raise scheduler.stopped
+    return updated_files if complete else None
 
 def main():
     parser = argparse.ArgumentParser(description='Generate enablement content updates')
     parser.add_argument('--impact-file', default='impact-analysis.json',
                        help='Path to impact analysis JSON file')
+    parser.add_argument('--changes-file',
+                       help='Hunk-level changes JSON from scripts/changes.py (default: source_changes in the impact file)')
+    parser.add_argument('--mode', choices=['patch', 'full'], default='patch',
+                       help='Ask for section edits (falling back to a full rewrite if a patch fails) or always rewrite whole modules (default: patch)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Reattach to unfinished batches in the job ledger instead of submitting new ones; '
+                            'retries and repairs use --changes-file for the changed source hunks')
+    parser.add_argument('--timeout', type=int, default=600,
+                       help='Seconds to wait for a batch to finish (default: 600)')
+    add_plan_arguments(parser)
+    add_source_arguments(parser)
+    add_schedule_arguments(parser)
+    parser.add_argument('--no-share', action='store_true',
+                       help='Update every module separately instead of generating shared passages once')
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
     
     args = parser.parse_args()
+    from dotenv import load_dotenv
+    load_dotenv()
+    cache = cache_from_args(args)
+    
+    if args.resume:
+        try:
+            updated_files, complete = resume_updates(args, cache)
+        except BudgetExceededError as e:
+            print(f"✗ Stopped: {e}")
+            finish_run(args)
+            return 1
+        print(f"\n✓ Successfully updated {len(updated_files)} enablement modules")
+        finish_run(args)
+        return 0 if complete else 1
     
     # Load impact analysis
     if not os.path.exists(args.impact_file):
@@ -212,37 +503,24 @@ def main():
         impact_analysis = json.load(f)
     
     print("Loading source documentation for caching...")
-    source_docs = load_source_docs()
-    print(f"✓ Loaded {len(source_docs)} characters of source docs")
+    selector = load_source_docs()
+    print(f"✓ Loaded {selector.characters} characters of source docs")
     
-    print("\nCreating batch requests...")
-    request_mapping = create_batch_requests(impact_analysis, source_docs)
-    
-    if not request_mapping:
-        print("No modules to update")
-        return 0
-    
-    print(f"✓ Created {len(request_mapping)} update requests")
-    
-    print("\nSubmitting batch to Claude API...")
-    batch_id, mapping = submit_batch(request_mapping)
-    
-    if not batch_id:
+    source_changes = load_changes(args.changes_file) if args.changes_file else impact_analysis.get('source_changes')
+    try:
+        updated_files = update_modules(impact_analysis, selector, source_changes, cache, args.mode, args.timeout,
+                                       args.force, source_tokens=args.source_tokens,
+                                       scheduler=scheduler_from_args(args), share_passages=not args.no_share)
+    except BudgetExceededError as e:
+        print(f"✗ Stopped: {e}")
+        finish_run(args)
         return 1
-    
-    print("\nWaiting for batch processing to complete...")
-    batch = poll_batch_status(batch_id)
-    
-    if not batch:
+    if updated_files is None:
+        finish_run(args)
         return 1
     
-    print("\n✓ Batch processing complete!")
-    print(f"  Requests: {batch.request_counts.processing}")
-    
-    print("\nRetrieving and saving results...")
-    updated_files = process_batch_results(batch_id, mapping)
-    
     print(f"\n✓ Successfully updated {len(updated_files)} enablement modules")
+    finish_run(args)
     
     return 0
 
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Make-style build manifest for enablement modules.
+Records the inputs each module was built from (spec entry, source sections,
+prompt template version and model) so a plan can list exactly which
+modules are stale without calling the API.
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sections import MIN_SHARED_CODE_SPANS, MODULES_DIR_NAME, PROJECT_ROOT, code_spans, content_hash, normalize_heading, split_sections
+from corpus import corpus_label, find_source_docs
+from corpus_store import CorpusStore, section_index
+from retrieval import SPECS_PATH, load_specs, spec_for_module
+
+MANIFEST_PATH = PROJECT_ROOT / "build-manifest.json"
+MANIFEST_VERSION = 1
+MODULES_DIR = MODULES_DIR_NAME
+
+# How each kind of build is produced. Bump a template version whenever the
+# matching prompt in create_modules.py or generate_enablement.py changes.
+# "manual" covers hand-written modules adopted with `manifest.py record`.
+BUILDERS = {
+    "create": {"template": 2, "model": "claude-sonnet-4-20250514"},
+    "update": {"template": 1, "model": "claude-4-5-sonnet-latest"},
+    "patch": {"template": 1, "model": "claude-4-5-sonnet-latest"},
+    "manual": {"template": None, "model": None},
+}
+
+# Changed source sections listed per stale module before summarizing
+MAX_LISTED_SECTIONS = 3
+# Dependency key for "every section of this file", stored with one digest
+# instead of one hash per section
+ALL_SECTIONS = "(all)"
+
+
+def spec_hash(spec: dict | None) -> str | None:
+    """Hash of a spec entry, independent of key order."""
+    return content_hash(json.dumps(spec, sort_keys=True)) if spec else None
+
+
+def load_source_sections(source_files, store: CorpusStore | None = None) -> dict:
+    """
+    Sections of each source file, keyed by its project-relative label.
+
+    Values are lazy StoredSections: their anchors and hashes come from the
+    corpus store's index, and content is only read when iterated.
+    """
+    store = store or CorpusStore()
+    store.refresh(source_files)
+    labels = (corpus_label(path) for path in source_files)
+    return {label: store.sections(label) for label in labels if store.entry(label)}
+
+
+def sections_digest(sections) -> str:
+    """One hash over every section of a file."""
+    return content_hash("\n".join(f"{s['anchor']}\0{s['hash']}" for s in section_index(sections)))
+
+
+def reference_index(source_sections: dict) -> tuple[dict, dict]:
+    """
+    Source sections by normalized heading and by inline code span, as
+    (by_heading, by_span) of {key: [(path, section metadata)]}.
+    """
+    by_heading: dict[str, list[tuple[str, dict]]] = {}
+    by_span: dict[str, list[tuple[str, dict]]] = {}
+    for path, sections in source_sections.items():
+        for meta, section in zip(section_index(sections), sections):
+            if meta["level"] > 0:
+                by_heading.setdefault(normalize_heading(meta["heading"]), []).append((path, meta))
+            for span in code_spans(section["content"]):
+                by_span.setdefault(span, []).append((path, meta))
+    return by_heading, by_span
+
+
+def source_dependencies(module_text: str, source_sections: dict,
+                        references: tuple[dict, dict] | None = None) -> dict[str, dict[str, str]]:
+    """
+    The source sections a module is built from: {path: {anchor: hash}}.
+
+    These are the source sections the module's own sections reference (same
+    heading or shared code spans, as in sections.references). A module that
+    references none of them depends on every source section, recorded as
+    {path: {ALL_SECTIONS: digest}}. Pass reference_index(source_sections)
+    when recording many modules against the same sources.
+    """
+    by_heading, by_span = references or reference_index(source_sections)
+
+    found: dict[tuple[str, str], tuple[str, dict]] = {}
+    for module_section in split_sections(module_text):
+        for path, section in by_heading.get(normalize_heading(module_section["heading"]), []):
+            found[(path, section["anchor"])] = (path, section)
+        shared: dict[tuple[str, str], int] = {}
+        for span in code_spans(module_section["content"]):
+            for path, section in by_span.get(span, []):
+                key = (path, section["anchor"])
+                shared[key] = shared.get(key, 0) + 1
+                if shared[key] >= MIN_SHARED_CODE_SPANS:
+                    found[key] = (path, section)
+
+    if not found:
+        return {path: {ALL_SECTIONS: sections_digest(sections)} for path, sections in sorted(source_sections.items())}
+
+    dependencies: dict[str, dict[str, str]] = {}
+    for path, section in found.values():
+        dependencies.setdefault(path, {})[section["anchor"]] = section["hash"]
+    return {path: dict(sorted(anchors.items())) for path, anchors in sorted(dependencies.items())}
+
+
+def existing_modules(output_dir: str = MODULES_DIR) -> dict[str, str]:
+    """
+    Module files in a directory keyed by stem without the version suffix
+    (as spec_for_module matches them); the first in sorted order wins.
+    """
+    try:
+        names = sorted(name for name in os.listdir(output_dir) if name.endswith(".md"))
+    except OSError:
+        return {}
+    existing: dict[str, str] = {}
+    for name in names:
+        existing.setdefault(re.sub(r"_v\d+$", "", name[:-3]), os.path.join(output_dir, name))
+    return existing
+
+
+def module_output_path(spec: dict, output_dir: str = MODULES_DIR, existing: dict[str, str] | None = None) -> str:
+    """
+    Where a spec's module lives: the existing (possibly versioned) file
+    that matches it, or <output_dir>/<filename> for a new module.
+
+    Pass existing_modules(output_dir) when resolving many specs to list
+    the directory once.
+    """
+    existing = existing_modules(output_dir) if existing is None else existing
+    return existing.get(Path(spec["filename"]).stem) or str(Path(output_dir) / spec["filename"])
+
+
+class BuildManifest:
+    """
+    Persisted record of how every module was last built.
+
+    Layout: {"version", "modules": {module_path: {"builder", "template",
+    "model", "spec", "sources": {source_path: {anchor: hash}}, "built_at"}}},
+    keyed by project-relative module path. Safe to record from worker
+    threads; the file is rewritten atomically.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._references: tuple[dict, tuple[dict, dict]] | None = None
+        try:
+            self.data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            self.data = {}
+        if self.data.get("version") != MANIFEST_VERSION:
+            self.data = {"version": MANIFEST_VERSION, "modules": {}}
+
+    def save(self):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2, sort_keys=True)
+                f.write("\n")
+            tmp_path.replace(self.path)
+
+    def entry(self, module_path) -> dict | None:
+        return self.data["modules"].get(corpus_label(module_path))
+
+    def record(self, module_path, builder: str, spec: dict | None, source_sections: dict, text: str | None = None):
+        """Record that a module was just built by `builder` from the current inputs."""
+        if text is None:
+            text = Path(module_path).read_text(encoding="utf-8")
+        with self._lock:
+            if self._references is None or self._references[0] is not source_sections:
+                self._references = (source_sections, reference_index(source_sections))
+            references = self._references[1]
+        entry = {
+            "builder": builder,
+            **BUILDERS[builder],
+            "spec": spec_hash(spec),
+            "sources": source_dependencies(text, source_sections, references),
+            "built_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with self._lock:
+            self.data["modules"][corpus_label(module_path)] = entry
+
+
+def stale_reasons(manifest: BuildManifest, module_path, spec: dict | None, source_sections: dict) -> list[str]:
+    """
+    Why a module needs rebuilding; an empty list means it is up to date.
+
+    Source sections are only compared for files in source_sections, so a
+    plan over a subset of the docs does not flag modules built from others.
+    """
+    if not Path(module_path).exists():
+        return ["module file missing"]
+    entry = manifest.entry(module_path)
+    if entry is None:
+        return ["not in manifest"]
+
+    reasons = []
+    if spec is not None and entry.get("spec") != spec_hash(spec):
+        reasons.append("spec changed")
+    builder = BUILDERS.get(entry.get("builder"), {})
+    if entry.get("template") != builder.get("template"):
+        reasons.append("prompt template changed")
+    if entry.get("model") != builder.get("model"):
+        reasons.append("model changed")
+
+    changed = []
+    for path, anchors in entry.get("sources", {}).items():
+        if path not in source_sections:
+            continue
+        if ALL_SECTIONS in anchors:
+            if anchors[ALL_SECTIONS] != sections_digest(source_sections[path]):
+                changed.append(f"{path} > {ALL_SECTIONS}")
+            continue
+        current = {s["anchor"]: s["hash"] for s in section_index(source_sections[path])}
+        changed.extend(f"{path} > {anchor}" for anchor, digest in anchors.items() if current.get(anchor) != digest)
+    if changed:
+        listed = "; ".join(changed[:MAX_LISTED_SECTIONS])
+        more = f" (+{len(changed) - MAX_LISTED_SECTIONS} more)" if len(changed) > MAX_LISTED_SECTIONS else ""
+        reasons.append(f"source changed: {listed}{more}")
+    return reasons
+
+
+def plan(manifest: BuildManifest, specs: list[dict], source_sections: dict,
+         output_dir: str = MODULES_DIR) -> list[dict]:
+    """
+    Every stale module: [{'module', 'spec', 'reasons'}].
+
+    Covers each spec entry plus any recorded module without a spec. No API
+    calls are made.
+    """
+    stale = []
+    seen = set()
+    existing = existing_modules(output_dir)
+    for spec in specs:
+        module_path = module_output_path(spec, output_dir, existing)
+        seen.add(corpus_label(module_path))
+        reasons = stale_reasons(manifest, module_path, spec, source_sections)
+        if reasons:
+            stale.append({"module": module_path, "spec": spec, "reasons": reasons})
+    for label in sorted(manifest.data["modules"]):
+        if label in seen:
+            continue
+        module_path = str(PROJECT_ROOT / label)
+        reasons = stale_reasons(manifest, module_path, None, source_sections)
+        if reasons:
+            stale.append({"module": label, "spec": None, "reasons": reasons})
+    return stale
+
+
+def add_plan_arguments(parser) -> None:
+    """Add the shared --force option to an argparse parser."""
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild modules even if the build manifest says they are up to date')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan or record enablement module builds")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subcommands.add_parser("plan", help="List stale modules without calling the API")
+    record_parser = subcommands.add_parser("record",
+                                           help="Record existing modules as built from the current inputs")
+    for sub in (plan_parser, record_parser):
+        sub.add_argument("--specs", default=str(SPECS_PATH), help="Module specifications JSON")
+        sub.add_argument("--source", nargs="+", help="Source docs (default: every file under source-docs/)")
+        sub.add_argument("--output-dir", default=str(PROJECT_ROOT / MODULES_DIR), help="Module directory")
+        sub.add_argument("--manifest", default=str(MANIFEST_PATH), help="Build manifest path")
+    plan_parser.add_argument("--output", help="Also write the plan as JSON to this file")
+    record_parser.add_argument("--builder", choices=sorted(BUILDERS), default="manual",
+                               help="Builder to record the modules under (default: manual, for hand-written "
+                                    "modules)")
+    record_parser.add_argument("modules", nargs="*", help="Modules to record (default: every spec's module)")
+    args = parser.parse_args()
+
+    specs = load_specs(Path(args.specs))
+    source_sections = load_source_sections(args.source or find_source_docs())
+    manifest = BuildManifest(args.manifest)
+
+    if args.command == "record":
+        existing = existing_modules(args.output_dir)
+        paths = args.modules or [module_output_path(spec, args.output_dir, existing) for spec in specs]
+        recorded = 0
+        for path in paths:
+            if not Path(path).exists():
+                print(f"⚠ Skipping {path}: file not found")
+                continue
+            manifest.record(path, args.builder, spec_for_module(path, specs), source_sections)
+            recorded += 1
+        manifest.save()
+        print(f"✓ Recorded {recorded} module(s) in {manifest.path}")
+        return 0
+
+    stale = plan(manifest, specs, source_sections, args.output_dir)
+    existing = existing_modules(args.output_dir)
+    total = len({corpus_label(module_output_path(s, args.output_dir, existing)) for s in specs}
+                | set(manifest.data["modules"]))
+    print(f"{len(stale)} of {total} module(s) stale")
+    for item in stale:
+        print(f"  - {corpus_label(item['module'])}: {', '.join(item['reasons'])}")
+    if args.output:
+        Path(args.output).write_text(json.dumps({"stale": [
+            {"module": corpus_label(item["module"]), "reasons": item["reasons"]} for item in stale
+        ]}, indent=2), encoding="utf-8")
+        print(f"Plan written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,118 @@
+# scripts/patches.py
+"""
+Section-level patches for enablement modules.
+Instead of rewriting a whole module, the model returns structured edits
+against named sections, which are validated and applied locally.
+"""
+
+import json
+
+from sections import split_sections
+
+PATCH_OPS = ("replace", "insert", "delete")
+
+# Response format instructions shared by every prompt that asks for edits
+PATCH_FORMAT = """Respond with a JSON object only, no other text. Use this exact structure:
+{
+  "edits": [
+    {
+      "op": "replace" | "insert" | "delete",
+      "section": "exact anchor of an existing section, as shown in square brackets",
+      "content": "markdown; for replace, the whole section including its heading line; for insert, new content placed after the named section; omit for delete"
+    }
+  ]
+}"""
+
+
+class PatchError(ValueError):
+    """A patch could not be parsed or does not apply to the module."""
+
+
+def extract_json(text: str) -> str:
+    """Strip a surrounding markdown code fence from a JSON response, if any."""
+    if "```json" in text:
+        return text.split("```json")[1].split("```")[0].strip()
+    if "```" in text:
+        return text.split("```")[1].split("```")[0].strip()
+    return text.strip()
+
+
+def parse_edits(text: str) -> list[dict]:
+    """
+    Parse a patch response into a list of edits.
+
+    Expected shape: {"edits": [{"op": "replace" | "insert" | "delete",
+    "section": "<anchor>", "content": "..."}]}. 'insert' adds content after
+    the named section; 'delete' takes no content.
+    """
+    try:
+        data = json.loads(extract_json(text))
+    except json.JSONDecodeError as e:
+        raise PatchError(f"Patch is not valid JSON: {e}") from e
+
+    edits = data.get("edits") if isinstance(data, dict) else None
+    if not isinstance(edits, list):
+        raise PatchError("Patch has no 'edits' list")
+
+    for i, edit in enumerate(edits):
+        if not isinstance(edit, dict) or edit.get("op") not in PATCH_OPS:
+            raise PatchError(f"Edit {i} has no valid 'op' (expected one of {', '.join(PATCH_OPS)})")
+        if not isinstance(edit.get("section"), str):
+            raise PatchError(f"Edit {i} has no 'section' anchor")
+        if edit["op"] != "delete" and not isinstance(edit.get("content"), str):
+            raise PatchError(f"Edit {i} ({edit['op']}) has no 'content'")
+    return edits
+
+
+def apply_edits(text: str, edits: list[dict]) -> str:
+    """
+    Apply section edits to a module and return the new text.
+
+    Every targeted section must exist and may be targeted by at most one
+    replace or delete; otherwise PatchError is raised and nothing is applied.
+    """
+    sections = split_sections(text)
+    lines = text.replace("\r\n", "\n").split("\n")
+    # Leading blank lines are not part of any section
+    leading = "\n".join(lines[: sections[0]["line"] - 1]) if sections else text
+
+    by_anchor = {s["anchor"]: i for i, s in enumerate(sections)}
+    missing = [e["section"] for e in edits if e["section"] not in by_anchor]
+    if missing:
+        raise PatchError(f"Patch targets unknown section(s): {'; '.join(missing)}")
+
+    replaced: dict[int, str | None] = {}
+    inserted: dict[int, list[str]] = {}
+    for edit in edits:
+        i = by_anchor[edit["section"]]
+        if edit["op"] == "insert":
+            inserted.setdefault(i, []).append(edit["content"].strip("\n"))
+            continue
+        if i in replaced:
+            raise PatchError(f"Section edited more than once: {edit['section']}")
+        replaced[i] = None if edit["op"] == "delete" else edit["content"].strip("\n") + "\n"
+
+    parts = [leading] if leading else []
+    for i, section in enumerate(sections):
+        content = replaced.get(i, section["content"])
+        if content is not None:
+            parts.append(content)
+        for addition in inserted.get(i, []):
+            parts.append(addition + "\n")
+    return "\n".join(parts)
+
+
+def render_outline(text: str, shared: dict[str, str] | None = None) -> str:
+    """
+    List a module's sections with their anchors, for the patch prompt.
+    Sections in `shared` ({anchor: owner module}) are updated through their
+    owner, so only a note is shown in place of their content.
+    """
+    shared = shared or {}
+    return "\n\n".join(
+        f"### [{s['anchor']}]\n" + (
+            f"(Shared passage, kept in sync with {shared[s['anchor']]}, which is being updated separately. "
+            "Leave this section out of the patch.)" if s["anchor"] in shared else s["content"].strip()
+        )
+        for s in split_sections(text)
+    )
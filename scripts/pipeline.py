@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Single entry point for impact analysis followed by module updates.
+
+Runs once by default, or stays resident with --watch: source-docs/ is
+polled for changes and, once edits settle for the debounce period, the
+changed files go through analysis and generation in-process. The parsed
+corpus, section snapshot, build manifest and HTTP client stay warm between
+runs, and the impact analysis is handed straight to generation instead of
+round-tripping through impact-analysis.json.
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+from api_client import LazyClient
+from analyze_impact import (DEFAULT_SHARD_TOKENS, DEFAULT_TOP_K, DEFAULT_WORKERS, ImpactFormatError, analyze_impact,
+                            get_enablement_modules)
+from changes import load_changes
+from corpus import corpus_label, find_source_docs
+from corpus_store import CorpusStore, StoredSections
+from generate_enablement import update_modules
+from manifest import BuildManifest, add_plan_arguments
+from render_trainer import render_resources
+from response_cache import add_cache_arguments, cache_from_args
+from retrieval import load_specs
+from scheduler import add_schedule_arguments, scheduler_from_args
+from source_selection import SourceSelector, add_source_arguments
+from sections import SOURCE_DIR, load_sections, load_snapshot, save_snapshot, update_snapshot
+from telemetry import BudgetExceededError, add_metrics_arguments, finish_run, run_metrics
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_DEBOUNCE = 5.0
+
+
+class SourceCorpus:
+    """
+    Warm view of source-docs/: lazy sections and the source selector,
+    backed by the memory-mapped corpus store.
+
+    refresh() stats every file and rescans only those whose size or mtime
+    changed, so an idle poll costs one directory walk; section text is
+    read from the mapped files when it is needed, never held whole.
+    """
+
+    def __init__(self, source_dir: Path | str = SOURCE_DIR, store: CorpusStore | None = None):
+        self.source_dir = Path(source_dir)
+        self.store = store or CorpusStore()
+        self.stats: dict[str, tuple[int, int]] = {}
+        self.sections: dict[str, StoredSections] = {}
+        self.selector = SourceSelector(self.store, [])
+
+    def scan(self) -> dict[str, tuple[int, int]]:
+        """{label: (mtime_ns, size)} for every source doc on disk."""
+        stats = {}
+        for path in find_source_docs(self.source_dir):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            stats[corpus_label(path)] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def changed_labels(self, stats: dict[str, tuple[int, int]] | None = None) -> list[str]:
+        """Labels added, modified or removed since the last refresh."""
+        stats = self.scan() if stats is None else stats
+        return sorted(label for label in set(stats) | set(self.stats) if stats.get(label) != self.stats.get(label))
+
+    def refresh(self) -> list[str]:
+        """Rescan changed files and rebuild the selector; returns the changed labels."""
+        stats = self.scan()
+        changed = self.changed_labels(stats)
+        if changed:
+            self.store.refresh(find_source_docs(self.source_dir), prune=self.source_dir)
+            labels = [label for label in sorted(stats) if self.store.entry(label)]
+            self.sections = {label: self.store.sections(label) for label in labels}
+            self.selector = SourceSelector(self.store, labels)
+        self.stats = {label: stats[label] for label in self.sections}
+        return changed
+
+
+def run_change_set(client, corpus: SourceCorpus, snapshot: dict, manifest: BuildManifest, args,
+                   changed_files: list[str], source_changes: list[dict] | None = None) -> int:
+    """
+    Analyze one set of changed source docs and update the affected modules.
+
+    Returns 0 once the set is done, or 1 if its analysis or update failed
+    (API errors and malformed analyses are reported, not raised). The
+    section snapshot advances for each module once it has been rewritten,
+    and for the changed files only when the whole set succeeded, so a
+    failed set is analyzed again on the next run. If the spend budget runs
+    out, the run is reported and BudgetExceededError is raised.
+    """
+    from anthropic import APIError
+
+    try:
+        status = update_change_set(client, corpus, snapshot, manifest, args, changed_files, source_changes)
+    except (APIError, ImpactFormatError) as e:
+        print(f"✗ Change set failed: {e}")
+        status = 1
+    finally:
+        finish_run(args)
+        run_metrics.reset()
+    if status == 0:
+        for f in changed_files:
+            update_snapshot(snapshot, f, corpus.sections[f].metadata() if f in corpus.sections else [])
+        save_snapshot(snapshot)
+    return status
+
+
+def update_change_set(client, corpus: SourceCorpus, snapshot: dict, manifest: BuildManifest, args,
+                      changed_files: list[str], source_changes: list[dict] | None = None) -> int:
+    """The analysis and update behind run_change_set; returns its status."""
+    module_paths = get_enablement_modules()
+    print(f"\nAnalyzing impact of {len(changed_files)} changed file(s) on {len(module_paths)} module(s)...")
+    result = analyze_impact(changed_files, module_paths, snapshot, args.top_k, args.cache, source_changes,
+                            args.shard_tokens, args.workers, client=client)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Impact analysis written to {args.output}")
+
+    affected = result.get("affected_modules", [])
+    if result.get("error") or not affected:
+        print(result.get("error") or "No modules affected")
+        return 0
+
+    print(f"Modules requiring updates: {len(affected)}")
+    updated_files = update_modules(result, corpus.selector, result.get("source_changes"), args.cache, args.mode,
+                                   args.timeout, args.force, manifest, load_specs(), corpus.sections, client,
+                                   args.source_tokens, scheduler_from_args(args), share_passages=not args.no_share)
+    if updated_files:
+        for path in updated_files:
+            label = corpus_label(path)
+            update_snapshot(snapshot, label, load_sections(label))
+        save_snapshot(snapshot)
+        print(f"\n✓ Successfully updated {len(updated_files)} enablement modules")
+        if args.render:
+            render_resources(store=corpus.store)
+    return 1 if updated_files is None else 0
+
+
+def watch(client, corpus: SourceCorpus, snapshot: dict, manifest: BuildManifest, args,
+          failed: list[str] | None = None) -> None:
+    """
+    Poll source-docs/ until interrupted, running one change set per burst.
+
+    A burst is processed once no further edits have been seen for
+    args.debounce seconds, so a multi-file save or checkout runs once.
+    Files from a change set that failed (starting with `failed`) are added
+    to the next one. Raises BudgetExceededError once the spend budget runs
+    out.
+    """
+    print(f"\nWatching {corpus.source_dir} every {args.interval:g}s (debounce {args.debounce:g}s), Ctrl-C to stop")
+    pending_since = None
+    last_stats = corpus.stats
+    failed = list(failed or [])
+    while True:
+        time.sleep(args.interval)
+        stats = corpus.scan()
+        if stats != last_stats:
+            pending_since = time.monotonic()
+            last_stats = stats
+            continue
+        if pending_since is None or time.monotonic() - pending_since < args.debounce:
+            continue
+        pending_since = None
+        changed = corpus.refresh()
+        if changed:
+            print(f"\n{len(changed)} source doc(s) changed: {', '.join(changed)}")
+            if failed:
+                print(f"Retrying {len(failed)} file(s) from a failed change set: {', '.join(failed)}")
+            changed = sorted(set(changed) | set(failed))
+            failed = changed if run_change_set(client, corpus, snapshot, manifest, args, changed) else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze source doc changes and update enablement modules in one process")
+    parser.add_argument("--changes-file", help="Hunk-level changes JSON written by scripts/changes.py "
+                                               "(default: every source doc, filtered by the section snapshot)")
+    parser.add_argument("--watch", action="store_true", help="Keep running and process source-docs/ edits as they land")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"Seconds between polls in watch mode (default: {DEFAULT_INTERVAL:g})")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help=f"Seconds without edits before a change set runs (default: {DEFAULT_DEBOUNCE:g})")
+    parser.add_argument("--output", help="Also write each impact analysis to this JSON file")
+    parser.add_argument("--render", action="store_true",
+                        help="Re-render trainer-resources/ from the modules after each update")
+    parser.add_argument("--mode", choices=["patch", "full"], default="patch",
+                        help="Ask for section edits or always rewrite whole modules (default: patch)")
+    parser.add_argument("--timeout", type=int, default=600, help="Seconds to wait for a batch to finish (default: 600)")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K,
+                        help=f"Candidate modules shortlisted per changed section (default: {DEFAULT_TOP_K})")
+    parser.add_argument("--shard-tokens", type=int, default=DEFAULT_SHARD_TOKENS,
+                        help=f"Prompt token budget per impact request (default: {DEFAULT_SHARD_TOKENS})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Impact shards analyzed concurrently (default: {DEFAULT_WORKERS})")
+    add_plan_arguments(parser)
+    add_source_arguments(parser)
+    add_schedule_arguments(parser)
+    parser.add_argument("--no-share", action="store_true",
+                        help="Update every module separately instead of generating shared passages once")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("✗ ANTHROPIC_API_KEY not set. Add it to .env or set the environment variable.")
+        return 1
+    client = LazyClient(api_key)
+    args.cache = cache_from_args(args)
+
+    corpus = SourceCorpus()
+    corpus.refresh()
+    print(f"✓ Loaded {corpus.selector.characters} characters from {len(corpus.sections)} source files")
+    snapshot = load_snapshot()
+    manifest = BuildManifest()
+
+    source_changes = None
+    if args.changes_file:
+        source_changes = load_changes(args.changes_file)
+        changed_files = [c["path"] for c in source_changes]
+    else:
+        changed_files = sorted(corpus.sections)
+    try:
+        status = run_change_set(client, corpus, snapshot, manifest, args, changed_files, source_changes)
+        if args.watch:
+            try:
+                watch(client, corpus, snapshot, manifest, args, changed_files if status else [])
+            except KeyboardInterrupt:
+                print("\nStopped watching")
+    except BudgetExceededError as e:
+        print(f"✗ Stopped: {e}")
+        return 1
+    return status
+
+
+if __name__ == "__main__":
+    exit(main())
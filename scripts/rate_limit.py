@@ -0,0 +1,148 @@
+# scripts/rate_limit.py
+"""
+Shared requests/minute and tokens/minute limiter for concurrent Claude calls.
+Bucket sizes start from optional CLI caps and are corrected from the
+anthropic-ratelimit-* response headers as responses come back.
+
+`rate_limiter` is the process-wide instance every sync call goes through
+unless a caller passes its own; under workspace.py it is a proxy to one
+limiter shared by every product's process (see shared_limits.py).
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from shared_limits import connect
+
+# Rough characters-per-token ratio used to estimate request size up front
+CHARS_PER_TOKEN = 4
+
+
+def estimate_input_tokens(params: dict) -> int:
+    """Cheap upper-bound estimate of a request's input tokens."""
+    chars = 0
+    for block in params.get("system") or []:
+        chars += len(block.get("text", "")) if isinstance(block, dict) else len(str(block))
+    for message in params.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            chars += len(content)
+        else:
+            chars += sum(len(block.get("text", "")) for block in content if isinstance(block, dict))
+    return chars // CHARS_PER_TOKEN + 1
+
+
+def _parse_reset(value: str | None) -> float | None:
+    """Convert an RFC 3339 reset timestamp header to epoch seconds."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """A refilling bucket; capacity None means unlimited."""
+
+    def __init__(self, per_minute: int | None = None):
+        self.capacity = float(per_minute) if per_minute else None
+        self.level = self.capacity or 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken; 0 if it can be taken now."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.capacity is None:
+            return 0.0
+        # Oversized requests go through once the bucket is full
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.capacity is not None:
+            self.level -= min(amount, self.capacity)
+
+    def observe(self, limit: str | None, remaining: str | None, reset: str | None) -> None:
+        """Resize the bucket from rate-limit headers."""
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None and self.capacity is not None:
+            self.level = min(self.capacity, float(remaining))
+            reset_at = _parse_reset(reset)
+            if float(remaining) <= 0 and reset_at is not None:
+                self.blocked_until = now + max(0.0, reset_at - time.time())
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter shared by every worker in a process.
+
+    acquire() blocks until both the request and input-token buckets have
+    room; observe() feeds back the limits the API reports.
+    """
+
+    def __init__(self, requests_per_minute: int | None = None, tokens_per_minute: int | None = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+
+    def configure(self, requests_per_minute: int | None = None, tokens_per_minute: int | None = None) -> None:
+        """Apply CLI caps; buckets without a cap keep what the headers reported."""
+        with self._lock:
+            if requests_per_minute:
+                self.requests = TokenBucket(requests_per_minute)
+            if tokens_per_minute:
+                self.tokens = TokenBucket(tokens_per_minute)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for `seconds`, e.g. after a 429 with retry-after."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            for bucket in (self.requests, self.tokens):
+                bucket.blocked_until = max(bucket.blocked_until, until)
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """Block until there is capacity; returns the seconds spent waiting."""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(estimated_tokens)
+                    return now - start
+            time.sleep(min(wait, 5.0))
+
+    def observe(self, headers) -> None:
+        with self._lock:
+            self.requests.observe(
+                headers.get("anthropic-ratelimit-requests-limit"),
+                headers.get("anthropic-ratelimit-requests-remaining"),
+                headers.get("anthropic-ratelimit-requests-reset"),
+            )
+            prefix = "anthropic-ratelimit-input-tokens"
+            if headers.get(f"{prefix}-limit") is None:
+                prefix = "anthropic-ratelimit-tokens"
+            self.tokens.observe(
+                headers.get(f"{prefix}-limit"),
+                headers.get(f"{prefix}-remaining"),
+                headers.get(f"{prefix}-reset"),
+            )
+
+
+rate_limiter = connect("rate_limiter") or RateLimiter()
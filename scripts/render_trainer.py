@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Renders trainer-resources/ from the enablement modules.
+
+Each module becomes a run of slides, with talk tracks taken from its
+"Instructor Note:" callouts, plus a facilitator-guide section. Modules
+are rendered across a process pool and each rendering is cached under
+.enablement-cache/trainer by the module's content hash, so after editing
+one module only that module is re-rendered; the deck and guide are then
+reassembled from the cached parts.
+
+Outputs are Markdown (a Marp-compatible deck with speaker notes, and the
+guide), plus .pptx / .docx when python-pptx / python-docx are installed.
+Every run that changes the outputs appends an entry to
+trainer-resources/release-notes.md.
+"""
+
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from corpus import corpus_label
+from corpus_store import CorpusStore
+from retrieval import SPECS_PATH, load_specs, spec_for_module
+from sections import CACHE_DIR, FENCE_RE, MODULES_DIR, PROJECT_ROOT, content_hash, normalize_heading, split_sections
+
+TRAINER_DIR = PROJECT_ROOT / "trainer-resources"
+RELEASE_NOTES_PATH = TRAINER_DIR / "release-notes.md"
+RENDER_CACHE_DIR = CACHE_DIR / "trainer"
+RENDER_STATE_PATH = RENDER_CACHE_DIR / "state.json"
+DECK_TITLE = "Mastering Claude Code Plugins"
+# Bump whenever the rendering below changes, to invalidate cached parts
+RENDERER_VERSION = 1
+
+# Bullets per slide, words per bullet and words of fallback talk track
+MAX_BULLETS = 6
+MAX_BULLET_WORDS = 24
+MAX_TRACK_WORDS = 120
+
+NOTE_RE = re.compile(r"^(?:>\s*)*(?:[-*]\s+)?\**\s*Instructor Note\s*:?\s*\**\s*:?\s*(.*)$", re.IGNORECASE)
+LIST_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.*)$")
+TAG_RE = re.compile(r"^\s*</?[A-Za-z][^>]*>\s*$")
+LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+EMPHASIS_RE = re.compile(r"(\*\*|__|\*|_)(\S(?:.*?\S)?)\1")
+# Headings of sections rendered into the guide's activity list
+ACTIVITY_RE = re.compile(r"\b(demo|lab|activity|hands on|exercise|walkthrough|steps)\b")
+
+
+def plain(text: str) -> str:
+    """Inline markdown reduced to slide text: links to their labels, no emphasis."""
+    text = LINK_RE.sub(r"\1", text)
+    text = EMPHASIS_RE.sub(r"\2", text)
+    return " ".join(text.split())
+
+
+def shorten(text: str, words: int) -> str:
+    parts = text.split()
+    return text if len(parts) <= words else " ".join(parts[:words]) + " …"
+
+
+def parse_blocks(content: str) -> dict:
+    """
+    A section's body as {'notes', 'bullets', 'paragraphs'}: instructor notes
+    (with their blockquote continuation lines), list items and prose.
+    Code blocks, tables, headings and bare HTML-style tags are left out.
+    """
+    notes, bullets, paragraphs = [], [], []
+    paragraph: list[str] = []
+    note: list[str] | None = None
+    in_fence = False
+
+    def end_paragraph():
+        if paragraph:
+            paragraphs.append(plain(" ".join(paragraph)))
+            paragraph.clear()
+
+    for line in content.split("\n")[1:] if content.startswith("#") else content.split("\n"):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+            end_paragraph()
+            continue
+        if in_fence:
+            continue
+        match = NOTE_RE.match(line.strip())
+        if match:
+            end_paragraph()
+            note = [match.group(1)]
+            notes.append(note)
+            continue
+        if note is not None and line.lstrip().startswith(">") and line.strip(" >"):
+            note.append(line.strip(" >"))
+            continue
+        note = None
+        stripped = line.strip().lstrip("> ").strip()
+        if not stripped or TAG_RE.match(stripped) or stripped.startswith(("#", "|")):
+            end_paragraph()
+            continue
+        item = LIST_RE.match(stripped)
+        if item:
+            end_paragraph()
+            bullets.append(plain(item.group(1)))
+        else:
+            paragraph.append(stripped)
+    end_paragraph()
+    return {"notes": [plain(" ".join(n)) for n in notes if plain(" ".join(n))],
+            "bullets": [b for b in bullets if b], "paragraphs": [p for p in paragraphs if p]}
+
+
+def first_sentence(paragraph: str) -> str:
+    return re.split(r"(?<=[.!?])\s", paragraph, maxsplit=1)[0]
+
+
+def render_module(label: str, text: str, spec: dict | None = None) -> dict:
+    """
+    Slides and a facilitator-guide section for one module.
+
+    Every H1/H2 section starts a slide and deeper sections fold into it.
+    Bullets are the section's list items (or the first sentence of each
+    paragraph); the talk track is its Instructor Notes, or its opening
+    prose when it has none.
+    """
+    sections = split_sections(text)
+    headed = [s for s in sections if s["level"] > 0]
+    title = (spec or {}).get("title") or (plain(headed[0]["heading"]) if headed else Path(label).stem)
+
+    slides = [{"title": title, "bullets": [shorten(plain((spec or {}).get("description", "")), 40)]
+               if (spec or {}).get("description") else [], "notes": "", "kind": "title"}]
+    guide = {"objectives": [], "notes": [], "prompts": [], "activities": [], "takeaways": []}
+    slide = None
+    for section in headed:
+        blocks = parse_blocks(section["content"])
+        heading = plain(section["heading"])
+        normalized = normalize_heading(heading)
+        if section["level"] <= 2 or slide is None:
+            slide = {"title": heading, "bullets": [], "notes": "", "kind": "content", "_track": []}
+            slides.append(slide)
+        elif blocks["bullets"] or blocks["paragraphs"]:
+            slide["bullets"].append(heading)
+
+        bullets = blocks["bullets"] or [first_sentence(p) for p in blocks["paragraphs"]]
+        slide["bullets"].extend(shorten(b, MAX_BULLET_WORDS) for b in bullets)
+        slide["_track"].extend(blocks["notes"])
+        if not blocks["notes"] and not slide["notes"]:
+            slide["notes"] = shorten(" ".join(blocks["paragraphs"]), MAX_TRACK_WORDS)
+
+        guide["notes"].extend({"section": heading, "note": note} for note in blocks["notes"])
+        guide["prompts"].extend(line for line in blocks["bullets"] + blocks["paragraphs"] if line.endswith("?"))
+        if "learning objectives" in normalized:
+            guide["objectives"].extend(blocks["bullets"])
+        elif "key takeaways" in normalized:
+            guide["takeaways"].extend(blocks["bullets"])
+        elif ACTIVITY_RE.search(normalized):
+            guide["activities"].append(heading)
+
+    for slide in slides:
+        track = slide.pop("_track", [])
+        if track:
+            slide["notes"] = " ".join(track)
+        slide["bullets"] = slide["bullets"][:MAX_BULLETS]
+
+    return {
+        "module": label,
+        "title": title,
+        "minutes": (spec or {}).get("estimated_delivery_minutes"),
+        "slides": slides,
+        "guide": guide,
+    }
+
+
+def render_job(job: tuple[str, dict | None]) -> dict:
+    """Render one module from disk; a (label, spec) job for the process pool."""
+    label, spec = job
+    return render_module(label, (PROJECT_ROOT / label).read_text(encoding="utf-8"), spec)
+
+
+def part_key(file_hash: str, spec: dict | None) -> str:
+    """Cache key of a module's rendering: its content, spec and the renderer version."""
+    return content_hash(f"{RENDERER_VERSION}\0{file_hash}\0{json.dumps(spec, sort_keys=True)}")
+
+
+def load_part(key: str) -> dict | None:
+    try:
+        return json.loads((RENDER_CACHE_DIR / f"{key}.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, OSError, json.JSONDecodeError):
+        return None
+
+
+def save_part(key: str, part: dict) -> None:
+    RENDER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = RENDER_CACHE_DIR / f"{key}.json.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(part, f)
+    tmp_path.replace(RENDER_CACHE_DIR / f"{key}.json")
+
+
+def render_parts(module_paths, specs: list[dict], workers: int | None = None, force: bool = False,
+                 store: CorpusStore | None = None, refresh=()) -> tuple[list[dict], dict[str, str], list[str]]:
+    """
+    Every module's rendering, re-rendering only modules whose cached part is
+    missing or whose label is in `refresh` (or all of them with force).
+
+    Returns (parts in module order, {label: part key}, re-rendered labels).
+    """
+    store = store or CorpusStore()
+    store.refresh(module_paths)
+    labels = [corpus_label(path) for path in module_paths]
+    labels = [label for label in labels if store.entry(label)]
+    specs_for = {label: spec_for_module(label, specs) for label in labels}
+    keys = {label: part_key(store.file_hash(label), specs_for[label]) for label in labels}
+
+    parts = {} if force else {label: load_part(keys[label]) for label in labels if label not in refresh}
+    missing = [label for label in labels if parts.get(label) is None]
+    if missing:
+        jobs = [(label, specs_for[label]) for label in missing]
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                rendered = list(pool.map(render_job, jobs))
+        else:
+            rendered = list(map(render_job, jobs))
+        for label, part in zip(missing, rendered):
+            save_part(keys[label], part)
+            parts[label] = part
+    return [parts[label] for label in labels], keys, missing
+
+
+def deck_markdown(title: str, parts: list[dict]) -> str:
+    """The deck as Marp-compatible Markdown, talk tracks as speaker notes."""
+    slides = [f"# {title}\n\n{sum(len(p['slides']) for p in parts)} slides from {len(parts)} modules"]
+    for part in parts:
+        for slide in part["slides"]:
+            heading = "#" if slide["kind"] == "title" else "##"
+            body = "\n".join(f"- {bullet}" for bullet in slide["bullets"])
+            notes = f"\n\n<!--\n{slide['notes']}\n-->" if slide["notes"] else ""
+            slides.append(f"{heading} {slide['title']}" + (f"\n\n{body}" if body else "") + notes)
+    return f"---\nmarp: true\ntitle: {title}\n---\n\n" + "\n\n---\n\n".join(slides) + "\n"
+
+
+def guide_sections(part: dict) -> list[tuple[str, list[str]]]:
+    """A module's guide subsections as (heading, items), skipping empty ones."""
+    guide = part["guide"]
+    sections = [
+        ("Learning Objectives", guide["objectives"]),
+        ("Instructor Notes", [f"{n['section']}: {n['note']}" for n in guide["notes"]]),
+        ("Discussion Prompts", guide["prompts"]),
+        ("Activities and Demos", guide["activities"]),
+        ("Key Takeaways", guide["takeaways"]),
+        ("Slide Outline", [slide["title"] for slide in part["slides"][1:]]),
+    ]
+    return [(heading, items) for heading, items in sections if items]
+
+
+def guide_markdown(title: str, parts: list[dict]) -> str:
+    """The facilitator guide as Markdown, one section per module."""
+    lines = [f"# Facilitator's Guide - {title}", ""]
+    for number, part in enumerate(parts, 1):
+        lines += [f"## Module {number}: {part['title']}", ""]
+        timing = f" · {part['minutes']} minutes" if part["minutes"] else ""
+        lines += [f"*Source: `{part['module']}`{timing} · {len(part['slides'])} slides*", ""]
+        for heading, items in guide_sections(part):
+            lines += [f"### {heading}", "", *(f"- {item}" for item in items), ""]
+    return "\n".join(lines)
+
+
+def write_pptx(path: Path, title: str, parts: list[dict]) -> bool:
+    """Write the deck as .pptx; False if python-pptx is not installed."""
+    try:
+        from pptx import Presentation
+    except ImportError:
+        return False
+    presentation = Presentation()
+    title_layout, content_layout = presentation.slide_layouts[0], presentation.slide_layouts[1]
+    cover = presentation.slides.add_slide(title_layout)
+    cover.shapes.title.text = title
+    cover.placeholders[1].text = f"{len(parts)} modules"
+    for part in parts:
+        for slide in part["slides"]:
+            page = presentation.slides.add_slide(title_layout if slide["kind"] == "title" else content_layout)
+            page.shapes.title.text = slide["title"]
+            page.placeholders[1].text = "\n".join(slide["bullets"])
+            if slide["notes"]:
+                page.notes_slide.notes_text_frame.text = slide["notes"]
+    presentation.save(path)
+    return True
+
+
+def write_docx(path: Path, title: str, parts: list[dict]) -> bool:
+    """Write the facilitator guide as .docx; False if python-docx is not installed."""
+    try:
+        from docx import Document
+    except ImportError:
+        return False
+    document = Document()
+    document.add_heading(f"Facilitator's Guide - {title}", 0)
+    for number, part in enumerate(parts, 1):
+        document.add_heading(f"Module {number}: {part['title']}", 1)
+        timing = f" · {part['minutes']} minutes" if part["minutes"] else ""
+        document.add_paragraph().add_run(f"Source: {part['module']}{timing} · {len(part['slides'])} slides").italic = True
+        for heading, items in guide_sections(part):
+            document.add_heading(heading, 2)
+            for item in items:
+                document.add_paragraph(item, style="List Bullet")
+    document.save(path)
+    return True
+
+
+def load_state() -> dict:
+    try:
+        return json.loads(RENDER_STATE_PATH.read_text(encoding="utf-8"))
+    except (FileNotFoundError, OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state: dict) -> None:
+    RENDER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(RENDER_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def append_release_notes(title: str, parts: list[dict], changed: list[str], removed: list[str],
+                         outputs: list[Path], path: Path = RELEASE_NOTES_PATH) -> None:
+    """Append one dated entry describing a render to the release notes."""
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    titles = {part["module"]: part["title"] for part in parts}
+    lines = [f"## {now}", "",
+             f"- {title}: {sum(len(p['slides']) for p in parts)} slides from {len(parts)} modules",
+             *(f"- Updated: {titles.get(label, label)} (`{label}`)" for label in changed),
+             *(f"- Removed: `{label}`" for label in removed),
+             f"- Files: {', '.join(f'`{p.name}`' for p in outputs)}", ""]
+    existing = path.read_text(encoding="utf-8") if path.exists() else ""
+    header = "" if existing.strip() else "# Release Notes\n\n"
+    separator = "\n" if existing and not existing.endswith("\n") else ""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(separator + header + "\n".join(lines) + "\n")
+
+
+def render_resources(refresh=None, specs: list[dict] | None = None, title: str = DECK_TITLE,
+                     output_dir: Path = TRAINER_DIR, workers: int | None = None, force: bool = False,
+                     store: CorpusStore | None = None) -> list[Path]:
+    """
+    Render the deck and facilitator guide from every module into
+    output_dir and note the release; returns the files written, or [] when
+    nothing changed. Modules in `refresh` are re-rendered even if their
+    cached part is current.
+    """
+    module_paths = sorted(MODULES_DIR.glob("*.md"))
+    labels = {corpus_label(path) for path in module_paths}
+    refresh = {corpus_label(path) for path in refresh or []}
+    for label in sorted(refresh - labels):
+        print(f"⚠ {label} is not a module in {corpus_label(MODULES_DIR)}; skipping it")
+    refresh &= labels
+    specs = load_specs() if specs is None else specs
+    output_dir = Path(output_dir)
+    parts, keys, rendered = render_parts(module_paths, specs, workers, force, store, refresh)
+
+    deck_stem = f"{title} (generated)"
+    guide_stem = f"Facilitator's Guide - {title} (generated)"
+    deck_path, guide_path = output_dir / f"{deck_stem}.md", output_dir / f"{guide_stem}.md"
+    state = load_state()
+    previous = state.get(corpus_label(deck_path), {})
+    changed = [label for label in keys if previous.get(label) != keys[label]]
+    removed = sorted(set(previous) - set(keys))
+    if not (force or refresh or changed or removed) and deck_path.exists() and guide_path.exists():
+        print(f"✓ Trainer resources up to date ({len(parts)} modules)")
+        return []
+    print(f"✓ Rendered {len(rendered)} module(s), {len(parts) - len(rendered)} from the render cache")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    deck_path.write_text(deck_markdown(title, parts), encoding="utf-8")
+    guide_path.write_text(guide_markdown(title, parts), encoding="utf-8")
+    outputs = [deck_path, guide_path]
+    if write_pptx(output_dir / f"{deck_stem}.pptx", title, parts):
+        outputs.append(output_dir / f"{deck_stem}.pptx")
+    else:
+        print("⚠ python-pptx is not installed; wrote the Markdown deck only")
+    if write_docx(output_dir / f"{guide_stem}.docx", title, parts):
+        outputs.append(output_dir / f"{guide_stem}.docx")
+    else:
+        print("⚠ python-docx is not installed; wrote the Markdown guide only")
+    for path in outputs:
+        print(f"✓ Wrote {corpus_label(path)}")
+
+    append_release_notes(title, parts, changed, removed, outputs, output_dir / RELEASE_NOTES_PATH.name)
+    state[corpus_label(deck_path)] = keys
+    save_state(state)
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render trainer-resources/ slides and facilitator guide from modules")
+    parser.add_argument("modules", nargs="*",
+                        help="Modules to re-render even if cached; the deck and guide always cover every module")
+    parser.add_argument("--specs", default=str(SPECS_PATH), help="Module specs JSON (default: plugin-module-specs.json)")
+    parser.add_argument("--title", default=DECK_TITLE, help=f"Deck title (default: {DECK_TITLE})")
+    parser.add_argument("--output-dir", default=str(TRAINER_DIR), help="Where to write (default: trainer-resources/)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="Re-render every module, ignoring the render cache")
+    args = parser.parse_args()
+
+    render_resources([Path(p) for p in args.modules] or None, load_specs(Path(args.specs)), args.title,
+                     Path(args.output_dir), args.workers, args.force)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
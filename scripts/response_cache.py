@@ -0,0 +1,206 @@
+# scripts/response_cache.py
+"""
+Content-addressed on-disk cache for Claude responses.
+Identical requests (same model, system blocks, messages and max_tokens)
+are answered from disk instead of being paid for again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sections import CACHE_DIR
+from rate_limit import estimate_input_tokens, rate_limiter
+from telemetry import run_metrics, spend_budget
+from api_client import call_with_retries
+
+DEFAULT_CACHE_DIR = CACHE_DIR / "responses"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Eviction trims the cache to this share of max_bytes, so a full cache is
+# not rescanned on every put
+EVICT_TO = 0.9
+
+# Request fields that determine the response
+KEY_FIELDS = ("model", "system", "messages", "max_tokens")
+
+
+def request_key(params: dict) -> str:
+    """Stable hash of the fields of a request that determine its response."""
+    keyed = {field: params.get(field) for field in KEY_FIELDS}
+    blob = json.dumps(keyed, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of Message responses stored as JSON files.
+
+    Entries live at <directory>/<key[:2]>/<key>.json and are written
+    atomically. A hit refreshes the entry's mtime. The cache's size is
+    scanned once, then kept as a running total of what this instance
+    writes; once it exceeds max_bytes, eviction rescans the directory and
+    removes the least recently used entries down to EVICT_TO of it.
+    """
+
+    def __init__(self, directory: Path | str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: int | None = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, params: dict):
+        """Return the cached Message for a request, or None."""
+        from anthropic.types import Message
+
+        path = self._path(request_key(params))
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Message.model_validate(data)
+
+    def put(self, params: dict, message) -> None:
+        """Store a Message response for a request, then enforce the size bound."""
+        self.put_key(request_key(params), message)
+
+    def put_key(self, key: str, message) -> None:
+        """Store a Message under a precomputed request_key()."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(message.model_dump(mode="json"), f)
+            written = os.stat(tmp_name).st_size
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            # The first put scans the directory, which already holds this entry
+            self._size = self._scan()[1] if self._size is None else self._size + written - replaced
+            full = self._size > self.max_bytes
+        if full:
+            self.evict()
+
+    def _scan(self) -> tuple[list[tuple[float, int, Path]], int]:
+        """Every entry as (mtime, size, path), and their total size."""
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits EVICT_TO of max_bytes."""
+        with self._lock:
+            entries, total = self._scan()
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+            self._size = total
+
+
+def create_message(client, params: dict, cache: ResponseCache | None = None, limiter=None, label: str = ""):
+    """
+    client.messages.create(**params), answered from the cache when possible.
+
+    Uncached calls wait for capacity on `limiter` (the process-wide
+    rate_limiter by default), feed the response's rate-limit headers back
+    to it and retry transient errors with backoff. Every call is recorded
+    in run_metrics under `label`; uncached calls raise BudgetExceededError
+    once the spend budget is used up.
+    """
+    if cache is not None:
+        cached = cache.get(params)
+        if cached is not None:
+            run_metrics.record_call("cache_hit", label, cached)
+            return cached
+    spend_budget.check()
+    limiter = rate_limiter if limiter is None else limiter
+    queue_time = 0.0
+
+    def attempt():
+        nonlocal queue_time
+        queue_time += limiter.acquire(estimate_input_tokens(params))
+        raw = client.messages.with_raw_response.create(**params)
+        limiter.observe(raw.headers)
+        return raw.parse()
+
+    start = time.monotonic()
+    response, retries = call_with_retries(attempt, limiter, label)
+    run_metrics.record_call("sync", label, response, time.monotonic() - start - queue_time, queue_time, retries)
+    if cache is not None:
+        cache.put(params, response)
+    return response
+
+
+def stream_message(client, params: dict, on_text, cache: ResponseCache | None = None, limiter=None,
+                   label: str = ""):
+    """
+    Like create_message, but via client.messages.stream(**params), calling
+    on_text(chunk) as text arrives. A cache hit delivers the whole text in
+    one chunk. Errors are only retried before any text has been delivered.
+    Returns the final Message.
+    """
+    if cache is not None:
+        cached = cache.get(params)
+        if cached is not None:
+            run_metrics.record_call("cache_hit", label, cached)
+            on_text("".join(block.text for block in cached.content if block.type == "text"))
+            return cached
+    spend_budget.check()
+    limiter = rate_limiter if limiter is None else limiter
+    queue_time = 0.0
+    delivered = False
+
+    def attempt():
+        nonlocal queue_time, delivered
+        queue_time += limiter.acquire(estimate_input_tokens(params))
+        with client.messages.stream(**params) as stream:
+            limiter.observe(stream.response.headers)
+            for text in stream.text_stream:
+                delivered = True
+                on_text(text)
+            return stream.get_final_message()
+
+    start = time.monotonic()
+    response, retries = call_with_retries(attempt, limiter, label, can_retry=lambda: not delivered)
+    run_metrics.record_call("sync", label, response, time.monotonic() - start - queue_time, queue_time, retries)
+    if cache is not None:
+        cache.put(params, response)
+    return response
+
+
+def add_cache_arguments(parser) -> None:
+    """Add the shared --no-cache / --cache-dir options to an argparse parser."""
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always call the API; do not read or write the response cache')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                        help=f'Response cache directory (default: {DEFAULT_CACHE_DIR})')
+
+
+def cache_from_args(args) -> ResponseCache | None:
+    """Build the response cache selected by the shared CLI options."""
+    return None if args.no_cache else ResponseCache(args.cache_dir)
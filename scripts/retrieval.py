@@ -0,0 +1,262 @@
+# scripts/retrieval.py
+"""
+Offline BM25 index over enablement module sections and module specs.
+Used to shortlist candidate modules before anything is sent to Claude.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+
+from corpus_store import CorpusStore
+from sections import CACHE_DIR, PROJECT_ROOT
+
+INDEX_PATH = CACHE_DIR / "module-index.json"
+SPECS_PATH = PROJECT_ROOT / os.environ.get("ENABLEMENT_SPECS", "plugin-module-specs.json")
+INDEX_VERSION = 2
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+SPEC_ANCHOR = "(spec)"
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9_\-]*")
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how if in into is it
+its not of on or that the their them then there these this to was were what when
+which will with you your yours we our us can't don't i e g
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens with stopwords and single characters removed."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def term_frequencies(text: str) -> dict[str, int]:
+    """Count tokens in a block of text."""
+    tf: dict[str, int] = {}
+    for token in tokenize(text):
+        tf[token] = tf.get(token, 0) + 1
+    return tf
+
+
+def load_specs(path: Path = SPECS_PATH) -> list[dict]:
+    """Load module specs, or an empty list if the specs file is missing."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("modules", [])
+    except (FileNotFoundError, OSError, json.JSONDecodeError):
+        return []
+
+
+def spec_for_module(module_path: str, specs: list[dict]) -> dict | None:
+    """
+    Find the spec entry for a module file.
+
+    Spec filenames omit the version suffix, so 'module-4-plugin-installation.md'
+    matches 'enablement-modules/module-4-plugin-installation_v1.md'.
+    """
+    stem = re.sub(r"_v\d+$", "", Path(module_path).stem)
+    for spec in specs:
+        if Path(spec.get("filename", "")).stem == stem:
+            return spec
+    return None
+
+
+def spec_text(spec: dict) -> str:
+    """Searchable text for a spec entry; tags are repeated to weight them up."""
+    tags = " ".join(spec.get("tags", []))
+    return f"{spec.get('title', '')}\n{spec.get('description', '')}\n{tags}\n{tags}"
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class ModuleIndex:
+    """
+    Inverted BM25 index over module sections and their spec entries.
+
+    Each indexed document is one module section (or one spec entry) with id
+    '<module path>#<anchor>'. Per-module content hashes make refresh()
+    incremental: only modules whose file or spec changed are re-indexed.
+    """
+
+    def __init__(self, data: dict | None = None):
+        data = data or {}
+        self.modules: dict[str, dict] = data.get("modules", {})
+        self.docs: dict[str, dict] = data.get("docs", {})
+        self.postings: dict[str, dict[str, int]] = data.get("postings", {})
+        self.total_length: int = data.get("total_length", 0)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH) -> "ModuleIndex":
+        """Load a persisted index, or start an empty one."""
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            return cls()
+        if data.get("version") != INDEX_VERSION:
+            return cls()
+        return cls(data)
+
+    def save(self, path: Path = INDEX_PATH) -> None:
+        """Persist the index atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "modules": self.modules,
+                "docs": self.docs,
+                "postings": self.postings,
+                "total_length": self.total_length,
+            }, f, sort_keys=True)
+        tmp_path.replace(path)
+
+    def _add_doc(self, doc_id: str, module: str, anchor: str, text: str) -> None:
+        tf = term_frequencies(text)
+        length = sum(tf.values())
+        self.docs[doc_id] = {"module": module, "anchor": anchor, "length": length, "tf": tf}
+        self.total_length += length
+        for term, count in tf.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+
+    def _remove_module(self, module: str) -> None:
+        for doc_id in self.modules.pop(module, {}).get("docs", []):
+            doc = self.docs.pop(doc_id, None)
+            if not doc:
+                continue
+            self.total_length -= doc["length"]
+            for term in doc["tf"]:
+                posting = self.postings.get(term, {})
+                posting.pop(doc_id, None)
+                if not posting:
+                    self.postings.pop(term, None)
+
+    def refresh(self, module_paths: list[str], specs: list[dict], store: CorpusStore | None = None) -> list[str]:
+        """
+        Bring the index up to date with the given modules and specs.
+
+        Module files are tracked by the corpus store, so an unchanged module
+        is recognized from its size and mtime without being read. Returns
+        the module paths that were (re-)indexed.
+        """
+        store = store or CorpusStore()
+        store.refresh([PROJECT_ROOT / module for module in module_paths])
+        reindexed = []
+        for stale in set(self.modules) - set(module_paths):
+            self._remove_module(stale)
+
+        for module in module_paths:
+            file_hash = store.file_hash(module)
+            if file_hash is None:
+                self._remove_module(module)
+                continue
+            spec = spec_for_module(module, specs)
+            spec_blob = spec_text(spec) if spec else ""
+            fingerprint = _hash(file_hash + "\0" + spec_blob)
+            if self.modules.get(module, {}).get("hash") == fingerprint:
+                continue
+
+            self.add_module(module, store.sections(module), spec_blob, fingerprint)
+            reindexed.append(module)
+
+        return reindexed
+
+    def add_module(self, module: str, sections, spec_blob: str = "", fingerprint: str | None = None) -> None:
+        """
+        (Re-)index one document's sections, plus its spec text if any.
+        `sections` is iterated once, so a lazy StoredSections works.
+        """
+        self._remove_module(module)
+        doc_ids = []
+        for section in sections:
+            doc_id = f"{module}#{section['anchor']}"
+            self._add_doc(doc_id, module, section["anchor"], section["content"])
+            doc_ids.append(doc_id)
+        if spec_blob:
+            doc_id = f"{module}#{SPEC_ANCHOR}"
+            self._add_doc(doc_id, module, SPEC_ANCHOR, spec_blob)
+            doc_ids.append(doc_id)
+        self.modules[module] = {"hash": fingerprint, "docs": doc_ids}
+
+    def score(self, query: str) -> dict[str, float]:
+        """BM25 score of every matching document for a free-text query."""
+        n_docs = len(self.docs)
+        if not n_docs:
+            return {}
+        avg_length = self.total_length / n_docs or 1.0
+        scores: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                length = self.docs[doc_id]["length"]
+                norm = tf + K1 * (1 - B + B * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / norm
+        return scores
+
+    def rank_modules(self, query: str, top_k: int) -> list[dict]:
+        """
+        Top-k modules for a query, scored by their best-matching document.
+
+        Returns [{'module', 'score', 'anchor'}] sorted by score, then path,
+        so rankings are deterministic.
+        """
+        best: dict[str, tuple[float, str]] = {}
+        for doc_id, score in self.score(query).items():
+            doc = self.docs[doc_id]
+            current = best.get(doc["module"])
+            if current is None or (score, doc["anchor"]) > current:
+                best[doc["module"]] = (score, doc["anchor"])
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[0]))
+        return [
+            {"module": module, "score": round(score, 4), "anchor": anchor}
+            for module, (score, anchor) in ranked[:top_k]
+        ]
+
+    def best_sections(self, module: str, query: str, limit: int) -> list[str]:
+        """Anchors of a module's highest-scoring sections for a query."""
+        scores = self.score(query)
+        anchors = [
+            (score, self.docs[doc_id]["anchor"])
+            for doc_id, score in scores.items()
+            if self.docs[doc_id]["module"] == module and self.docs[doc_id]["anchor"] != SPEC_ANCHOR
+        ]
+        return [anchor for _, anchor in sorted(anchors, key=lambda a: (-a[0], a[1]))[:limit]]
+
+
+def load_index(module_paths: list[str], specs: list[dict] | None = None) -> ModuleIndex:
+    """Load the persisted index, refresh it incrementally and save it back."""
+    index = ModuleIndex.load()
+    if index.refresh(module_paths, load_specs() if specs is None else specs) or not INDEX_PATH.exists():
+        index.save()
+    return index
+
+
+def shortlist_modules(index: ModuleIndex, query_sections: list[dict], top_k: int) -> list[dict]:
+    """
+    Union of the top-k modules for each changed section.
+
+    Each entry is {'module', 'score', 'anchor', 'section', 'sections'} where
+    'anchor' is the best-matching module section, 'section' the changed source
+    section that ranked it highest and 'sections' every changed section that
+    shortlisted it. Sorted by score, then path.
+    """
+    candidates: dict[str, dict] = {}
+    for section in query_sections:
+        query = f"{section['heading']}\n{section['heading']}\n{section['content']}"
+        for hit in index.rank_modules(query, top_k):
+            current = candidates.get(hit["module"])
+            sections = (current["sections"] if current else []) + [section["anchor"]]
+            if current is None or hit["score"] > current["score"]:
+                candidates[hit["module"]] = {**hit, "section": section["anchor"], "sections": sections}
+            else:
+                current["sections"] = sections
+    return sorted(candidates.values(), key=lambda c: (-c["score"], c["module"]))
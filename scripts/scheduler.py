@@ -0,0 +1,318 @@
+# scripts/scheduler.py
+"""
+Priority-aware scheduling of module updates over two lanes.
+
+Modules whose impact priority is in the fast lane (high, by default) are
+sent as concurrent synchronous calls, and each result is written to the
+working tree as soon as it comes back. Everything else goes through the
+Batch API at half price. Both lanes run at the same time, so urgent
+modules land within minutes while the batch is still processing.
+
+A deadline bounds the whole update: the batch lane is waited on only
+until it passes (unfinished batches stay in the ledger for --resume), and
+fast-lane calls not started by then are queued for the next run. A cost
+ceiling is checked against an upper-bound estimate of every request. Over
+the ceiling, fast-lane modules are demoted to the cheaper batch lane
+first, then the lowest-priority modules are deferred. Deferred modules are
+queued in .enablement-cache/deferred-modules.json and added to the next
+update's affected modules until one of them writes the module.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from analyze_impact import PRIORITY_RANK
+from batch_jobs import render_result, run_batch, save_module
+from rate_limit import estimate_input_tokens
+from response_cache import create_message
+from sections import CACHE_DIR
+from telemetry import BATCH_DISCOUNT, CACHE_WRITE_MULTIPLIER, BudgetExceededError, model_prices
+
+DEFAULT_FAST_PRIORITIES = ("high",)
+DEFAULT_FAST_WORKERS = 4
+DEFERRED_PATH = CACHE_DIR / "deferred-modules.json"
+
+
+def request_priority(req: dict) -> str:
+    """Impact priority of a request mapping entry, in either impact shape."""
+    module_info = req.get("module_info") or {}
+    return module_info.get("impact_level") or module_info.get("priority") or "medium"
+
+
+def estimate_request_cost(params: dict, batch: bool = False) -> float:
+    """
+    Upper-bound USD cost of one request: every input token written to the
+    prompt cache and every max_tokens output token used.
+    """
+    input_price, output_price = model_prices(params.get("model", ""))
+    cost = (
+        estimate_input_tokens(params) * input_price * CACHE_WRITE_MULTIPLIER
+        + params.get("max_tokens", 0) * output_price
+    ) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def plan_lanes(request_mapping: list[dict], fast_priorities=DEFAULT_FAST_PRIORITIES,
+               max_cost: float | None = None) -> dict:
+    """
+    Split requests into {"fast", "batch", "deferred", "estimated_cost"}.
+
+    Requests are ordered by priority (stable within a priority). Over
+    max_cost, the lowest-priority fast-lane requests move to the batch lane
+    until the estimate fits, then the lowest-priority batch requests are
+    deferred.
+    """
+    ordered = sorted(request_mapping, key=lambda req: PRIORITY_RANK.get(request_priority(req), len(PRIORITY_RANK)))
+    fast = [req for req in ordered if request_priority(req) in fast_priorities]
+    batch = [req for req in ordered if request_priority(req) not in fast_priorities]
+    deferred = []
+    sync_cost = {id(req): estimate_request_cost(req["request"]["params"]) for req in ordered}
+    batch_cost = {id(req): estimate_request_cost(req["request"]["params"], batch=True) for req in ordered}
+    total = sum(sync_cost[id(req)] for req in fast) + sum(batch_cost[id(req)] for req in batch)
+
+    if max_cost is not None:
+        while fast and total > max_cost:
+            req = fast.pop()
+            batch.insert(0, req)
+            total -= sync_cost[id(req)] - batch_cost[id(req)]
+        while batch and total > max_cost:
+            req = batch.pop()
+            deferred.insert(0, req)
+            total -= batch_cost[id(req)]
+    return {"fast": fast, "batch": batch, "deferred": deferred, "estimated_cost": total}
+
+
+def module_key(module_info: dict) -> str:
+    return module_info.get("module_path") or module_info["module"]
+
+
+class DeferredModules:
+    """
+    Persisted queue of modules the cost ceiling deferred.
+
+    Layout: {"modules": {module_path: {"module_info", "deferred_at"}},
+    "changed_sections": [...]}, where changed_sections are those of the
+    analyses the modules were deferred from, so their source slices still
+    include what changed. The file is rewritten atomically.
+    """
+
+    def __init__(self, path=DEFERRED_PATH):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            self.data = {}
+        self.data.setdefault("modules", {})
+        self.data.setdefault("changed_sections", [])
+
+    def __len__(self) -> int:
+        return len(self.data["modules"])
+
+    def save(self):
+        if not self.data["modules"]:
+            self.data["changed_sections"] = []
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def add(self, module_info: dict, changed_sections: list[dict]):
+        """Queue a module, keeping the change context it was deferred from."""
+        self.data["modules"][module_key(module_info)] = {
+            "module_info": module_info,
+            "deferred_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for section in changed_sections:
+            if section not in self.data["changed_sections"]:
+                self.data["changed_sections"].append(section)
+
+    def discard(self, module_paths):
+        """Drop modules that have been written since they were deferred."""
+        for path in module_paths:
+            self.data["modules"].pop(path, None)
+
+    def settle(self, written, deferred_requests, changed_sections: list[dict]):
+        """
+        Drop the modules an update wrote, queue the requests its scheduler
+        deferred and save the queue.
+        """
+        self.discard(written)
+        for req in deferred_requests:
+            if req["module_path"] not in written and "module_info" in req:
+                self.add(req["module_info"], changed_sections)
+        if len(self):
+            print(f"{len(self)} module(s) queued in {os.path.basename(self.path)} for the next update")
+        self.save()
+
+    def merge(self, impact_analysis: dict) -> dict:
+        """
+        The impact analysis with every queued module added to its affected
+        modules. A module the analysis lists already keeps its new entry,
+        with the deferred reason appended to it.
+        """
+        if not self.data["modules"]:
+            return impact_analysis
+        print(f"Re-queuing {len(self)} module(s) deferred by an earlier run")
+        affected = [dict(m) for m in impact_analysis.get("affected_modules", [])]
+        listed = {module_key(m): m for m in affected}
+        for path, entry in self.data["modules"].items():
+            module_info = entry["module_info"]
+            if path not in listed:
+                affected.append(module_info)
+            elif listed[path].get("reason") and module_info.get("reason"):
+                listed[path]["reason"] += f"\n\nDeferred from an earlier update: {module_info['reason']}"
+        changed_sections = list(impact_analysis.get("changed_sections", []))
+        changed_sections += [s for s in self.data["changed_sections"] if s not in changed_sections]
+        return {**impact_analysis, "affected_modules": affected, "changed_sections": changed_sections}
+
+
+class Scheduler:
+    """
+    Runs request mappings over the fast and batch lanes.
+
+    One scheduler covers one update, including its patch-fallback and
+    repair rounds: the deadline counts from when the scheduler was created
+    and the cost ceiling covers every round's estimates together. Requests
+    deferred by the ceiling, not sent before the deadline or failed in the
+    fast lane collect in `deferred` for the caller to queue. Once the spend budget runs out,
+    `stopped` holds the BudgetExceededError: the current round keeps what
+    it wrote, its unsent requests are deferred, and later rounds send
+    nothing.
+    """
+
+    def __init__(self, fast_priorities=DEFAULT_FAST_PRIORITIES, fast_workers: int = DEFAULT_FAST_WORKERS,
+                 deadline: float | None = None, max_cost: float | None = None):
+        self.fast_priorities = tuple(fast_priorities)
+        self.fast_workers = fast_workers
+        self.deadline_at = time.monotonic() + deadline if deadline else None
+        self.max_cost = max_cost
+        self.committed_cost = 0.0
+        self.deferred: list[dict] = []
+        self.stopped: BudgetExceededError | None = None
+
+    def remaining(self) -> float | None:
+        """Seconds left before the deadline, or None without one."""
+        return None if self.deadline_at is None else self.deadline_at - time.monotonic()
+
+    def run_fast_lane(self, client, request_mapping: list[dict], cache=None, render=None) -> tuple[list[str], bool]:
+        """
+        Send requests as concurrent sync calls, writing each module as its
+        result arrives. Returns (written module paths, whether every request
+        was sent and answered).
+        """
+        updated_files = []
+        complete = True
+
+        def send(req):
+            remaining = self.remaining()
+            if remaining is not None and remaining <= 0:
+                return req, None, "deadline"
+            if self.stopped:
+                return req, None, "budget"
+            try:
+                message = create_message(client, req["request"]["params"], cache, label=req["module_path"])
+            except BudgetExceededError as e:
+                self.stopped = self.stopped or e
+                return req, None, "budget"
+            return req, render_result(req, message, render), None
+
+        with ThreadPoolExecutor(max_workers=self.fast_workers) as pool:
+            futures = {pool.submit(send, req): req for req in request_mapping}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    self.deferred.append(futures[future])
+                    continue
+                try:
+                    req, content, skipped = future.result()
+                except Exception as e:
+                    print(f"✗ Fast lane request for {futures[future]['module_path']} failed: {e}; "
+                          f"queued for the next run")
+                    self.deferred.append(futures[future])
+                    complete = False
+                    continue
+                if skipped == "budget":
+                    for pending in futures:
+                        pending.cancel()
+                    print(f"✗ {req['module_path']} not sent, {self.stopped}; queued for the next run")
+                    self.deferred.append(req)
+                    complete = False
+                    continue
+                if skipped:
+                    print(f"✗ Deadline passed before {req['module_path']} was sent; queued for the next run")
+                    self.deferred.append(req)
+                    complete = False
+                    continue
+                if content is None:
+                    continue
+                save_module(req["module_path"], content)
+                updated_files.append(req["module_path"])
+                print(f"✓ Updated (fast lane): {req['module_path']}")
+        return updated_files, complete
+
+    def run(self, client, request_mapping: list[dict], cache=None, render=None,
+            timeout: int = 600) -> tuple[list[str], bool]:
+        """
+        Plan the lanes and run them at the same time.
+
+        Returns (written module paths, complete). complete is False if a
+        request missed the deadline or failed, or if a batch could not be
+        submitted, did not finish in time or had results that could not be
+        saved; modules written so far are returned either way. Requests
+        deferred by the cost ceiling do not count as failures. Deferred,
+        unsent and failed fast-lane requests are added to `deferred`,
+        which the caller queues for the next run (see DeferredModules).
+        """
+        remaining = self.remaining()
+        if self.stopped or (remaining is not None and remaining <= 0):
+            reason = self.stopped or "deadline passed"
+            print(f"✗ {len(request_mapping)} request(s) not sent, {reason}; queued for the next run")
+            self.deferred += request_mapping
+            return [], False
+        budget = None if self.max_cost is None else max(0.0, self.max_cost - self.committed_cost)
+        plan = plan_lanes(request_mapping, self.fast_priorities, budget)
+        self.committed_cost += plan["estimated_cost"]
+        self.deferred += plan["deferred"]
+        print(f"Scheduling {len(request_mapping)} request(s): {len(plan['fast'])} fast lane, "
+              f"{len(plan['batch'])} batch, {len(plan['deferred'])} deferred (est. up to ${plan['estimated_cost']:.4f})")
+        for req in plan["deferred"]:
+            print(f"  - {req['module_path']} ({request_priority(req)}) deferred to the next run by the cost ceiling")
+
+        batch_timeout = timeout if remaining is None else max(0, min(timeout, int(remaining)))
+        with ThreadPoolExecutor(max_workers=1) as lane:
+            batch_future = lane.submit(run_batch, client, plan["batch"], cache, batch_timeout, None,
+                                       render) if plan["batch"] else None
+            updated_files, complete = self.run_fast_lane(client, plan["fast"], cache, render)
+            try:
+                batch_files, batch_complete = batch_future.result() if batch_future else ([], True)
+            except BudgetExceededError as e:
+                # Raised before the batch lane wrote anything
+                print(f"✗ Batch of {len(plan['batch'])} request(s) not submitted, {e}; queued for the next run")
+                self.stopped = self.stopped or e
+                self.deferred += plan["batch"]
+                batch_files, batch_complete = [], False
+        return updated_files + batch_files, complete and batch_complete
+
+
+def add_schedule_arguments(parser) -> None:
+    """Add the shared fast-lane, deadline and cost-ceiling options to an argparse parser."""
+    parser.add_argument('--fast-lane', nargs='*', choices=list(PRIORITY_RANK), default=list(DEFAULT_FAST_PRIORITIES),
+                        metavar='PRIORITY',
+                        help='Impact priorities sent as concurrent sync calls instead of through the Batch API; '
+                             'give --fast-lane with no priorities to batch everything (default: high)')
+    parser.add_argument('--fast-workers', type=int, default=DEFAULT_FAST_WORKERS,
+                        help=f'Concurrent fast-lane calls (default: {DEFAULT_FAST_WORKERS})')
+    parser.add_argument('--deadline', type=float,
+                        help='Seconds the whole update may take; batches still running then are left for --resume')
+    parser.add_argument('--max-cost', type=float,
+                        help='Estimated USD ceiling for the update; over it, fast-lane modules are batched and '
+                             'then the lowest-priority modules deferred')
+
+
+def scheduler_from_args(args) -> Scheduler:
+    """Build a scheduler from the shared CLI options."""
+    return Scheduler(args.fast_lane, args.fast_workers, args.deadline, args.max_cost)
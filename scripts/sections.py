@@ -0,0 +1,214 @@
+# scripts/sections.py
+"""
+Heading-delimited section parsing and persisted section snapshots.
+Lets the pipeline send only the parts of the corpus that actually changed.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+# Resolve project root (parent of scripts/, or ENABLEMENT_ROOT when a
+# workspace runs the scripts against another product's tree)
+PROJECT_ROOT = Path(os.environ.get("ENABLEMENT_ROOT") or Path(__file__).resolve().parent.parent).resolve()
+
+# Corpus and module directories, relative to PROJECT_ROOT
+SOURCE_DIR_NAME = os.environ.get("ENABLEMENT_SOURCES", "source-docs")
+MODULES_DIR_NAME = os.environ.get("ENABLEMENT_MODULES", "enablement-modules")
+SOURCE_DIR = PROJECT_ROOT / SOURCE_DIR_NAME
+MODULES_DIR = PROJECT_ROOT / MODULES_DIR_NAME
+
+CACHE_DIR = PROJECT_ROOT / ".enablement-cache"
+SNAPSHOT_PATH = CACHE_DIR / "section-snapshot.json"
+SNAPSHOT_VERSION = 1
+
+PREAMBLE = "(preamble)"
+ANCHOR_SEPARATOR = " > "
+
+# Module sections sharing at least this many inline code spans with a
+# source section are treated as referencing it.
+MIN_SHARED_CODE_SPANS = 2
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+CODE_SPAN_RE = re.compile(r"`([^`\n]+)`")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize line endings and trailing whitespace so hashes are stable."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def content_hash(text: str) -> str:
+    """Short content hash of normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_heading(heading: str) -> str:
+    """Lowercase a heading and strip punctuation for loose comparison."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", heading.lower()).split())
+
+
+def split_sections(text: str) -> list[dict]:
+    """
+    Split markdown into heading-delimited sections.
+
+    Headings inside fenced code blocks are ignored. Each section is a dict
+    with 'anchor' (the heading path, e.g. "Create plugins > Quickstart"),
+    'heading', 'level', 'line' (1-based first line), 'content' and 'hash'.
+    Text before the first heading becomes a level-0 '(preamble)' section.
+    """
+    sections = []
+    stack: list[tuple[int, str]] = []
+    current = {"heading": PREAMBLE, "level": 0, "path": [PREAMBLE], "line": 1, "lines": []}
+    in_fence = False
+
+    def flush(section):
+        body = "\n".join(section["lines"])
+        if section["level"] == 0 and not body.strip():
+            return
+        sections.append({
+            "anchor": ANCHOR_SEPARATOR.join(section["path"]),
+            "heading": section["heading"],
+            "level": section["level"],
+            "line": section["line"],
+            "content": body,
+            "hash": content_hash(body),
+        })
+
+    for number, line in enumerate(text.replace("\r\n", "\n").split("\n"), 1):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line)
+        if match:
+            flush(current)
+            level, heading = len(match.group(1)), match.group(2)
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, heading))
+            current = {
+                "heading": heading,
+                "level": level,
+                "path": [h for _, h in stack],
+                "line": number,
+                "lines": [line],
+            }
+        else:
+            current["lines"].append(line)
+    flush(current)
+
+    # Disambiguate repeated heading paths ("Required fields" under two parents
+    # is fine, but two identical paths in one file are not)
+    seen: dict[str, int] = {}
+    for section in sections:
+        count = seen.get(section["anchor"], 0) + 1
+        seen[section["anchor"]] = count
+        if count > 1:
+            section["anchor"] = f"{section['anchor']} [{count}]"
+
+    return sections
+
+
+def section_at_line(sections: list[dict], line: int) -> dict | None:
+    """The section containing a 1-based line number."""
+    found = None
+    for section in sections:
+        if section["line"] > line:
+            break
+        found = section
+    return found or (sections[0] if sections else None)
+
+
+def load_sections(path: str) -> list[dict]:
+    """Read a project-relative markdown file and split it into sections."""
+    full_path = PROJECT_ROOT / path
+    try:
+        return split_sections(full_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, OSError):
+        return []
+
+
+def section_hashes(sections: list[dict]) -> dict[str, str]:
+    """Map anchor -> hash for a list of sections."""
+    return {s["anchor"]: s["hash"] for s in sections}
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH) -> dict:
+    """Load the persisted section snapshot, or an empty one."""
+    try:
+        snapshot = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, OSError, json.JSONDecodeError):
+        return {"version": SNAPSHOT_VERSION, "files": {}}
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return {"version": SNAPSHOT_VERSION, "files": {}}
+    return snapshot
+
+
+def save_snapshot(snapshot: dict, path: Path = SNAPSHOT_PATH) -> None:
+    """Persist the section snapshot atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def update_snapshot(snapshot: dict, path: str, sections: list[dict]) -> None:
+    """Record the current section hashes for one file in the snapshot."""
+    if sections:
+        snapshot["files"][path] = section_hashes(sections)
+    else:
+        snapshot["files"].pop(path, None)
+
+
+def diff_sections(path: str, sections: list[dict], snapshot: dict) -> dict:
+    """
+    Compare a file's current sections with the snapshot.
+
+    Returns {'changed': [...sections], 'removed': [...anchors], 'known': bool}.
+    A file with no snapshot entry is unknown and every section counts as changed.
+    """
+    previous = snapshot["files"].get(path)
+    if previous is None:
+        return {"changed": list(sections), "removed": [], "known": False}
+
+    current = section_hashes(sections)
+    return {
+        "changed": [s for s in sections if previous.get(s["anchor"]) != s["hash"]],
+        "removed": [anchor for anchor in previous if anchor not in current],
+        "known": True,
+    }
+
+
+def code_spans(text: str) -> set[str]:
+    """Inline code spans in a block of markdown."""
+    return {span.strip() for span in CODE_SPAN_RE.findall(text) if span.strip()}
+
+
+def references(module_section: dict, source_section: dict) -> bool:
+    """Whether a module section covers the same material as a source section."""
+    if source_section["level"] > 0 and (
+        normalize_heading(module_section["heading"]) == normalize_heading(source_section["heading"])
+    ):
+        return True
+    shared = code_spans(module_section["content"]) & code_spans(source_section["content"])
+    return len(shared) >= MIN_SHARED_CODE_SPANS
+
+
+def referencing_sections(source_sections: list[dict], module_sections: list[dict]) -> list[dict]:
+    """Module sections that reference any of the given source sections."""
+    return [
+        m for m in module_sections
+        if any(references(m, s) for s in source_sections)
+    ]
+
+
+def render_sections(path: str, sections: list[dict]) -> str:
+    """Render sections of one file as a compact markdown block for prompts."""
+    parts = [f"### {path}"]
+    for section in sections:
+        parts.append(f"#### [{section['anchor']}]\n{section['content'].strip()}")
+    return "\n\n".join(parts)
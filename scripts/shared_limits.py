@@ -0,0 +1,109 @@
+# scripts/shared_limits.py
+"""
+Rate limiter and spend budget shared across processes.
+
+workspace.py serves one RateLimiter and one SpendBudget from a manager
+process and hands its address to every product it runs. When
+ENABLEMENT_LIMITS_ADDRESS is set, rate_limit.rate_limiter and
+telemetry.spend_budget are proxies to those shared objects, so parallel
+pipelines draw on a single requests/tokens-per-minute allowance and a
+single spend ceiling; otherwise each process keeps its own.
+"""
+
+import os
+import secrets
+from multiprocessing import AuthenticationError
+from multiprocessing.managers import BaseManager, BaseProxy
+
+ADDRESS_ENV = "ENABLEMENT_LIMITS_ADDRESS"
+AUTHKEY_ENV = "ENABLEMENT_LIMITS_AUTHKEY"
+
+# The shared objects, created in the manager's server process
+_shared: dict = {}
+
+
+def _init_server(requests_per_minute, tokens_per_minute, budget_usd) -> None:
+    from rate_limit import RateLimiter
+    from telemetry import SpendBudget
+
+    _shared["rate_limiter"] = RateLimiter(requests_per_minute, tokens_per_minute)
+    _shared["spend_budget"] = SpendBudget(budget_usd)
+
+
+def _rate_limiter():
+    return _shared["rate_limiter"]
+
+
+def _spend_budget():
+    return _shared["spend_budget"]
+
+
+class RateLimiterProxy(BaseProxy):
+    """A RateLimiter in the manager process; same interface as the local one."""
+
+    _exposed_ = ("acquire", "observe", "pause", "configure")
+
+    def acquire(self, estimated_tokens: int) -> float:
+        return self._callmethod("acquire", (estimated_tokens,))
+
+    def observe(self, headers) -> None:
+        # Response headers are case-insensitive mappings; send a plain dict
+        self._callmethod("observe", ({key.lower(): value for key, value in headers.items()},))
+
+    def pause(self, seconds: float) -> None:
+        self._callmethod("pause", (seconds,))
+
+    def configure(self, requests_per_minute: int | None = None, tokens_per_minute: int | None = None) -> None:
+        self._callmethod("configure", (requests_per_minute, tokens_per_minute))
+
+
+class SpendBudgetProxy(BaseProxy):
+    """A SpendBudget in the manager process; same interface as the local one."""
+
+    _exposed_ = ("charge", "check", "snapshot")
+
+    def charge(self, cost_usd: float) -> None:
+        self._callmethod("charge", (cost_usd,))
+
+    def check(self) -> None:
+        self._callmethod("check")
+
+    def snapshot(self) -> dict:
+        return self._callmethod("snapshot")
+
+
+class LimitsManager(BaseManager):
+    def environment(self) -> dict[str, str]:
+        """Environment variables that point child processes at this manager."""
+        host, port = self.address
+        return {ADDRESS_ENV: f"{host}:{port}", AUTHKEY_ENV: bytes(self._authkey).hex()}
+
+
+LimitsManager.register("rate_limiter", callable=_rate_limiter, proxytype=RateLimiterProxy)
+LimitsManager.register("spend_budget", callable=_spend_budget, proxytype=SpendBudgetProxy)
+
+
+def serve(requests_per_minute: int | None = None, tokens_per_minute: int | None = None,
+          budget_usd: float | None = None) -> LimitsManager:
+    """Start the manager process on a free local port; shut it down when done."""
+    manager = LimitsManager(address=("127.0.0.1", 0), authkey=secrets.token_bytes(16))
+    manager.start(_init_server, (requests_per_minute, tokens_per_minute, budget_usd))
+    return manager
+
+
+def connect(name: str):
+    """
+    Proxy to the shared object `name` ('rate_limiter' or 'spend_budget'),
+    or None when no manager is configured or it cannot be reached.
+    """
+    address = os.environ.get(ADDRESS_ENV)
+    if not address:
+        return None
+    host, _, port = address.rpartition(":")
+    manager = LimitsManager(address=(host, int(port)), authkey=bytes.fromhex(os.environ.get(AUTHKEY_ENV, "")))
+    try:
+        manager.connect()
+        return getattr(manager, name)()
+    except (OSError, EOFError, AuthenticationError) as e:
+        print(f"⚠ Warning: shared limits at {address} unreachable, using per-process {name} ({e})")
+        return None
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+MinHash fingerprint index over enablement module sections.
+
+Lecture modules and their labs restate much of the same material. Each
+module section is reduced to a MinHash signature over word shingles, and
+locality-sensitive hashing over signature bands finds sections in
+different modules that are near-duplicates. Near-duplicate sections form
+a shared passage. generate_enablement.py has one module (the owner)
+update each shared passage and copies the result into every other module
+that contains it, instead of paying for the same rewrite in each module.
+
+Signatures are kept in .enablement-cache/passage-index.json by section
+hash, so only edited sections are fingerprinted again. Run on its own,
+the script reports how many tokens the module tree duplicates:
+
+    python scripts/shared_passages.py --output duplication.json
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import random
+import re
+from pathlib import Path
+
+from batch_jobs import save_module
+from corpus_store import CorpusStore
+from patches import PatchError, apply_edits
+from rate_limit import CHARS_PER_TOKEN
+from sections import CACHE_DIR, MODULES_DIR, PROJECT_ROOT, split_sections
+from validate_modules import format_issues, gate_issues
+
+PASSAGE_INDEX_PATH = CACHE_DIR / "passage-index.json"
+PASSAGE_INDEX_VERSION = 1
+
+# Words per shingle, and sections shorter than this many words are ignored
+SHINGLE_WORDS = 5
+MIN_PASSAGE_WORDS = 40
+# Signature length, split into BANDS bands for LSH; with 16 bands of 4
+# rows, pairs above ~0.6 Jaccard similarity almost always share a band
+NUM_PERM = 64
+BANDS = 16
+# Estimated Jaccard similarity at which two sections count as one passage
+DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+WORD_RE = re.compile(r"\w+")
+
+
+def section_body(section: dict) -> str:
+    """A section's text without its heading line."""
+    if not section.get("level"):
+        return section["content"]
+    parts = section["content"].split("\n", 1)
+    return parts[1] if len(parts) > 1 else ""
+
+
+def shingles(text: str) -> set[int]:
+    """64-bit hashes of the overlapping SHINGLE_WORDS-word windows of a text."""
+    words = WORD_RE.findall(text.lower())
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"), digest_size=8).digest(),
+                       "big")
+        for i in range(max(0, len(words) - SHINGLE_WORDS + 1))
+    }
+
+
+def minhash(shingle_hashes: set[int]) -> list[int]:
+    """MinHash signature of a shingle set (NUM_PERM values)."""
+    return [
+        min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in shingle_hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+class PassageIndex:
+    """
+    Persisted MinHash signatures for every module section.
+
+    Layout: {"modules": {label: {"hash", "sections": [{"anchor", "hash",
+    "tokens"}]}}, "signatures": {section hash: [...]}}. Sections too short
+    to fingerprint are listed without a signature.
+    """
+
+    def __init__(self, data: dict | None = None):
+        data = data or {}
+        self.modules: dict[str, dict] = data.get("modules", {})
+        self.signatures: dict[str, list[int]] = data.get("signatures", {})
+
+    @classmethod
+    def load(cls, path: Path = PASSAGE_INDEX_PATH) -> "PassageIndex":
+        """Load a persisted index, or start an empty one."""
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            return cls()
+        return cls(data) if data.get("version") == PASSAGE_INDEX_VERSION else cls()
+
+    def save(self, path: Path = PASSAGE_INDEX_PATH) -> None:
+        """Persist the index atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": PASSAGE_INDEX_VERSION, "modules": self.modules, "signatures": self.signatures},
+                      f, sort_keys=True)
+        tmp_path.replace(path)
+
+    def refresh(self, module_paths: list[str], store: CorpusStore | None = None) -> list[str]:
+        """
+        Bring the index up to date with the given modules; returns the ones
+        that were (re-)fingerprinted. Unchanged modules are recognized by
+        the corpus store without being read, and sections whose hash was
+        seen before reuse their signature.
+        """
+        store = store or CorpusStore()
+        store.refresh([PROJECT_ROOT / module for module in module_paths])
+        changed = []
+        for stale in set(self.modules) - set(module_paths):
+            del self.modules[stale]
+        for module in module_paths:
+            file_hash = store.file_hash(module)
+            if file_hash is None:
+                self.modules.pop(module, None)
+                continue
+            if self.modules.get(module, {}).get("hash") == file_hash:
+                continue
+            sections = []
+            for section in store.sections(module):
+                body = section_body(section)
+                if section["hash"] not in self.signatures and len(WORD_RE.findall(body)) >= MIN_PASSAGE_WORDS:
+                    self.signatures[section["hash"]] = minhash(shingles(body))
+                sections.append({"anchor": section["anchor"], "hash": section["hash"],
+                                 "tokens": len(section["content"]) // CHARS_PER_TOKEN + 1})
+            self.modules[module] = {"hash": file_hash, "sections": sections}
+            changed.append(module)
+        if changed:
+            used = {s["hash"] for entry in self.modules.values() for s in entry["sections"]}
+            self.signatures = {h: sig for h, sig in self.signatures.items() if h in used}
+        return changed
+
+    def passages(self, threshold: float = DUPLICATE_THRESHOLD) -> list[dict]:
+        """
+        Shared passages: groups of near-duplicate sections spanning at least
+        two modules, as {"members": [{"module", "section", "tokens"}],
+        "similarity", "tokens", "duplicated_tokens"}. duplicated_tokens
+        counts every copy beyond the largest one. Sorted by duplicated
+        tokens, largest first.
+        """
+        members = [
+            (module, section)
+            for module in sorted(self.modules)
+            for section in self.modules[module]["sections"]
+            if section["hash"] in self.signatures
+        ]
+        buckets: dict[tuple, list[int]] = {}
+        rows = NUM_PERM // BANDS
+        for i, (_, section) in enumerate(members):
+            signature = self.signatures[section["hash"]]
+            for band in range(BANDS):
+                buckets.setdefault((band, *signature[band * rows:(band + 1) * rows]), []).append(i)
+
+        parent = list(range(len(members)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        scores: dict[tuple[int, int], float] = {}
+        for bucket in buckets.values():
+            for n, i in enumerate(bucket):
+                for j in bucket[n + 1:]:
+                    if (i, j) in scores or members[i][0] == members[j][0]:
+                        continue
+                    scores[(i, j)] = similarity(self.signatures[members[i][1]["hash"]],
+                                                self.signatures[members[j][1]["hash"]])
+                    if scores[(i, j)] >= threshold:
+                        parent[find(i)] = find(j)
+
+        groups: dict[int, list[int]] = {}
+        for i in range(len(members)):
+            groups.setdefault(find(i), []).append(i)
+        passages = []
+        for group in groups.values():
+            if len({members[i][0] for i in group}) < 2:
+                continue
+            in_group = set(group)
+            pair_scores = [score for (i, j), score in scores.items()
+                           if i in in_group and j in in_group and score >= threshold]
+            tokens = [members[i][1]["tokens"] for i in group]
+            passages.append({
+                "members": [{"module": members[i][0], "section": members[i][1]["anchor"],
+                             "tokens": members[i][1]["tokens"]} for i in group],
+                "similarity": round(min(pair_scores), 3),
+                "tokens": sum(tokens),
+                "duplicated_tokens": sum(tokens) - max(tokens),
+            })
+        return sorted(passages, key=lambda p: (-p["duplicated_tokens"], p["members"][0]["module"],
+                                               p["members"][0]["section"]))
+
+
+def plan_shared_updates(passages: list[dict], affected: list[str]) -> list[dict]:
+    """
+    Assign each shared passage that touches an affected module to an owner:
+    the first of its modules in `affected` (ordered by priority). The owner
+    updates the passage; every other copy is a follower that receives the
+    owner's result. Returns [{"owner", "section", "followers": [(module,
+    section)], "tokens"}], where tokens is the followers' total size.
+    """
+    rank = {module: i for i, module in enumerate(affected)}
+    plan = []
+    for passage in passages:
+        members = sorted(passage["members"], key=lambda m: rank.get(m["module"], len(rank)))
+        owner = members[0]
+        if owner["module"] not in rank:
+            continue
+        followers = [m for m in members[1:] if (m["module"], m["section"]) != (owner["module"], owner["section"])]
+        plan.append({
+            "owner": owner["module"],
+            "section": owner["section"],
+            "followers": [(m["module"], m["section"]) for m in followers],
+            "tokens": sum(m["tokens"] for m in followers),
+        })
+    return plan
+
+
+def shared_sections(plan: list[dict]) -> dict[str, dict[str, str]]:
+    """{follower module: {section anchor: owner module}}, for follower patch prompts."""
+    shared: dict[str, dict[str, str]] = {}
+    for update in plan:
+        for module, section in update["followers"]:
+            shared.setdefault(module, {})[section] = update["owner"]
+    return shared
+
+
+def find_section(text: str, anchor: str) -> dict | None:
+    return next((s for s in split_sections(text) if s["anchor"] == anchor), None)
+
+
+def carry_edit(before: str, after: str, follower: str) -> str:
+    """
+    Apply the line edits that turned `before` into `after` to `follower`, a
+    near-duplicate of `before`. Each changed run of lines must appear
+    unchanged in the follower, and an insertion needs a neighbouring line
+    that does; lines only the follower has are kept. Raises PatchError
+    when an edit touches text the follower words differently.
+    """
+    before_lines = before.splitlines(keepends=True)
+    follower_lines = follower.splitlines(keepends=True)
+    # before line index -> follower line index, for lines both share
+    position = {}
+    for block in difflib.SequenceMatcher(None, before_lines, follower_lines, autojunk=False).get_matching_blocks():
+        for k in range(block.size):
+            position[block.a + k] = block.b + k
+    edits = []
+    opcodes = difflib.SequenceMatcher(None, before_lines, after.splitlines(keepends=True), autojunk=False).get_opcodes()
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            continue
+        if i1 < i2:
+            start = position.get(i1)
+            if start is None or any(position.get(i) != start + i - i1 for i in range(i1, i2)):
+                raise PatchError(f"the edit at line {i1 + 1} changes text this copy words differently")
+            end = start + i2 - i1
+        elif i1 > 0 and i1 - 1 in position:
+            start = end = position[i1 - 1] + 1
+        elif i1 in position or i1 == len(before_lines) == 0:
+            start = end = position.get(i1, 0)
+        else:
+            raise PatchError(f"no matching line next to the insertion at line {i1 + 1}")
+        edits.append((start, end, after.splitlines(keepends=True)[j1:j2]))
+    for start, end, lines in sorted(edits, reverse=True):
+        follower_lines[start:end] = lines
+    return "".join(follower_lines)
+
+
+def fan_out(plan: list[dict], originals: dict[str, str], spec_for) -> list[str]:
+    """
+    Carry each owner's edit to a shared passage into its followers (see
+    carry_edit), so wording only a follower has survives. `originals` holds
+    the owners' text before the update, so passages the owner left
+    unchanged are skipped. A follower the edit cannot be carried into, or
+    that it would add validation problems to, is not written. Returns the
+    follower modules written.
+    """
+    written = []
+    for update in plan:
+        owner, anchor = update["owner"], update["section"]
+        try:
+            section = find_section(Path(owner).read_text(encoding="utf-8"), anchor)
+        except (FileNotFoundError, OSError):
+            section = None
+        before = find_section(originals.get(owner, ""), anchor)
+        if section is None:
+            print(f"⚠ Shared passage [{anchor}] is gone from {owner}; review "
+                  + ", ".join(module for module, _ in update["followers"]))
+            continue
+        if before is not None and section["hash"] == before["hash"]:
+            continue
+        if before is None:
+            print(f"⚠ Shared passage [{anchor}] is new in {owner}; review "
+                  + ", ".join(module for module, _ in update["followers"]))
+            continue
+        for module, follower_anchor in update["followers"]:
+            try:
+                text = Path(module).read_text(encoding="utf-8")
+                target = find_section(text, follower_anchor)
+                if target is None:
+                    raise PatchError(f"no section [{follower_anchor}]")
+                heading = target["content"].split("\n", 1)[0] + "\n" if target["level"] else ""
+                body = carry_edit(section_body(before), section_body(section), section_body(target))
+                content = apply_edits(text, [{"op": "replace", "section": follower_anchor, "content": heading + body}])
+            except (OSError, PatchError) as e:
+                print(f"⚠ Shared passage from {owner} not applied to {module}: {e}")
+                continue
+            issues = gate_issues(content, spec_for(module), module, text, template="patch")
+            if issues:
+                print(f"⚠ Shared passage from {owner} not applied to {module}: {format_issues(issues)}")
+                continue
+            save_module(module, content)
+            written.append(module)
+            print(f"✓ Shared passage from {owner} [{anchor}] applied to {module} [{follower_anchor}]")
+    return written
+
+
+def duplication_report(index: PassageIndex, passages: list[dict]) -> dict:
+    """Duplicated token mass across the indexed modules."""
+    total = sum(s["tokens"] for entry in index.modules.values() for s in entry["sections"])
+    duplicated = sum(p["duplicated_tokens"] for p in passages)
+    return {
+        "modules": len(index.modules),
+        "tokens": total,
+        "shared_passages": len(passages),
+        "duplicated_tokens": duplicated,
+        "duplicated_share": round(duplicated / total, 4) if total else 0.0,
+        "passages": passages,
+    }
+
+
+def load_passage_index(module_paths: list[str], store: CorpusStore | None = None) -> PassageIndex:
+    """Load the persisted index, refresh it incrementally and save it back."""
+    index = PassageIndex.load()
+    if index.refresh(module_paths, store) or not PASSAGE_INDEX_PATH.exists():
+        index.save()
+    return index
+
+
+def all_module_paths() -> list[str]:
+    """Every module file, as a project-relative path."""
+    return sorted(str(f.relative_to(PROJECT_ROOT)) for f in MODULES_DIR.glob("*.md")) if MODULES_DIR.exists() else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report near-duplicate passages shared between enablement modules")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                        help=f"Estimated Jaccard similarity for two sections to count as one passage "
+                             f"(default: {DUPLICATE_THRESHOLD})")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    index = load_passage_index(all_module_paths())
+    report = duplication_report(index, index.passages(args.threshold))
+    for passage in report["passages"]:
+        print(f"~{passage['duplicated_tokens']} duplicated tokens (similarity {passage['similarity']:.2f}):")
+        for member in passage["members"]:
+            print(f"  - {member['module']} [{member['section']}]")
+    print(f"\n{report['shared_passages']} shared passage(s) across {report['modules']} module(s): "
+          f"~{report['duplicated_tokens']} of ~{report['tokens']} tokens duplicated ({report['duplicated_share']:.1%})")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,188 @@
+# scripts/source_selection.py
+"""
+Per-module slices of the source library.
+
+Instead of attaching every source doc to every request, each module gets
+the source sections most relevant to its spec (title, description, tags),
+ranked with a BM25 index over source-doc sections and cut to a token
+budget. Modules whose slices come out identical are grouped so they share
+byte-identical corpus blocks and therefore prompt-cache hits.
+"""
+
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+
+from corpus import corpus_blocks, corpus_label
+from corpus_store import CorpusStore
+from rate_limit import CHARS_PER_TOKEN
+from retrieval import ModuleIndex, spec_for_module, spec_text
+
+# Token budget for one module's slice; 0 attaches the whole library
+DEFAULT_SOURCE_TOKENS = 30_000
+# Sections scoring below this fraction of the best match are left out
+MIN_RELATIVE_SCORE = 0.25
+# A doc whose selected sections make up this share of it is sent whole, so
+# more modules end up with identical (shareable) slices
+WHOLE_DOC_SHARE = 0.6
+# Slices whose corpus blocks are kept in memory for reuse
+MEMOIZED_SLICES = 8
+
+
+class SourceSelector:
+    """
+    Section-level BM25 index over the source docs, used to cut slices.
+
+    Backed by a CorpusStore: only section offsets and hashes are held in
+    memory, and section text is read from the mapped files while indexing
+    and when a slice's blocks are built. The blocks of the most recent
+    slices are memoized, so grouped modules get identical bytes without
+    rebuilding them.
+    """
+
+    def __init__(self, store: CorpusStore, labels: list[str] | None = None):
+        self.store = store
+        self.labels = sorted(label for label in (store.labels() if labels is None else labels) if store.entry(label))
+        self.sections = {label: store.entry(label)["sections"] for label in self.labels}
+        self.index = ModuleIndex()
+        for label in self.labels:
+            self.index.add_module(label, store.sections(label))
+        self._by_id = {f"{label}#{s['anchor']}": s for label, sections in self.sections.items() for s in sections}
+        self._blocks: OrderedDict[str, list[dict]] = OrderedDict()
+
+    @classmethod
+    def from_paths(cls, paths, store: CorpusStore | None = None) -> "SourceSelector":
+        store = store or CorpusStore()
+        store.refresh(paths)
+        return cls(store, [corpus_label(path) for path in paths])
+
+    @property
+    def characters(self) -> int:
+        return sum(self.store.size(label) for label in self.labels)
+
+    def selection_size(self, selection: dict[str, list[str]]) -> int:
+        """Approximate characters in a selection, from the section offsets."""
+        return sum(
+            section_size(s) for label, anchors in selection.items()
+            for s in self.sections[label] if s["anchor"] in set(anchors)
+        )
+
+    def select(self, query: str, budget: int = DEFAULT_SOURCE_TOKENS,
+               required: dict[str, set[str]] | None = None) -> dict[str, list[str]]:
+        """
+        The sections to send for a query: {label: [anchors in document order]}.
+
+        Sections are taken best-first while they fit the budget and score at
+        least MIN_RELATIVE_SCORE of the best one; a doc that is mostly
+        selected is then sent whole if the budget allows. `required`
+        sections ({label: anchors}, e.g. the ones just changed) are always
+        included and count against the budget first. A budget of 0, or a
+        query that matches nothing, selects the whole library.
+        """
+        ranked = sorted(self.index.score(query).items(), key=lambda item: (-item[1], item[0]))
+        if not budget or not ranked:
+            return {label: [s["anchor"] for s in sections] for label, sections in self.sections.items()}
+
+        floor = ranked[0][1] * MIN_RELATIVE_SCORE
+        chosen: dict[str, set[str]] = {}
+        used = 0
+        for label, anchors in (required or {}).items():
+            for section in self.sections.get(label, []):
+                if section["anchor"] in anchors:
+                    chosen.setdefault(label, set()).add(section["anchor"])
+                    used += section_size(section) // CHARS_PER_TOKEN + 1
+        for doc_id, score in ranked:
+            if score < floor:
+                break
+            section = self._by_id[doc_id]
+            label = self.index.docs[doc_id]["module"]
+            cost = section_size(section) // CHARS_PER_TOKEN + 1
+            if section["anchor"] in chosen.get(label, ()) or used + cost > budget:
+                continue
+            chosen.setdefault(label, set()).add(section["anchor"])
+            used += cost
+
+        selection = {}
+        for label in sorted(chosen):
+            sections = self.sections[label]
+            picked = [s for s in sections if s["anchor"] in chosen[label]]
+            total = sum(section_size(s) for s in sections)
+            rest = sum(section_size(s) for s in sections if s["anchor"] not in chosen[label])
+            if sum(section_size(s) for s in picked) >= total * WHOLE_DOC_SHARE and \
+                    used + rest // CHARS_PER_TOKEN <= budget:
+                picked = sections
+                used += rest // CHARS_PER_TOKEN
+            selection[label] = [s["anchor"] for s in picked]
+        return selection
+
+    def blocks(self, selection: dict[str, list[str]]) -> list[dict]:
+        """Corpus system blocks for a selection, identical for identical selections."""
+        key = slice_key(selection)
+        if key in self._blocks:
+            self._blocks.move_to_end(key)
+            return self._blocks[key]
+        documents = {}
+        for label, anchors in selection.items():
+            sections = self.sections[label]
+            if len(anchors) == len(sections):
+                documents[label] = self.store.read_text(label)
+                continue
+            wanted = set(anchors)
+            documents[label] = "\n".join(self.store.section_text(label, s) for s in sections if s["anchor"] in wanted)
+        blocks = corpus_blocks(documents)
+        self._blocks[key] = blocks
+        if len(self._blocks) > MEMOIZED_SLICES:
+            self._blocks.popitem(last=False)
+        return blocks
+
+
+def section_size(section: dict) -> int:
+    """Size of an indexed section in bytes (about its length in characters)."""
+    return section["end"] - section["start"]
+
+
+def slice_key(selection: dict[str, list[str]]) -> str:
+    """Stable identity of a selection, for grouping modules that share one."""
+    text = "\n".join(f"{label}#{anchor}" for label in sorted(selection) for anchor in selection[label])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def module_query(module_path: str, specs: list[dict], module_info: dict | None = None) -> str:
+    """
+    Query text for an existing module: its spec entry if it has one,
+    otherwise its title line, plus the impact reason when updating it.
+    """
+    spec = spec_for_module(module_path, specs)
+    if spec:
+        query = spec_text(spec)
+    else:
+        try:
+            query = Path(module_path).read_text(encoding="utf-8").split("\n", 1)[0]
+        except (FileNotFoundError, OSError):
+            query = Path(module_path).stem.replace("-", " ")
+    if module_info:
+        query += "\n" + module_info.get("reason", "")
+    return query
+
+
+def group_by_slice(items: list, queries: list[str], selector: SourceSelector,
+                   budget: int = DEFAULT_SOURCE_TOKENS) -> list[tuple[dict[str, list[str]], list]]:
+    """
+    Group items (specs or impact entries) by the slice their queries select.
+
+    Returns [(selection, [items])] with groups in order of first appearance
+    and items in their original order within a group; build each group's
+    blocks with selector.blocks(selection) when they are needed.
+    """
+    groups: dict[str, tuple[dict[str, list[str]], list]] = {}
+    for item, query in zip(items, queries):
+        selection = selector.select(query, budget)
+        groups.setdefault(slice_key(selection), (selection, []))[1].append(item)
+    return list(groups.values())
+
+
+def add_source_arguments(parser) -> None:
+    """Add the shared --source-tokens option to an argparse parser."""
+    parser.add_argument('--source-tokens', type=int, default=DEFAULT_SOURCE_TOKENS,
+                        help=f'Token budget for the source sections attached to each module; '
+                             f'0 attaches every source doc (default: {DEFAULT_SOURCE_TOKENS})')
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the offline command paths.
+
+Runs each offline command of enablement.py in a fresh interpreter with
+`python -X importtime` and no API key, and reports its import time
+(summed over top-level imports) and wall time, as the median of a few
+runs. A command fails the check if it exits non-zero, if its imports
+take longer than the budget, or if it imports the Anthropic SDK at all:
+--help, --mock, validation and plans should never pay for the SDK.
+
+The slowest paths (analyze --help, pipeline --help) import most of the
+scripts, in about 110 ms on a typical laptop. GitPython and python-dotenv
+are only imported when they are used. That leaves over half of the
+default budget as headroom for slower CI runners.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import corpus_label, find_source_docs
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_BUDGET_MS = 250
+DEFAULT_REPEAT = 3
+# Top-level packages that offline paths must not import
+FORBIDDEN_IMPORTS = ("anthropic",)
+
+
+def offline_commands(output_path: Path) -> list[tuple[str, list[str]]]:
+    """(name, enablement.py arguments) for every offline path measured."""
+    changed = " ".join(corpus_label(path) for path in find_source_docs())
+    return [
+        ("help", ["--help"]),
+        ("changes --help", ["changes", "--help"]),
+        ("analyze --help", ["analyze", "--help"]),
+        ("generate --help", ["generate", "--help"]),
+        ("create --help", ["create", "--help"]),
+        ("pipeline --help", ["pipeline", "--help"]),
+        ("analyze --mock", ["analyze", "--mock", "--changed-files", changed, "--output", str(output_path)]),
+        ("manifest plan", ["manifest", "plan"]),
+        ("validate", ["validate"]),
+    ]
+
+
+def parse_importtime(stderr: str) -> tuple[float, set[str]]:
+    """Total import time in ms (top-level imports' cumulative times) and the top-level packages imported."""
+    total_us = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        packages.add(name.strip().split(".")[0])
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000, packages
+
+
+def measure(args: list[str], env: dict[str, str]) -> dict:
+    """One cold run of enablement.py with these arguments."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", str(SCRIPTS_DIR / "enablement.py"), *args],
+                          env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall_time = time.perf_counter() - start
+    import_ms, packages = parse_importtime(proc.stderr)
+    return {"returncode": proc.returncode, "wall_ms": wall_time * 1000, "import_ms": import_ms,
+            "forbidden": sorted(packages.intersection(FORBIDDEN_IMPORTS))}
+
+
+def run_benchmark(budget_ms: float, repeat: int) -> list[dict]:
+    env = {key: value for key, value in os.environ.items() if key != "ANTHROPIC_API_KEY"}
+    results = []
+    with tempfile.TemporaryDirectory(prefix="startup-") as tmp:
+        for name, args in offline_commands(Path(tmp) / "impact-analysis.json"):
+            runs = [measure(args, env) for _ in range(repeat)]
+            result = {
+                "command": name,
+                "returncode": max(run["returncode"] for run in runs),
+                "import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+                "wall_ms": round(statistics.median(run["wall_ms"] for run in runs), 1),
+                "forbidden_imports": sorted({p for run in runs for p in run["forbidden"]}),
+            }
+            result["ok"] = (result["returncode"] == 0 and result["import_ms"] <= budget_ms
+                            and not result["forbidden_imports"])
+            results.append(result)
+            print(f"  {name:<18}{result['import_ms']:>10.1f}{result['wall_ms']:>10.1f}  "
+                  + ("ok" if result["ok"] else "FAIL")
+                  + (f" (imports {', '.join(result['forbidden_imports'])})" if result["forbidden_imports"] else "")
+                  + (f" (exit {result['returncode']})" if result["returncode"] else ""))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import and wall time of the offline CLI paths")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Import-time budget per command, in ms (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Runs per command; the median is reported (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"  {'command':<18}{'import ms':>10}{'wall ms':>10}  budget {args.budget_ms:g} ms")
+    results = run_benchmark(args.budget_ms, args.repeat)
+    if args.output:
+        Path(args.output).write_text(json.dumps({"budget_ms": args.budget_ms, "results": results}, indent=2),
+                                     encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+    failed = [r["command"] for r in results if not r["ok"]]
+    if failed:
+        print(f"\n✗ Failed, over budget or importing the SDK: {', '.join(failed)}")
+        return 1
+    print(f"\n✓ All {len(results)} offline command(s) within {args.budget_ms:g} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+# scripts/telemetry.py
+"""
+Process-wide instrumentation for Claude calls and batch jobs.
+Records wall time, queue time, token usage, retries and estimated cost for
+every call, prints a summary table and appends the run to run-metrics.json.
+Every response's cost is also charged to `spend_budget`, which stops new
+calls once an optional ceiling is reached.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from shared_limits import connect
+
+DEFAULT_METRICS_FILE = "run-metrics.json"
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+# Estimated USD per million tokens (input, output), matched by model-name
+# substring in order. Cache writes cost 1.25x input, cache reads 0.1x input,
+# and Batch API requests are billed at half price.
+MODEL_PRICES = (
+    (("opus-4-5", "opus-4-6", "4-5-opus", "4-6-opus"), (5.0, 25.0)),
+    (("opus",), (15.0, 75.0)),
+    (("sonnet",), (3.0, 15.0)),
+    (("haiku",), (1.0, 5.0)),
+)
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+BATCH_DISCOUNT = 0.5
+
+
+def model_prices(model: str) -> tuple[float, float]:
+    """(input, output) USD per million tokens for a model; unknown models cost 0."""
+    for patterns, prices in MODEL_PRICES:
+        if any(pattern in (model or "") for pattern in patterns):
+            return prices
+    return (0.0, 0.0)
+
+
+def usage_dict(message) -> dict:
+    """The usage counters of a Message as a plain dict (zeros when absent)."""
+    usage = getattr(message, "usage", None)
+    return {field: (getattr(usage, field, None) or 0) for field in USAGE_FIELDS}
+
+
+def estimate_cost(model: str, usage: dict, batch: bool = False) -> float:
+    """Estimated USD cost of one response."""
+    input_price, output_price = model_prices(model)
+    cost = (
+        usage["input_tokens"] * input_price
+        + usage["cache_creation_input_tokens"] * input_price * CACHE_WRITE_MULTIPLIER
+        + usage["cache_read_input_tokens"] * input_price * CACHE_READ_MULTIPLIER
+        + usage["output_tokens"] * output_price
+    ) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised before a call once the spend budget is used up."""
+
+
+class SpendBudget:
+    """
+    Estimated USD spent so far, with an optional ceiling (None: unlimited).
+
+    Under workspace.py, `spend_budget` is a proxy to one budget shared by
+    every product's process.
+    """
+
+    def __init__(self, limit_usd: float | None = None):
+        self.limit_usd = limit_usd
+        self.spent_usd = 0.0
+        self._lock = threading.Lock()
+
+    def charge(self, cost_usd: float) -> None:
+        with self._lock:
+            self.spent_usd += cost_usd
+
+    def check(self) -> None:
+        """Raise BudgetExceededError if the ceiling has been reached."""
+        with self._lock:
+            if self.limit_usd is not None and self.spent_usd >= self.limit_usd:
+                raise BudgetExceededError(
+                    f"spend budget of ${self.limit_usd:.2f} reached (est. ${self.spent_usd:.4f} spent)")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"limit_usd": self.limit_usd, "spent_usd": round(self.spent_usd, 6)}
+
+
+class RunMetrics:
+    """
+    Thread-safe record of every call and batch in this process.
+
+    Call kinds: 'sync' (messages.create), 'batch' (one batch result) and
+    'cache_hit' (served by the response cache, no API spend).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc).isoformat()
+            self.started = time.monotonic()
+            self.calls: list[dict] = []
+            self.batches: list[dict] = []
+            self.duplication: dict | None = None
+
+    @property
+    def responses(self) -> int:
+        return sum(1 for call in self.calls if call["kind"] != "cache_hit")
+
+    def record_call(self, kind: str, label: str, message, wall_time: float = 0.0,
+                    queue_time: float = 0.0, retries: int = 0) -> None:
+        """Record one response."""
+        usage = usage_dict(message) if kind != "cache_hit" else {field: 0 for field in USAGE_FIELDS}
+        model = getattr(message, "model", "") or ""
+        cost = estimate_cost(model, usage, batch=kind == "batch")
+        if cost:
+            spend_budget.charge(cost)
+        with self._lock:
+            self.calls.append({
+                "kind": kind,
+                "label": label,
+                "model": model,
+                "wall_time": round(wall_time, 3),
+                "queue_time": round(queue_time, 3),
+                "retries": retries,
+                **usage,
+                "cost_usd": round(cost, 6),
+            })
+
+    def record_batch(self, batch_id: str, requests: int, batch=None, wall_time: float = 0.0, polls: int = 0) -> None:
+        """Record one batch lifecycle, using the API's own timestamps when available."""
+        created_at = getattr(batch, "created_at", None)
+        ended_at = getattr(batch, "ended_at", None)
+        counts = getattr(batch, "request_counts", None)
+        queue_time = (ended_at - created_at).total_seconds() if created_at and ended_at else None
+        with self._lock:
+            self.batches.append({
+                "batch_id": batch_id,
+                "requests": requests,
+                "status": getattr(batch, "processing_status", "unknown"),
+                "wall_time": round(wall_time, 3),
+                "queue_time": round(queue_time, 3) if queue_time is not None else None,
+                "polls": polls,
+                "succeeded": getattr(counts, "succeeded", None),
+                "errored": getattr(counts, "errored", None),
+                "expired": getattr(counts, "expired", None),
+            })
+
+    def record_duplication(self, stats: dict) -> None:
+        """Record the run's shared-passage stats (see shared_passages.py)."""
+        with self._lock:
+            self.duplication = stats
+
+    def totals(self) -> dict:
+        """Aggregate counters over all recorded calls."""
+        totals = {field: 0 for field in USAGE_FIELDS}
+        cost = retries = 0
+        for call in self.calls:
+            for field in USAGE_FIELDS:
+                totals[field] += call[field]
+            cost += call["cost_usd"]
+            retries += call["retries"]
+        prompt_tokens = totals["input_tokens"] + totals["cache_creation_input_tokens"] + totals["cache_read_input_tokens"]
+        return {
+            "calls": len(self.calls),
+            "responses": self.responses,
+            "cache_hits": sum(1 for call in self.calls if call["kind"] == "cache_hit"),
+            **totals,
+            "retries": retries,
+            "cost_usd": round(cost, 6),
+            "prompt_cache_hit_rate": round(totals["cache_read_input_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0,
+        }
+
+    def summary_line(self) -> str:
+        t = self.totals()
+        return (
+            f"{t['responses']} response(s): {t['input_tokens']} input, {t['output_tokens']} output, "
+            f"{t['cache_creation_input_tokens']} cache write, {t['cache_read_input_tokens']} cache read tokens "
+            f"(prompt cache hit rate {t['prompt_cache_hit_rate']:.0%}), est. ${t['cost_usd']:.4f}"
+        )
+
+    def summary_table(self) -> str:
+        """Per-kind summary table for the console."""
+        header = f"{'kind':<10}{'calls':>7}{'input':>10}{'output':>10}{'c.write':>10}{'c.read':>10}{'wall s':>9}{'queue s':>9}{'cost $':>10}"
+        rows = [header, "-" * len(header)]
+        for kind in ("sync", "batch", "cache_hit"):
+            calls = [c for c in self.calls if c["kind"] == kind]
+            if not calls:
+                continue
+            rows.append(
+                f"{kind:<10}{len(calls):>7}"
+                f"{sum(c['input_tokens'] for c in calls):>10}"
+                f"{sum(c['output_tokens'] for c in calls):>10}"
+                f"{sum(c['cache_creation_input_tokens'] for c in calls):>10}"
+                f"{sum(c['cache_read_input_tokens'] for c in calls):>10}"
+                f"{sum(c['wall_time'] for c in calls):>9.1f}"
+                f"{sum(c['queue_time'] for c in calls):>9.1f}"
+                f"{sum(c['cost_usd'] for c in calls):>10.4f}"
+            )
+        for batch in self.batches:
+            queue = f"{batch['queue_time']:.0f}s" if batch["queue_time"] is not None else "n/a"
+            rows.append(f"batch {batch['batch_id']}: {batch['requests']} request(s), {batch['status']}, "
+                        f"queue {queue}, {batch['polls']} poll(s)")
+        return "\n".join(rows)
+
+    def report(self, script: str) -> dict:
+        return {
+            "script": script,
+            "started_at": self.started_at,
+            "wall_time": round(time.monotonic() - self.started, 3),
+            "totals": self.totals(),
+            "calls": list(self.calls),
+            "batches": list(self.batches),
+            **({"duplication": self.duplication} if self.duplication is not None else {}),
+        }
+
+    def write_report(self, path: str | Path = DEFAULT_METRICS_FILE, script: str | None = None) -> Path:
+        """
+        Append this process's run to a metrics file, written atomically.
+
+        The file holds {"runs": [...]}, so the pipeline steps of one CI job
+        accumulate into a single report.
+        """
+        path = Path(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            data = {"runs": []}
+        data.setdefault("runs", []).append(self.report(script or Path(sys.argv[0]).stem))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+        return path
+
+
+def add_metrics_arguments(parser) -> None:
+    """Add the shared --metrics-file option to an argparse parser."""
+    parser.add_argument('--metrics-file', default=DEFAULT_METRICS_FILE,
+                        help=f'Append call/batch metrics for this run to this JSON file (default: {DEFAULT_METRICS_FILE})')
+
+
+def finish_run(args) -> None:
+    """Print the summary table and write the metrics report selected on the CLI."""
+    if not run_metrics.calls and not run_metrics.batches:
+        return
+    print("\n" + run_metrics.summary_table())
+    print(f"  {run_metrics.summary_line()}")
+    path = run_metrics.write_report(args.metrics_file)
+    print(f"  Metrics written to {path}")
+
+
+run_metrics = RunMetrics()
+spend_budget = connect("spend_budget") or SpendBudget()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Offline pre-flight validator for enablement modules.
+
+Checks module structure without calling the API: heading depth, broken
+links and any sections the spec lists as required_sections. Modules built
+from create_modules.py's prompt, and the updates and patches
+generate_enablement.py makes to them, are also held to its outline (the
+sections it asks for and a word-count band around the spec's
+estimated_word_count). Generation runs it on every module before it is
+written; modules that fail are re-queued as
+section-level repair requests, so only the failing modules (and, where a
+problem is confined to a section, only that section) are regenerated.
+
+Run on its own it validates modules on disk in parallel, applying the
+outline of the template each module was built from per the build manifest:
+
+    python scripts/validate_modules.py enablement-modules/*.md --output validation.json
+"""
+
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote
+
+from corpus import corpus_label
+from manifest import BuildManifest
+from patches import PATCH_FORMAT, PatchError, apply_edits, parse_edits, render_outline
+from retrieval import SPECS_PATH, load_specs, spec_for_module
+from sections import FENCE_RE, MODULES_DIR, normalize_heading, split_sections
+
+# What each prompt template (by build manifest builder) asks a module for:
+# required sections, matched loosely by heading, and whether the spec's
+# estimated_word_count is a target. A spec's own required_sections
+# override the template's. Updates and patches keep the outline the
+# module was created with.
+MODULE_OUTLINE = {
+    "sections": ("Learning Objectives", "Overview", "Key Takeaways", "Additional Resources"),
+    "word_count": True,
+}
+TEMPLATE_OUTLINES = {
+    "create": MODULE_OUTLINE,
+    "update": MODULE_OUTLINE,
+    "patch": MODULE_OUTLINE,
+}
+# Accepted word counts, as fractions of the spec's estimated_word_count
+WORD_COUNT_BAND = (0.5, 2.0)
+# Deepest heading level allowed (####)
+MAX_HEADING_LEVEL = 4
+REPAIR_MAX_TOKENS = 4000
+
+LINK_RE = re.compile(r"!?\[[^\]]*\]\(\s*<?([^)\s>]*)>?(?:\s+[\"'][^)]*)?\)")
+SCHEME_RE = re.compile(r"^[a-z][a-z0-9+.-]*:", re.IGNORECASE)
+INLINE_CODE_RE = re.compile(r"`[^`\n]*`")
+
+
+class ModuleValidationError(ValueError):
+    """A generated module still fails validation after its repair."""
+
+    def __init__(self, module_path: str, issues: list[dict]):
+        super().__init__(f"{module_path} failed validation: {format_issues(issues)}")
+        self.issues = issues
+
+
+def issue(check: str, key: str, message: str, section: str | None = None) -> dict:
+    """One validation problem; `key` identifies it across versions of a module."""
+    return {"check": check, "key": f"{check}:{key}", "section": section, "message": message}
+
+
+def format_issues(issues: list[dict]) -> str:
+    return "; ".join(f"[{i['section']}] {i['message']}" if i["section"] else i["message"] for i in issues)
+
+
+def heading_slug(heading: str) -> str:
+    """GitHub-style anchor for a heading."""
+    return re.sub(r"[^\w\- ]", "", heading.strip().lower()).replace(" ", "-")
+
+
+def prose_lines(content: str):
+    """Lines of a section outside fenced code blocks."""
+    in_fence = False
+    for line in content.split("\n"):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+            continue
+        if not in_fence:
+            yield line
+
+
+def word_count(text: str) -> int:
+    return sum(len(line.split()) for line in prose_lines(text))
+
+
+def required_sections(spec: dict | None, template: str | None = None) -> tuple[str, ...]:
+    """Sections a module must have: the spec's required_sections, else its template's."""
+    if spec and "required_sections" in spec:
+        return tuple(spec["required_sections"])
+    return TEMPLATE_OUTLINES.get(template, {}).get("sections", ())
+
+
+def check_required_sections(sections: list[dict], required: tuple[str, ...]) -> list[dict]:
+    headings = [normalize_heading(s["heading"]) for s in sections if s["level"] > 0]
+    return [
+        issue("required-section", name, f"missing required section '{name}'")
+        for name in required
+        if not any(normalize_heading(name) in heading for heading in headings)
+    ]
+
+
+def check_word_count(text: str, spec: dict | None) -> list[dict]:
+    estimate = (spec or {}).get("estimated_word_count")
+    if not estimate:
+        return []
+    low, high = int(estimate * WORD_COUNT_BAND[0]), int(estimate * WORD_COUNT_BAND[1])
+    words = word_count(text)
+    if low <= words <= high:
+        return []
+    return [issue("word-count", "module", f"{words} words, expected {low}-{high} (estimate {estimate})")]
+
+
+def check_headings(sections: list[dict]) -> list[dict]:
+    issues = []
+    previous = 0
+    for section in sections:
+        level = section["level"]
+        if level == 0:
+            continue
+        if level > MAX_HEADING_LEVEL:
+            issues.append(issue("heading-depth", section["anchor"],
+                                f"H{level} heading is deeper than H{MAX_HEADING_LEVEL}", section["anchor"]))
+        elif previous and level > previous + 1:
+            issues.append(issue("heading-depth", section["anchor"],
+                                f"heading skips from H{previous} to H{level}", section["anchor"]))
+        previous = level
+    return issues
+
+
+def check_links(sections: list[dict], module_path: str | Path | None = None) -> list[dict]:
+    """
+    Broken in-page anchors and relative links to missing files. External
+    URLs are not fetched, and root-relative links (/en/...) point at the
+    docs site, so they count as external; relative paths are only checked
+    when the module's own path is known.
+    """
+    slugs = set()
+    seen: dict[str, int] = {}
+    for section in sections:
+        if section["level"] > 0:
+            slug = heading_slug(section["heading"])
+            count = seen.get(slug, 0)
+            seen[slug] = count + 1
+            slugs.add(slug if count == 0 else f"{slug}-{count}")
+
+    base = Path(module_path).parent if module_path else None
+    issues = []
+    for section in sections:
+        for line in prose_lines(section["content"]):
+            for target in LINK_RE.findall(INLINE_CODE_RE.sub("", line)):
+                if SCHEME_RE.match(target) or target.startswith("/"):
+                    continue
+                if not target:
+                    problem = "link has an empty target"
+                elif target.startswith("#"):
+                    if unquote(target[1:]).lower() in slugs:
+                        continue
+                    problem = f"link to missing heading '{target}'"
+                elif base is None:
+                    continue
+                else:
+                    path = unquote(target.split("#", 1)[0].split("?", 1)[0])
+                    if (base / path).exists():
+                        continue
+                    problem = f"link to missing file '{target}'"
+                issues.append(issue("broken-link", f"{section['anchor']}:{target}", problem, section["anchor"]))
+    return issues
+
+
+def validate_module(text: str, spec: dict | None = None, module_path: str | Path | None = None,
+                    template: str | None = None) -> list[dict]:
+    """
+    Every problem found in a module's text; an empty list means it passes.
+    `template` (a build manifest builder) adds that prompt's outline checks.
+    """
+    sections = split_sections(text)
+    outline = TEMPLATE_OUTLINES.get(template, {})
+    return [
+        *check_required_sections(sections, required_sections(spec, template)),
+        *(check_word_count(text, spec) if outline.get("word_count") else []),
+        *check_headings(sections),
+        *check_links(sections, module_path),
+    ]
+
+
+def gate_issues(text: str, spec: dict | None = None, module_path: str | Path | None = None,
+                baseline: str | None = None, template: str | None = None) -> list[dict]:
+    """
+    The problems that should stop a module being written. With the
+    module's previous text as `baseline` (an update), only problems the new
+    text introduces count, so older hand-written modules can still be updated.
+    """
+    issues = validate_module(text, spec, module_path, template)
+    if baseline is None or not issues:
+        return issues
+    known = {i["key"] for i in validate_module(baseline, spec, module_path, template)}
+    return [i for i in issues if i["key"] not in known]
+
+
+def read_baseline(module_path) -> str | None:
+    try:
+        with open(module_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (FileNotFoundError, OSError):
+        return None
+
+
+def build_repair_prompt(draft: str, issues: list[dict]) -> str:
+    """Prompt asking for section edits that fix only the listed problems."""
+    problems = "\n".join(f"- {i['message']}" + (f" (section: {i['section']})" if i["section"] else "")
+                         for i in issues)
+    return f"""The enablement module below failed automated checks before it could be saved.
+
+## Module Sections:
+Each section is shown under its anchor in square brackets. A section runs from its
+heading to the next heading of any level, so subsections are separate sections.
+
+{render_outline(draft)}
+
+## Problems to Fix:
+{problems}
+
+## Guidelines:
+- Fix only the listed problems; do not touch sections that are not involved
+- Add a missing section by inserting it after the section it should follow
+- Keep the tone, terminology and formatting of the rest of the module
+- Ensure accuracy based on source documentation
+
+{PATCH_FORMAT}"""
+
+
+def repair_params(params: dict, draft: str, issues: list[dict]) -> dict:
+    """
+    Params for a repair request: the original model and system blocks (so
+    the cached source prefix is reused) with a repair prompt for the draft.
+    """
+    return {
+        **params,
+        "max_tokens": REPAIR_MAX_TOKENS,
+        "messages": [{"role": "user", "content": build_repair_prompt(draft, issues)}],
+    }
+
+
+def repair_mapping(req: dict, draft: str, issues: list[dict]) -> dict:
+    """Batch request mapping entry that repairs a rejected draft."""
+    return {
+        **req,
+        "request": {
+            "custom_id": f"{req['request']['custom_id']}-repair",
+            "params": repair_params(req["request"]["params"], draft, issues),
+        },
+        "mode": "repair",
+        "draft": draft,
+        "issues": issues,
+    }
+
+
+def make_gate(rejected: list, spec_for, render=None, baseline: bool = False, template: str | None = None):
+    """
+    Wrap a batch render callback so every module is validated before it is
+    written. Failing drafts are rejected and appended to `rejected` as
+    (request mapping entry, draft, issues) for a repair batch; entries
+    resumed from the ledger have no params, which the caller rebuilds
+    before repairing them. With baseline, only problems the draft adds to
+    the module on disk count; `template` adds the outline checks of the
+    prompt that built the draft.
+    """
+    def gate(req, text):
+        if req.get("mode") == "repair":
+            # Repairs are rendered with make_repair_renderer, not gated
+            print(f"✗ Repair for {req['module_path']} reached the validation gate; rebuild the module")
+            return None
+        content = render(req, text) if render else text
+        if content is None:
+            return None
+        module_path = req["module_path"]
+        issues = gate_issues(content, spec_for(module_path), module_path,
+                             read_baseline(module_path) if baseline else None, template)
+        if not issues:
+            return content
+        print(f"⚠ {module_path} failed validation, re-queuing: {format_issues(issues)}")
+        rejected.append((req, content, issues))
+        return None
+    return gate
+
+
+def make_resume_renderer(gate, repair):
+    """Render callback for a resumed batch: repair requests go to `repair`, the rest through `gate`."""
+    return lambda req, text: (repair if req.get("mode") == "repair" else gate)(req, text)
+
+
+def make_repair_renderer(failed: list, spec_for, baseline: bool = False, template: str | None = None):
+    """
+    Batch render callback for repair requests: apply the edits to the
+    rejected draft and validate again. Drafts that still fail are appended
+    to `failed` and not written.
+    """
+    def render(req, text):
+        module_path = req["module_path"]
+        try:
+            content = apply_edits(req["draft"], parse_edits(text))
+        except (KeyError, PatchError) as e:
+            print(f"✗ Repair for {module_path} did not apply: {e}")
+            failed.append(req)
+            return None
+        issues = gate_issues(content, spec_for(module_path), module_path,
+                             read_baseline(module_path) if baseline else None, template)
+        if issues:
+            print(f"✗ {module_path} still fails validation, not written: {format_issues(issues)}")
+            failed.append(req)
+            return None
+        return content
+    return render
+
+
+def validate_file(job: tuple[str, dict | None, str | None]) -> tuple[str, list[dict]]:
+    """Validate one module on disk; a (path, spec, template) job for the process pool."""
+    path, spec, template = job
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+    except (FileNotFoundError, OSError, UnicodeDecodeError) as e:
+        return path, [issue("read", "module", f"could not be read ({e})")]
+    return path, validate_module(text, spec, path, template)
+
+
+def validate_paths(paths, specs: list[dict], workers: int | None = None, template_for=None) -> dict[str, list[dict]]:
+    """
+    Validate many modules across a process pool; {path: issues} in input
+    order. template_for(path) names the template each module was built from.
+    """
+    template_for = template_for or (lambda path: None)
+    jobs = [(str(path), spec_for_module(str(path), specs), template_for(str(path))) for path in paths]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        return dict(map(validate_file, jobs))
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return dict(pool.map(validate_file, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate enablement modules offline")
+    parser.add_argument("paths", nargs="*", help="Module files (default: every module in enablement-modules/)")
+    parser.add_argument("--specs", default=str(SPECS_PATH), help="Module specs JSON (default: plugin-module-specs.json)")
+    parser.add_argument("--template", choices=sorted(TEMPLATE_OUTLINES),
+                        help="Check every module against this prompt template's outline "
+                             "(default: the builder recorded in the build manifest, if any)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(str(p) for p in MODULES_DIR.glob("*.md"))
+    if args.template:
+        template_for = lambda path: args.template
+    else:
+        manifest = BuildManifest()
+        template_for = lambda path: (manifest.entry(path) or {}).get("builder")
+    results = validate_paths(paths, load_specs(Path(args.specs)), args.workers, template_for)
+    failing = {path: issues for path, issues in results.items() if issues}
+    for path, issues in failing.items():
+        print(f"✗ {corpus_label(path)}")
+        for i in issues:
+            print(f"    {i['check']}: " + (f"[{i['section']}] " if i["section"] else "") + i["message"])
+    print(f"\n{len(results) - len(failing)}/{len(results)} module(s) pass")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"modules": {corpus_label(path): issues for path, issues in results.items()},
+                       "failing": [corpus_label(path) for path in failing]}, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 1 if failing else 0
+
+
+if __name__ == "__main__":
+    exit(main())
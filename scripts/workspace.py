@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Run the pipeline for several product lines at once.
+
+A workspace config lists each product's corpus, module and spec roots.
+Every product runs scripts/pipeline.py in its own process, in parallel,
+pointed at its tree through the ENABLEMENT_* environment variables (see
+sections.py). All of them share one rate limiter and one spend budget,
+served from this process (see shared_limits.py), so ten products together
+stay within the account's limits. When they finish, their impact analyses
+and metrics are merged into one workspace report.
+
+Config (workspace.json), paths relative to the config file:
+
+    {
+      "rpm": 50, "tpm": 400000, "budget_usd": 25.0, "jobs": 4,
+      "args": ["--mode", "patch"],
+      "products": [
+        {"name": "plugins", "root": "../plugins-enablement"},
+        {"name": "agents", "root": "../agents-enablement", "sources": "docs",
+         "modules": "modules", "specs": "agent-module-specs.json",
+         "changes": "changes.json", "args": ["--top-k", "8"]}
+      ]
+    }
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from shared_limits import serve
+from telemetry import USAGE_FIELDS
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+DEFAULT_CONFIG = "workspace.json"
+DEFAULT_REPORT_DIR = "workspace-reports"
+DEFAULT_OUTPUT = "workspace-report.json"
+DEFAULT_JOBS = 4
+
+# Product keys mapped to the environment variables sections.py/retrieval.py read
+PRODUCT_ENV = {"sources": "ENABLEMENT_SOURCES", "modules": "ENABLEMENT_MODULES", "specs": "ENABLEMENT_SPECS"}
+
+
+def load_workspace(path: str | Path) -> dict:
+    """Read and check a workspace config; product roots are resolved against its directory."""
+    path = Path(path)
+    config = json.loads(path.read_text(encoding="utf-8"))
+    products = config.get("products")
+    if not isinstance(products, list) or not products:
+        raise ValueError(f"{path}: 'products' must be a non-empty list")
+    names = set()
+    for i, product in enumerate(products):
+        if not isinstance(product, dict) or not product.get("name") or not product.get("root"):
+            raise ValueError(f"{path}: products[{i}] needs a 'name' and a 'root'")
+        if product["name"] in names:
+            raise ValueError(f"{path}: duplicate product name '{product['name']}'")
+        names.add(product["name"])
+        product["root"] = (path.parent / product["root"]).resolve()
+        if not product["root"].is_dir():
+            raise ValueError(f"{path}: root of '{product['name']}' not found: {product['root']}")
+        if product.get("changes"):
+            product["changes"] = product["root"] / product["changes"]
+    return config
+
+
+def product_command(product: dict, config: dict, report_dir: Path) -> list[str]:
+    """pipeline.py invocation for one product."""
+    command = [
+        sys.executable, str(SCRIPTS_DIR / "pipeline.py"),
+        "--output", str(report_dir / f"{product['name']}-impact.json"),
+        "--metrics-file", str(report_dir / f"{product['name']}-metrics.json"),
+    ]
+    if product.get("changes"):
+        command += ["--changes-file", str(product["changes"])]
+    return command + list(config.get("args", [])) + list(product.get("args", []))
+
+
+def product_environment(product: dict, limits_env: dict[str, str]) -> dict[str, str]:
+    """This process's environment, pointed at one product's tree and the shared limits."""
+    env = {**os.environ, **limits_env, "ENABLEMENT_ROOT": str(product["root"])}
+    for key, variable in PRODUCT_ENV.items():
+        if product.get(key):
+            env[variable] = str(product[key])
+        else:
+            env.pop(variable, None)
+    return env
+
+
+def run_product(product: dict, config: dict, report_dir: Path, limits_env: dict[str, str]) -> dict:
+    """Run one product's pipeline to completion, logging its output to <report_dir>/<name>.log."""
+    log_path = report_dir / f"{product['name']}.log"
+    for stale in (f"{product['name']}-impact.json", f"{product['name']}-metrics.json"):
+        (report_dir / stale).unlink(missing_ok=True)
+    start = time.monotonic()
+    with open(log_path, "w", encoding="utf-8") as log:
+        returncode = subprocess.call(
+            product_command(product, config, report_dir), cwd=product["root"],
+            env=product_environment(product, limits_env), stdout=log, stderr=subprocess.STDOUT,
+        )
+    wall_time = time.monotonic() - start
+    print(f"{'✓' if returncode == 0 else '✗'} {product['name']}: exit {returncode} in {wall_time:.1f}s ({log_path})")
+    return {"name": product["name"], "root": str(product["root"]), "returncode": returncode,
+            "wall_time": round(wall_time, 3), "log": str(log_path)}
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, OSError, json.JSONDecodeError):
+        return None
+
+
+def sum_totals(totals: list[dict]) -> dict:
+    """Add metrics totals together, recomputing the prompt cache hit rate."""
+    summed = {field: 0 for field in ("calls", "responses", "cache_hits", *USAGE_FIELDS, "retries")}
+    cost = 0.0
+    for entry in totals:
+        for field in summed:
+            summed[field] += entry.get(field, 0)
+        cost += entry.get("cost_usd", 0.0)
+    prompt_tokens = sum(summed[field] for field in USAGE_FIELDS if field != "output_tokens")
+    summed["cost_usd"] = round(cost, 6)
+    summed["prompt_cache_hit_rate"] = (
+        round(summed["cache_read_input_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+    )
+    return summed
+
+
+def merge_reports(runs: list[dict], report_dir: Path) -> dict:
+    """
+    One report for the workspace: every product's affected modules (tagged
+    with the product), its run status and metrics totals, and the totals
+    across products.
+    """
+    products = {}
+    affected = []
+    for run in runs:
+        name = run["name"]
+        impact = _read_json(report_dir / f"{name}-impact.json") or {}
+        metrics = _read_json(report_dir / f"{name}-metrics.json") or {}
+        totals = sum_totals([r.get("totals", {}) for r in metrics.get("runs", [])])
+        products[name] = {**run, "changed_files": impact.get("changed_files", []),
+                          "affected_modules": len(impact.get("affected_modules", [])),
+                          "error": impact.get("error"), "totals": totals}
+        affected.extend({"product": name, **module} for module in impact.get("affected_modules", []))
+    return {
+        "products": products,
+        "affected_modules": affected,
+        "totals": sum_totals([p["totals"] for p in products.values()]),
+    }
+
+
+def run_workspace(config: dict, report_dir: Path, jobs: int) -> dict:
+    """Run every product against shared limits; returns the merged report."""
+    report_dir.mkdir(parents=True, exist_ok=True)
+    manager = serve(config.get("rpm"), config.get("tpm"), config.get("budget_usd"))
+    try:
+        limits_env = manager.environment()
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            runs = list(pool.map(lambda product: run_product(product, config, report_dir, limits_env),
+                                 config["products"]))
+        budget = manager.spend_budget().snapshot()
+    finally:
+        manager.shutdown()
+    report = merge_reports(runs, report_dir)
+    report["budget"] = budget
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline for every product in a workspace, in parallel")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help=f"Workspace config (default: {DEFAULT_CONFIG})")
+    parser.add_argument("--jobs", type=int,
+                        help=f"Products run at once (default: the config's 'jobs', else {DEFAULT_JOBS})")
+    parser.add_argument("--report-dir", default=DEFAULT_REPORT_DIR,
+                        help=f"Directory for per-product impact, metrics and logs (default: {DEFAULT_REPORT_DIR})")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help=f"Merged workspace report (default: {DEFAULT_OUTPUT})")
+    args = parser.parse_args()
+
+    try:
+        config = load_workspace(args.config)
+    except (OSError, json.JSONDecodeError, ValueError) as e:
+        print(f"✗ Could not load workspace: {e}")
+        return 1
+    jobs = args.jobs or config.get("jobs") or DEFAULT_JOBS
+    products = config["products"]
+    print(f"Running {len(products)} product(s), {min(jobs, len(products))} at a time")
+
+    report = run_workspace(config, Path(args.report_dir).resolve(), jobs)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    totals = report["totals"]
+    failed = [name for name, product in report["products"].items() if product["returncode"] != 0]
+    print(f"\n{len(report['affected_modules'])} affected module(s) across {len(products)} product(s); "
+          f"{totals['responses']} response(s), est. ${totals['cost_usd']:.4f}")
+    if report["budget"]["limit_usd"] is not None:
+        print(f"  Spend budget: ${report['budget']['spent_usd']:.4f} of ${report['budget']['limit_usd']:.2f}")
+    print(f"  Workspace report written to {args.output}")
+    if failed:
+        print(f"✗ {len(failed)} product(s) failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,66 @@
+import analyze_impact
+from analyze_impact import (PROMPT_OVERHEAD_TOKENS, analyze_impact as run_analysis, estimate_tokens, merge_impacts,
+                            partition_candidates)
+
+
+def candidate(module, *sections):
+    return {"module": module, "section": sections[0], "sections": list(sections)}
+
+
+def modules(shards):
+    return [[c["module"] for c in shard] for shard in shards]
+
+
+def test_merge_keeps_each_module_once_at_its_highest_priority():
+    merged = merge_impacts([
+        {"changed_files": ["a.md"], "summary": "first shard",
+         "affected_modules": [{"module": "m1.md", "priority": "low", "reason": "one"},
+                              {"module": "m2.md", "priority": "medium", "reason": "two"}]},
+        {"changed_files": ["b.md", "a.md"],
+         "affected_modules": [{"module": "m1.md", "priority": "high", "reason": "three"},
+                              {"module": "m2.md", "priority": "low", "reason": "four"}]},
+    ])
+    assert merged["changed_files"] == ["a.md", "b.md"]
+    assert merged["affected_modules"] == [{"module": "m1.md", "priority": "high", "reason": "three"},
+                                          {"module": "m2.md", "priority": "medium", "reason": "two"}]
+    assert merged["summary"] == "first shard"
+
+
+def test_merge_of_nothing_is_empty():
+    assert merge_impacts([]) == {"changed_files": [], "affected_modules": []}
+
+
+def test_candidates_fit_in_one_shard_under_the_budget():
+    blocks = {"m1.md": "x" * 400, "m2.md": "x" * 400}
+    shortlist = [candidate("m1.md", "A"), candidate("m2.md", "A")]
+    assert modules(partition_candidates(shortlist, blocks, {"A": 50}, 10_000)) == [["m1.md", "m2.md"]]
+
+
+def test_shards_carry_only_their_own_changes():
+    blocks = {"m1.md": "x" * 400, "m2.md": "x" * 400, "m3.md": "x" * 400}
+    module_tokens = estimate_tokens(blocks["m1.md"])
+    changes = {"A": 100, "B": 100}
+    shortlist = [candidate("m1.md", "A"), candidate("m2.md", "A"), candidate("m3.md", "B")]
+    # m1 and m2 share change A, so it is only counted once; m3 needs B as well
+    budget = PROMPT_OVERHEAD_TOKENS + 2 * module_tokens + changes["A"]
+    assert modules(partition_candidates(shortlist, blocks, changes, budget)) == [["m1.md", "m2.md"], ["m3.md"]]
+
+
+def test_oversized_module_gets_a_shard_of_its_own():
+    blocks = {"small.md": "x" * 40, "huge.md": "x" * 40_000, "tail.md": "x" * 40}
+    shortlist = [candidate("small.md", "A"), candidate("huge.md", "A"), candidate("tail.md", "A")]
+    shards = partition_candidates(shortlist, blocks, {"A": 10}, PROMPT_OVERHEAD_TOKENS + 1_000)
+    assert modules(shards) == [["small.md"], ["huge.md"], ["tail.md"]]
+
+
+class NoClient:
+    def __getattr__(self, name):
+        raise AssertionError("the API was called")
+
+
+def test_no_candidates_means_no_impact_request(monkeypatch):
+    monkeypatch.setattr(analyze_impact, "shortlist_candidates", lambda *args: (None, []))
+    result = run_analysis(["source-docs/create-plugins.md"], [], client=NoClient())
+    assert result["affected_modules"] == []
+    assert result["changed_files"] == ["source-docs/create-plugins.md"]
+    assert {s["file"] for s in result["changed_sections"]} == {"source-docs/create-plugins.md"}
@@ -0,0 +1,57 @@
+from batch_jobs import BatchLedger, plan_batches, request_size
+
+
+def request(i, chars=100, **extra):
+    return {
+        "request": {"custom_id": f"req-{i}", "params": {"messages": [{"role": "user", "content": "x" * chars}]}},
+        "module_path": f"enablement-modules/module-{i}.md",
+        "prompt_hash": f"hash-{i}",
+        **extra,
+    }
+
+
+def ids(batches):
+    return [[req["request"]["custom_id"] for req in batch] for batch in batches]
+
+
+def test_requests_are_split_by_count_in_order():
+    reqs = [request(i) for i in range(5)]
+    assert ids(plan_batches(reqs, max_requests=2)) == [["req-0", "req-1"], ["req-2", "req-3"], ["req-4"]]
+
+
+def test_requests_are_split_by_payload_size():
+    reqs = [request(i) for i in range(4)]
+    size = request_size(reqs[0])
+    assert ids(plan_batches(reqs, max_bytes=2 * size)) == [["req-0", "req-1"], ["req-2", "req-3"]]
+    assert ids(plan_batches(reqs, max_bytes=2 * size - 1)) == [["req-0"], ["req-1"], ["req-2"], ["req-3"]]
+
+
+def test_oversized_request_gets_a_batch_of_its_own(capsys):
+    reqs = [request(0), request(1, chars=10_000), request(2)]
+    limit = request_size(reqs[0]) * 3
+    assert ids(plan_batches(reqs, max_bytes=limit)) == [["req-0"], ["req-1"], ["req-2"]]
+    assert "module-1.md" in capsys.readouterr().out
+
+
+def test_no_requests_means_no_batches():
+    assert plan_batches([]) == []
+
+
+def test_ledger_keeps_what_resume_needs(tmp_path):
+    info = {"module": "enablement-modules/module-0.md", "priority": "high"}
+    ledger = BatchLedger(str(tmp_path / "batch-ledger.json"))
+    job_id = ledger.start_job([request(0, mode="patch", module_info=info),
+                               request(1, mode="repair", draft="# Draft\n", issues=[])])
+    ledger.set_status(job_id, "submitted", "msgbatch_1")
+
+    reloaded = BatchLedger(str(tmp_path / "batch-ledger.json"))
+    assert [job for job, _ in reloaded.resumable_jobs()] == [job_id]
+    patch, repair = reloaded.request_mapping(job_id)
+    assert "params" not in patch["request"]
+    assert (patch["mode"], patch["module_info"]) == ("patch", info)
+    assert (repair["mode"], repair["draft"], repair["issues"]) == ("repair", "# Draft\n", [])
+
+    reloaded.mark_request(job_id, "req-0", "written")
+    assert not reloaded.settled(job_id)
+    reloaded.mark_request(job_id, "req-1", "errored")
+    assert reloaded.settled(job_id)
@@ -0,0 +1,47 @@
+import pytest
+
+from corpus import corpus_label
+from corpus_store import CorpusStore, _decode_section, _open_map, scan_sections
+from sections import split_sections
+
+DOCS = {
+    "preamble": "Intro before any heading.\n\n# Title\n\nBody.\n\n## Sub\n\nMore.\n",
+    "fenced heading": "# Title\n\n```bash\n# not a heading\necho hi\n```\n\n## Next\n\nText.\n",
+    "duplicate headings": "# Title\n\n## Steps\n\nOne.\n\n## Steps\n\nTwo.\n",
+    "crlf": "# Title\r\n\r\nBody.\r\n\r\n## Sub\r\n\r\nMore.\r\n",
+    "no final newline": "# Title\n\nBody.\n\n## Sub\n\nLast line",
+    "skipped levels": "# Title\n\n### Deep\n\nText.\n\n## Back\n\nText.\n",
+    "blank preamble": "\n\n# Title\n\nBody.\n",
+}
+
+
+@pytest.mark.parametrize("text", DOCS.values(), ids=DOCS.keys())
+def test_scan_matches_split_sections(tmp_path, text):
+    path = tmp_path / "doc.md"
+    path.write_bytes(text.encode("utf-8"))
+    mm = _open_map(path)
+    try:
+        _, scanned = scan_sections(mm)
+        expected = split_sections(text)
+        assert [(s["anchor"], s["heading"], s["level"], s["line"], s["hash"]) for s in scanned] == [
+            (s["anchor"], s["heading"], s["level"], s["line"], s["hash"]) for s in expected]
+        contents = [_decode_section(mm[s["start"]:s["end"]], i == len(scanned) - 1) for i, s in enumerate(scanned)]
+        assert contents == [s["content"] for s in expected]
+    finally:
+        mm.close()
+
+
+def test_store_reads_sections_lazily_and_tracks_edits(tmp_path):
+    path = tmp_path / "doc.md"
+    path.write_text(DOCS["preamble"], encoding="utf-8")
+    label = corpus_label(path)
+    store = CorpusStore(tmp_path / "corpus-index.json")
+    assert store.refresh([path]) == [label]
+    assert store.refresh([path]) == []
+    first_hash = store.file_hash(label)
+    assert [s["content"] for s in store.sections(label)] == [s["content"] for s in split_sections(DOCS["preamble"])]
+
+    path.write_text(DOCS["preamble"] + "\n## Added\n\nNew.\n", encoding="utf-8")
+    assert store.refresh([path]) == [label]
+    assert store.file_hash(label) != first_hash
+    assert store.sections(label).metadata()[-1]["anchor"] == "Title > Added"
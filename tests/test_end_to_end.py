@@ -0,0 +1,61 @@
+"""Run impact analysis and generation end to end against the local fake API server."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from fake_anthropic import FakeAnthropicServer, FakeAnthropicState
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+COPIED = ("scripts", "source-docs", "enablement-modules", "plugin-module-specs.json")
+CHANGED_FILE = "source-docs/create-plugins.md"
+
+
+@pytest.fixture
+def project(tmp_path):
+    for name in COPIED:
+        source = REPO_ROOT / name
+        if source.is_dir():
+            shutil.copytree(source, tmp_path / name, ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            shutil.copy2(source, tmp_path / name)
+    return tmp_path
+
+
+@pytest.fixture
+def server():
+    with FakeAnthropicServer(FakeAnthropicState(batch_delay=0.2, output_words=150, seed=1)) as running:
+        yield running
+
+
+def run_script(project, server, *args):
+    env = dict(os.environ, ANTHROPIC_BASE_URL=server.url, ANTHROPIC_API_KEY="fake",
+               ENABLEMENT_ROOT=str(project))
+    result = subprocess.run([sys.executable, *args], cwd=project, env=env,
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result
+
+
+def test_analyze_then_generate_updates_modules_and_manifest(project, server):
+    modules = {path.name: path.read_text() for path in (project / "enablement-modules").glob("*.md")}
+
+    run_script(project, server, "scripts/analyze_impact.py",
+               "--changed-files", CHANGED_FILE, "--output", "impact-analysis.json")
+    impact = json.loads((project / "impact-analysis.json").read_text())
+    affected = [entry["module"] for entry in impact["affected_modules"]]
+    assert affected
+
+    run_script(project, server, "scripts/generate_enablement.py", "--impact-file", "impact-analysis.json")
+    rewritten = [path.name for path in (project / "enablement-modules").glob("*.md")
+                 if path.read_text() != modules.get(path.name)]
+    assert rewritten
+
+    manifest = json.loads((project / "build-manifest.json").read_text())
+    assert set(rewritten) <= {Path(label).name for label in manifest["modules"]}
+    assert sum(server.state.snapshot_stats()["requests"].values()) > 0
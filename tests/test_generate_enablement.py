@@ -0,0 +1,56 @@
+from generate_enablement import select_stale_modules
+from manifest import BuildManifest
+from sections import split_sections
+
+SOURCE = """# Plugins
+
+## Install
+
+Run `claude plugin install` then `claude plugin list`.
+
+## Remove
+
+Run `claude plugin remove`.
+"""
+
+MODULE = """# Installing Plugins
+
+## Install
+
+Use `claude plugin install` and check with `claude plugin list`.
+"""
+
+
+def analysis(module, *sections):
+    return {
+        "affected_modules": [{"module": str(module), "priority": "medium", "reason": "source changed"}],
+        "changed_sections": [{"file": "source-docs/plugins.md", "section": s, "status": "changed"} for s in sections],
+    }
+
+
+def built(tmp_path):
+    module = tmp_path / "module-1.md"
+    module.write_text(MODULE, encoding="utf-8")
+    manifest = BuildManifest(tmp_path / "build-manifest.json")
+    sources = {"source-docs/plugins.md": split_sections(SOURCE)}
+    manifest.record(module, "patch", None, sources)
+    return manifest, module, sources
+
+
+def test_module_built_from_every_changed_section_is_skipped(tmp_path, capsys):
+    manifest, module, sources = built(tmp_path)
+    selected = select_stale_modules(analysis(module, "Plugins > Install"), manifest, [], sources)
+    assert selected["affected_modules"] == []
+    assert "skipping" in capsys.readouterr().out
+
+
+def test_listed_module_is_kept_when_a_changed_section_is_not_recorded(tmp_path):
+    manifest, module, sources = built(tmp_path)
+    impact = analysis(module, "Plugins > Install", "Plugins > Remove")
+    assert select_stale_modules(impact, manifest, [], sources)["affected_modules"] == impact["affected_modules"]
+
+
+def test_listed_module_is_kept_without_changed_sections(tmp_path):
+    manifest, module, sources = built(tmp_path)
+    impact = analysis(module)
+    assert select_stale_modules(impact, manifest, [], sources)["affected_modules"] == impact["affected_modules"]
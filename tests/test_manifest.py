@@ -0,0 +1,79 @@
+import pytest
+
+from manifest import ALL_SECTIONS, BuildManifest, source_dependencies, stale_reasons
+from sections import split_sections
+
+SOURCE = """# Plugins
+
+Intro to plugins.
+
+## Install
+
+Run `claude plugin install` then `claude plugin list`.
+
+## Remove
+
+Run `claude plugin remove`.
+"""
+
+MODULE = """# Installing Plugins
+
+## Install
+
+Use `claude plugin install` and check with `claude plugin list`.
+"""
+
+SPEC = {"filename": "module-1.md", "title": "Installing Plugins", "description": "How to install plugins"}
+
+
+@pytest.fixture
+def built(tmp_path):
+    module = tmp_path / "module-1.md"
+    module.write_text(MODULE, encoding="utf-8")
+    manifest = BuildManifest(tmp_path / "build-manifest.json")
+    sources = {"source-docs/plugins.md": split_sections(SOURCE)}
+    manifest.record(module, "patch", SPEC, sources)
+    return manifest, module, sources
+
+
+def test_fresh_build_is_up_to_date(built):
+    manifest, module, sources = built
+    assert stale_reasons(manifest, module, SPEC, sources) == []
+
+
+def test_module_depends_only_on_the_sections_it_references(built):
+    manifest, module, sources = built
+    assert manifest.entry(module)["sources"] == {"source-docs/plugins.md": {
+        "Plugins > Install": split_sections(SOURCE)[1]["hash"]}}
+    edited = {"source-docs/plugins.md": split_sections(SOURCE.replace("`claude plugin remove`", "`claude plugin rm`"))}
+    assert stale_reasons(manifest, module, SPEC, edited) == []
+
+
+def test_changed_source_section_is_reported(built):
+    manifest, module, _ = built
+    edited = {"source-docs/plugins.md": split_sections(SOURCE.replace("then", "and then"))}
+    assert stale_reasons(manifest, module, SPEC, edited) == ["source changed: source-docs/plugins.md > Plugins > Install"]
+
+
+def test_spec_template_and_model_changes_are_reported(built):
+    manifest, module, sources = built
+    entry = manifest.entry(module)
+    entry["template"] = -1
+    entry["model"] = "an-older-model"
+    assert stale_reasons(manifest, module, {**SPEC, "title": "Plugins"}, sources) == [
+        "spec changed", "prompt template changed", "model changed"]
+
+
+def test_missing_and_unrecorded_modules_are_stale(tmp_path, built):
+    manifest, module, sources = built
+    other = tmp_path / "module-2.md"
+    other.write_text(MODULE, encoding="utf-8")
+    assert stale_reasons(manifest, other, None, sources) == ["not in manifest"]
+    module.unlink()
+    assert stale_reasons(manifest, module, SPEC, sources) == ["module file missing"]
+
+
+def test_module_without_references_depends_on_every_section():
+    sources = {"source-docs/plugins.md": split_sections(SOURCE)}
+    dependencies = source_dependencies("# Unrelated\n\nNothing shared.\n", sources)
+    assert list(dependencies["source-docs/plugins.md"]) == [ALL_SECTIONS]
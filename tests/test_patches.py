@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from patches import PatchError, apply_edits, parse_edits
+
+MODULE = """# Title
+
+Intro.
+
+## Setup
+
+Step one.
+
+## Usage
+
+Run it.
+"""
+
+
+def patch(*edits):
+    return json.dumps({"edits": list(edits)})
+
+
+def test_parse_edits_accepts_fenced_json():
+    text = "```json\n" + patch({"op": "delete", "section": "Title > Usage"}) + "\n```"
+    assert parse_edits(text) == [{"op": "delete", "section": "Title > Usage"}]
+
+
+@pytest.mark.parametrize("text", [
+    "not json",
+    json.dumps({"changes": []}),
+    patch({"op": "rewrite", "section": "Title", "content": "x"}),
+    patch({"op": "replace", "content": "x"}),
+    patch({"op": "insert", "section": "Title"}),
+])
+def test_parse_edits_rejects_malformed_patches(text):
+    with pytest.raises(PatchError):
+        parse_edits(text)
+
+
+def test_replace_keeps_other_sections():
+    result = apply_edits(MODULE, [{"op": "replace", "section": "Title > Setup", "content": "## Setup\n\nStep two."}])
+    assert result == "# Title\n\nIntro.\n\n## Setup\n\nStep two.\n\n## Usage\n\nRun it.\n"
+
+
+def test_insert_goes_after_the_section_and_delete_removes_it():
+    result = apply_edits(MODULE, [
+        {"op": "insert", "section": "Title > Setup", "content": "## Check\n\nLook."},
+        {"op": "delete", "section": "Title > Usage"},
+    ])
+    assert result == "# Title\n\nIntro.\n\n## Setup\n\nStep one.\n\n## Check\n\nLook.\n"
+
+
+def test_unknown_section_applies_nothing():
+    with pytest.raises(PatchError, match="unknown section"):
+        apply_edits(MODULE, [{"op": "delete", "section": "Title > Missing"}])
+
+
+def test_section_edited_twice_is_rejected():
+    with pytest.raises(PatchError, match="more than once"):
+        apply_edits(MODULE, [
+            {"op": "delete", "section": "Title > Setup"},
+            {"op": "replace", "section": "Title > Setup", "content": "## Setup\n"},
+        ])
@@ -0,0 +1,78 @@
+import pytest
+
+import render_trainer
+from corpus_store import CorpusStore
+from render_trainer import parse_blocks, render_module, render_resources
+
+SECTION = """## Installing
+
+Install the plugin with **one command**. Then check the [list](https://example.com).
+
+> **Instructor Note:** Ask who has used a marketplace before.
+> Keep this to two minutes.
+
+- Run `claude plugin install`
+- Restart the session
+
+```bash
+# not a heading
+claude plugin install demo
+```
+
+| Command | Effect |
+|---------|--------|
+
+<details>
+What do you expect to happen?
+</details>
+"""
+
+
+def test_parse_blocks_separates_notes_bullets_and_prose():
+    blocks = parse_blocks(SECTION)
+    assert blocks["notes"] == ["Ask who has used a marketplace before. Keep this to two minutes."]
+    assert blocks["bullets"] == ["Run `claude plugin install`", "Restart the session"]
+    assert blocks["paragraphs"] == ["Install the plugin with one command. Then check the list.",
+                                    "What do you expect to happen?"]
+
+
+def test_render_module_builds_slides_and_guide():
+    text = ("# Plugin Basics\n\n## Learning Objectives\n\n- Install a plugin\n\n" + SECTION
+            + "\n### Lab Steps\n\n- Open a terminal\n\n## Key Takeaways\n\n- Plugins are shareable\n")
+    part = render_module("enablement-modules/module-1.md", text, {"title": "Basics", "description": "Intro."})
+    assert [slide["title"] for slide in part["slides"]] == ["Basics", "Plugin Basics", "Learning Objectives",
+                                                            "Installing", "Key Takeaways"]
+    installing = part["slides"][3]
+    assert installing["notes"] == "Ask who has used a marketplace before. Keep this to two minutes."
+    assert installing["bullets"][-2:] == ["Lab Steps", "Open a terminal"]
+    assert part["guide"]["objectives"] == ["Install a plugin"]
+    assert part["guide"]["takeaways"] == ["Plugins are shareable"]
+    assert part["guide"]["activities"] == ["Lab Steps"]
+    assert part["guide"]["prompts"] == ["What do you expect to happen?"]
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    modules = tmp_path / "enablement-modules"
+    modules.mkdir()
+    for i in (1, 2):
+        (modules / f"module-{i}.md").write_text(f"# Module {i}\n\n## Topic\n\n- Point {i}\n", encoding="utf-8")
+    monkeypatch.setattr(render_trainer, "MODULES_DIR", modules)
+    monkeypatch.setattr(render_trainer, "RENDER_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(render_trainer, "RENDER_STATE_PATH", tmp_path / "cache" / "state.json")
+    return modules, tmp_path / "out"
+
+
+def render(output_dir, tmp_path, refresh=None):
+    return render_resources(refresh, [], "Deck", output_dir, workers=1, store=CorpusStore(tmp_path / "index.json"))
+
+
+def test_named_modules_refresh_without_dropping_the_rest(tree, tmp_path):
+    modules, output_dir = tree
+    assert render(output_dir, tmp_path)
+    assert render(output_dir, tmp_path) == []
+
+    assert render(output_dir, tmp_path, [modules / "module-2.md"])
+    deck = (output_dir / "Deck (generated).md").read_text(encoding="utf-8")
+    assert "Point 1" in deck and "Point 2" in deck
+    assert "Removed" not in (output_dir / "release-notes.md").read_text(encoding="utf-8")
@@ -0,0 +1,78 @@
+import pytest
+
+import scheduler
+from scheduler import DeferredModules, Scheduler, estimate_request_cost, plan_lanes
+
+PARAMS = {"model": "claude-sonnet-4-5", "max_tokens": 1000, "messages": [{"role": "user", "content": "x" * 4000}]}
+
+
+def request(name, priority):
+    return {
+        "request": {"custom_id": name, "params": PARAMS},
+        "module_path": f"enablement-modules/{name}.md",
+        "module_info": {"module": f"enablement-modules/{name}.md", "priority": priority},
+    }
+
+
+def names(reqs):
+    return [req["request"]["custom_id"] for req in reqs]
+
+
+def test_high_priority_goes_to_the_fast_lane_in_priority_order():
+    plan = plan_lanes([request("low", "low"), request("high", "high"), request("medium", "medium")])
+    assert names(plan["fast"]) == ["high"]
+    assert names(plan["batch"]) == ["medium", "low"]
+    assert plan["deferred"] == []
+
+
+def test_batch_requests_are_estimated_at_the_discount():
+    sync, batch = estimate_request_cost(PARAMS), estimate_request_cost(PARAMS, batch=True)
+    assert 0 < batch < sync
+    plan = plan_lanes([request("high", "high"), request("low", "low")])
+    assert plan["estimated_cost"] == pytest.approx(sync + batch)
+
+
+def test_cost_ceiling_demotes_fast_requests_before_deferring():
+    sync, batch = estimate_request_cost(PARAMS), estimate_request_cost(PARAMS, batch=True)
+    assert sync + batch > 2 * batch
+    plan = plan_lanes([request("high", "high"), request("low", "low")], max_cost=2 * batch)
+    assert plan["fast"] == []
+    assert names(plan["batch"]) == ["high", "low"]
+    assert plan["deferred"] == []
+
+
+def test_cost_ceiling_defers_the_lowest_priority_first():
+    batch = estimate_request_cost(PARAMS, batch=True)
+    plan = plan_lanes([request("low", "low"), request("high", "high"), request("medium", "medium")],
+                      max_cost=2 * batch)
+    assert names(plan["batch"]) == ["high", "medium"]
+    assert names(plan["deferred"]) == ["low"]
+    assert plan["estimated_cost"] == pytest.approx(2 * batch)
+
+
+def test_deferred_modules_are_merged_into_the_next_analysis(tmp_path):
+    path = tmp_path / "deferred-modules.json"
+    deferred = DeferredModules(path)
+    info = request("low", "low")["module_info"]
+    deferred.settle([], [request("low", "low")], [{"file": "source-docs/a.md", "section": "A", "status": "changed"}])
+
+    reloaded = DeferredModules(path)
+    assert len(reloaded) == 1
+    merged = reloaded.merge({"affected_modules": [], "changed_sections": []})
+    assert merged["affected_modules"] == [info]
+    assert merged["changed_sections"] == [{"file": "source-docs/a.md", "section": "A", "status": "changed"}]
+
+    reloaded.settle([info["module"]], [], [])
+    assert len(DeferredModules(path)) == 0
+
+
+def test_failed_fast_lane_requests_are_deferred(monkeypatch):
+    def fail(client, params, cache=None, **kwargs):
+        raise RuntimeError("overloaded")
+
+    monkeypatch.setattr(scheduler, "create_message", fail)
+    lanes = Scheduler()
+    written, complete = lanes.run_fast_lane(None, [request("high", "high")])
+    assert written == []
+    assert not complete
+    assert names(lanes.deferred) == ["high"]
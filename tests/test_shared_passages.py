@@ -0,0 +1,87 @@
+import pytest
+
+from patches import PatchError
+from shared_passages import PassageIndex, carry_edit, fan_out, minhash, plan_shared_updates, shingles
+
+WORDS = ("plugins extend the assistant with commands agents hooks and servers that a team can share through a "
+         "marketplace so every developer gets the same tools after one install and updates arrive automatically "
+         "whenever the marketplace owner publishes a new version of any plugin in the catalog").split()
+SHARED = " ".join(WORDS)
+VARIANT = " ".join(WORDS[:-3] + ["in", "that", "catalog"])
+OTHER = " ".join(reversed(WORDS))
+
+
+def index(sections):
+    """A PassageIndex over {module: [(anchor, body)]}, fingerprinted like refresh()."""
+    modules, signatures = {}, {}
+    for module, bodies in sections.items():
+        entries = []
+        for anchor, body in bodies:
+            digest = f"{module}:{anchor}"
+            signatures[digest] = minhash(shingles(body))
+            entries.append({"anchor": anchor, "hash": digest, "tokens": len(body) // 4})
+        modules[module] = {"hash": module, "sections": entries}
+    return PassageIndex({"modules": modules, "signatures": signatures})
+
+
+def test_near_duplicate_sections_across_modules_form_one_passage():
+    passages = index({
+        "m1.md": [("M1 > Overview", SHARED)],
+        "m2.md": [("M2 > Intro", VARIANT)],
+        "m3.md": [("M3 > Intro", OTHER)],
+    }).passages()
+    assert len(passages) == 1
+    assert {(m["module"], m["section"]) for m in passages[0]["members"]} == {("m1.md", "M1 > Overview"),
+                                                                            ("m2.md", "M2 > Intro")}
+    assert passages[0]["duplicated_tokens"] == min(m["tokens"] for m in passages[0]["members"])
+
+
+def test_duplicates_within_one_module_are_not_shared():
+    assert index({"m1.md": [("M1 > A", SHARED), ("M1 > B", SHARED)]}).passages() == []
+
+
+def test_highest_priority_affected_module_owns_each_passage():
+    passages = index({"m1.md": [("M1 > Overview", SHARED)], "m2.md": [("M2 > Intro", VARIANT)]}).passages()
+    plan = plan_shared_updates(passages, ["m2.md", "m1.md"])
+    assert [(u["owner"], u["section"], u["followers"]) for u in plan] == [("m2.md", "M2 > Intro",
+                                                                          [("m1.md", "M1 > Overview")])]
+    assert plan_shared_updates(passages, ["m9.md"]) == []
+
+
+def test_edit_is_carried_into_a_copy_with_its_own_wording():
+    before = "Install the plugin.\nRun the command.\nCheck the list.\n"
+    after = "Install the plugin.\nRun the new command.\nCheck the list.\nRestart the session.\n"
+    follower = "Install the plugin.\nA line only this copy has.\nRun the command.\nCheck the list.\n"
+    assert carry_edit(before, after, follower) == (
+        "Install the plugin.\nA line only this copy has.\nRun the new command.\nCheck the list.\nRestart the session.\n")
+
+
+def test_edit_to_text_the_copy_words_differently_is_refused():
+    before = "Install the plugin.\nRun the command.\n"
+    after = "Install the plugin.\nRun the new command.\n"
+    with pytest.raises(PatchError):
+        carry_edit(before, after, "Install the plugin.\nRun this command.\n")
+
+
+def test_fan_out_applies_the_owner_edit_to_followers(tmp_path):
+    owner, follower = tmp_path / "owner.md", tmp_path / "follower.md"
+    original = "# Owner\n\n## Shared\n\nInstall the plugin.\nRun the command.\n"
+    owner.write_text(original.replace("Run the command.", "Run the new command."), encoding="utf-8")
+    follower.write_text("# Follower\n\n## Same Thing\n\nInstall the plugin.\nOnly here.\nRun the command.\n",
+                        encoding="utf-8")
+    plan = [{"owner": str(owner), "section": "Owner > Shared",
+             "followers": [(str(follower), "Follower > Same Thing")], "tokens": 10}]
+
+    assert fan_out(plan, {str(owner): original}, lambda path: None) == [str(follower)]
+    assert follower.read_text(encoding="utf-8") == (
+        "# Follower\n\n## Same Thing\n\nInstall the plugin.\nOnly here.\nRun the new command.\n")
+
+
+def test_fan_out_skips_passages_the_owner_left_unchanged(tmp_path):
+    owner, follower = tmp_path / "owner.md", tmp_path / "follower.md"
+    original = "# Owner\n\n## Shared\n\nInstall the plugin.\n"
+    owner.write_text(original, encoding="utf-8")
+    follower.write_text("# Follower\n\n## Shared\n\nInstall it.\n", encoding="utf-8")
+    plan = [{"owner": str(owner), "section": "Owner > Shared", "followers": [(str(follower), "Follower > Shared")],
+             "tokens": 3}]
+    assert fan_out(plan, {str(owner): original}, lambda path: None) == []
@@ -0,0 +1,88 @@
+from validate_modules import gate_issues, make_gate, validate_module
+
+CREATED = """# Plugin Basics
+
+## Learning Objectives
+
+- Install a plugin
+
+## Overview
+
+Plugins bundle commands and agents. See [the overview](#overview) and [the docs](/en/plugins).
+
+## Key Takeaways
+
+- Plugins are shareable
+
+## Additional Resources
+
+- [Marketplaces](https://example.com/marketplaces)
+"""
+
+
+def checks(issues):
+    return sorted(i["check"] for i in issues)
+
+
+def test_well_formed_module_passes_every_outline():
+    assert validate_module(CREATED) == []
+    assert validate_module(CREATED, template="create") == []
+
+
+def test_create_outline_requires_its_sections_and_word_count():
+    text = CREATED.replace("## Key Takeaways", "## Summary")
+    assert [i["message"] for i in validate_module(text, template="create")] == [
+        "missing required section 'Key Takeaways'"]
+    assert validate_module(text) == []
+    spec = {"estimated_word_count": 200}
+    assert checks(validate_module(CREATED, spec, template="create")) == ["word-count"]
+    assert validate_module(CREATED, spec) == []
+
+
+def test_spec_required_sections_override_the_template():
+    spec = {"required_sections": ["Lab Steps"]}
+    assert [i["message"] for i in validate_module(CREATED, spec, template="create")] == [
+        "missing required section 'Lab Steps'"]
+
+
+def test_headings_may_not_skip_levels_or_go_too_deep():
+    text = "# Title\n\n### Skipped\n\nText.\n\n## Back\n\n### Fine\n\n#### Fine\n\n##### Too deep\n"
+    assert [i["section"] for i in validate_module(text)] == ["Title > Skipped", "Title > Back > Fine > Fine > Too deep"]
+
+
+def test_links_to_missing_headings_and_files_are_broken(tmp_path):
+    (tmp_path / "lab.md").write_text("# Lab\n", encoding="utf-8")
+    text = ("# Title\n\nSee [lab](lab.md), [gone](gone.md), [here](#title), [nowhere](#nowhere), "
+            "[site](/en/docs) and `[code](#not-a-link)`.\n\n```\n[fenced](#also-not-a-link)\n```\n")
+    issues = validate_module(text, module_path=tmp_path / "module.md")
+    assert [i["message"] for i in issues] == ["link to missing file 'gone.md'", "link to missing heading '#nowhere'"]
+    assert [i["message"] for i in validate_module(text)] == ["link to missing heading '#nowhere'"]
+
+
+def test_gate_only_counts_problems_an_update_introduces():
+    baseline = "# Title\n\n### Old skip\n\nText.\n"
+    assert gate_issues(baseline + "\nMore text.\n", baseline=baseline) == []
+    introduced = gate_issues(baseline + "\n[broken](#missing)\n", baseline=baseline)
+    assert checks(introduced) == ["broken-link"]
+
+
+def test_gate_rejects_failing_drafts_for_repair(tmp_path):
+    rejected = []
+    gate = make_gate(rejected, lambda path: None, template="create")
+    good = {"request": {"custom_id": "a"}, "module_path": str(tmp_path / "a.md")}
+    bad = {"request": {"custom_id": "b"}, "module_path": str(tmp_path / "b.md")}
+    assert gate(good, CREATED) == CREATED
+    assert gate(bad, "# Title\n") is None
+    assert [(req["request"]["custom_id"], draft) for req, draft, _ in rejected] == [("b", "# Title\n")]
+    assert len(rejected[0][2]) == 4
+
+
+def test_update_gate_holds_patches_to_the_module_outline():
+    spec = {"estimated_word_count": 30}
+    assert gate_issues(CREATED, spec, baseline=CREATED, template="patch") == []
+    dropped = CREATED.replace("## Key Takeaways\n\n- Plugins are shareable\n\n", "")
+    assert [i["message"] for i in gate_issues(dropped, spec, baseline=CREATED, template="patch")] == [
+        "missing required section 'Key Takeaways'"]
+    doubled = CREATED + "\n".join(["More detail on plugins and marketplaces."] * 10) + "\n"
+    assert checks(gate_issues(doubled, spec, baseline=CREATED, template="update")) == ["word-count"]
+    assert gate_issues(dropped, spec, baseline=dropped, template="patch") == []